@@ -0,0 +1,189 @@
+"""
+Versioned response cache for the book catalog.
+
+Cached list and detail payloads are stored under the current catalog
+version. Anything that changes what the catalog endpoints return bumps
+the version, so later reads miss and repopulate instead of serving stale
+data; old entries are simply left to expire. The version is seeded from
+the clock, so a counter lost by the cache backend never re-issues a
+version that is still in use.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.dispatch import Signal
+from rest_framework.response import Response
+
+from library_service.replicas import served_from_replica
+
+VERSION_KEY = "books:catalog-version"
+
+# Sent once a change that bumped the version has been committed.
+catalog_changed = Signal()
+
+
+class CacheStats:
+    """Hit/miss counters of the catalog cache in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[settings.BOOK_CACHE_ALIAS]
+
+
+def catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def acatalog_version():
+    cache = get_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def entry_timeout():
+    """
+    Lifetime of a new entry. Data read from a lagging replica may predate
+    the current version, so such entries only live as long as the
+    read-your-writes window.
+    """
+    if served_from_replica():
+        return min(settings.BOOK_CACHE_TIMEOUT, settings.REPLICA_PIN_SECONDS)
+    return settings.BOOK_CACHE_TIMEOUT
+
+
+def _bump():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def bump_catalog_version(using="default"):
+    """
+    Invalidate every cached catalog response.
+
+    Inside a transaction the version is bumped right away and again on
+    commit, so entries filled from pre-commit data in between are dropped
+    as well. ``catalog_changed`` follows the commit.
+    """
+    _bump()
+    if connections[using].in_atomic_block:
+        transaction.on_commit(_bump_committed, using=using)
+    else:
+        catalog_changed.send(sender=None)
+
+
+def _bump_committed():
+    _bump()
+    catalog_changed.send(sender=None)
+
+
+class CatalogCacheMixin:
+    """Serves ``list`` and ``retrieve`` from the catalog cache."""
+
+    def list(self, request, *args, **kwargs):
+        params = sorted(request.query_params.lists())
+        key = f"{request.get_host()}?{params}"
+        return self.cached_response("list", key, super().list, request, args, kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        key = str(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return self.cached_response(
+            "detail", key, super().retrieve, request, args, kwargs
+        )
+
+    def cached_response(self, kind, key, view, request, args, kwargs):
+        cache = get_cache()
+        version = catalog_version()
+        cache_key = self.make_cache_key(kind, key)
+
+        data = cache.get(cache_key, version=version)
+        stats.record(hit=data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(
+                cache_key,
+                response.data,
+                timeout=entry_timeout(),
+                version=version,
+            )
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        params = sorted(request.query_params.lists())
+        key = f"{request.get_host()}?{params}"
+        return await self.acached_response(
+            "list", key, super().alist, request, args, kwargs
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        key = str(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return await self.acached_response(
+            "detail", key, super().aretrieve, request, args, kwargs
+        )
+
+    async def acached_response(self, kind, key, view, request, args, kwargs):
+        cache = get_cache()
+        version = await acatalog_version()
+        cache_key = self.make_cache_key(kind, key)
+
+        data = await cache.aget(cache_key, version=version)
+        stats.record(hit=data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = await view(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(
+                cache_key,
+                response.data,
+                timeout=entry_timeout(),
+                version=version,
+            )
+        return response
+
+    @staticmethod
+    def make_cache_key(kind, key):
+        return f"books:{kind}:{hashlib.md5(key.encode()).hexdigest()}"
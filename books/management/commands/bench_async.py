@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from borrowings.models import Borrowing
+from library_service.benchmarks import asgi_request, benchmark_database, summarize
+
+
+class Command(BaseCommand):
+    """Compares async and sync views under ASGI at the same concurrency"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--books", type=int, default=200)
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options["keepdb"]):
+            # A kept database still holds the patron from the last run.
+            user, _ = get_user_model().objects.get_or_create(email="bench@example.com")
+            books = Book.objects.bulk_create(
+                Book(title=f"Book {i}", author="Bench", inventory=5, daily_fee="1.00")
+                for i in range(options["books"])
+            )
+            borrowings = Borrowing.objects.bulk_create(
+                Borrowing(
+                    user=user,
+                    book=book,
+                    borrow_date=now().date(),
+                    expected_return_date=now().date() + timedelta(days=7),
+                )
+                for book in books[:50]
+            )
+            headers = [(b"authorize", f"Bearer {AccessToken.for_user(user)}".encode())]
+            endpoints = {
+                "books list": (reverse("books:book-list"), "page_size=20"),
+                "book detail": (reverse("books:book-detail", args=[books[0].id]), ""),
+                "borrowings list": (
+                    reverse("borrowings:borrowings-list"),
+                    "page_size=20",
+                ),
+                "borrowing detail": (
+                    reverse("borrowings:borrowings-detail", args=[borrowings[0].id]),
+                    "",
+                ),
+                "users me": (reverse("users:manage-user"), ""),
+            }
+
+            application = get_asgi_application()
+            for name, (path, query) in endpoints.items():
+                for mode, async_views in (("sync", False), ("async", True)):
+                    with override_settings(ASYNC_VIEWS=async_views):
+                        stats = asyncio.run(
+                            self.run(application, path, query, headers, options)
+                        )
+                    self.stdout.write(
+                        f"{name:>16} {mode:>5}: {stats['per_second']:.1f} requests/s, "
+                        f"p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms, "
+                        f"peak threads={stats['peak_threads']}"
+                    )
+
+    @staticmethod
+    async def run(application, path, query, headers, options):
+        count, concurrency = options["requests"], options["concurrency"]
+        latencies = []
+        peak_threads = threading.active_count()
+        next_index = iter(range(count))
+
+        async def client():
+            nonlocal peak_threads
+            for _ in next_index:
+                started = time.perf_counter()
+                status = await asgi_request(application, "GET", path, query, headers)
+                latencies.append(time.perf_counter() - started)
+                assert status == 200, status
+                peak_threads = max(peak_threads, threading.active_count())
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        stats = summarize(latencies, time.perf_counter() - started)
+        stats["peak_threads"] = peak_threads
+        return stats
@@ -0,0 +1,690 @@
+import json
+import platform
+import random
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+import django
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils.timezone import now
+from drf_spectacular.settings import patched_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from books.changes import current_floor, make_token
+from books.models import Book
+from borrowings.models import Borrowing, Hold
+from library_service.benchmarks import benchmark_database, summarize
+from users.authentication import local_users
+
+# URL namespaces that are not part of the API.
+SKIPPED_NAMESPACES = ("admin",)
+# DefaultRouter's root view shares its path with the list route registered
+# at "", so it is never reached.
+SKIPPED_ROUTES = ("books:api-root", "borrowings:api-root")
+# The bench user borrows far more than any patron may.
+NO_BORROWING_LIMIT = {"MAX_ACTIVE_BORROWINGS": 10**6}
+PASSWORD = "benchpass"
+BULK_RETURN_SIZE = 20
+
+
+class Endpoint:
+    """One request shape to time, and the most queries it may take."""
+
+    def __init__(
+        self,
+        name,
+        route,
+        method,
+        budget,
+        build,
+        role="user",
+        status=200,
+        slow=False,
+        overrides=None,
+    ):
+        self.name = name
+        self.route = route
+        self.method = method
+        self.budget = budget
+        # build(fixtures, i) -> (path, data) for the i-th request.
+        self.build = build
+        self.role = role
+        self.status = status
+        # Password hashing endpoints run --slow-requests times.
+        self.slow = slow
+        # Settings in effect while the endpoint runs.
+        self.overrides = overrides or {}
+
+
+def url(route, *args):
+    return reverse(route, args=args)
+
+
+# Budgets count every query of a request that finds the caches cold,
+# including the lookup of the authenticated user.
+ENDPOINTS = (
+    Endpoint(
+        "books list",
+        "books:book-list",
+        "GET",
+        2,
+        lambda f, i: (url("books:book-list"), {"page_size": 20}),
+    ),
+    Endpoint(
+        "books search",
+        "books:book-list",
+        "GET",
+        3,
+        lambda f, i: (
+            url("books:book-list"),
+            {"q": f.rng.choice(f.words), "page_size": 20},
+        ),
+    ),
+    Endpoint(
+        "books detail",
+        "books:book-detail",
+        "GET",
+        3,
+        lambda f, i: (url("books:book-detail", f.books[i % len(f.books)]), None),
+    ),
+    Endpoint(
+        "books create",
+        "books:book-list",
+        "POST",
+        2,
+        lambda f, i: (
+            url("books:book-list"),
+            {
+                "title": f"Bench {i}",
+                "author": "Bench",
+                "cover": "SOFT",
+                "inventory": 3,
+                "daily_fee": "1.50",
+            },
+        ),
+        role="staff",
+        status=201,
+    ),
+    Endpoint(
+        "books update",
+        "books:book-detail",
+        "PATCH",
+        4,
+        lambda f, i: (
+            url("books:book-detail", f.books[i % len(f.books)]),
+            {"inventory": 10 + i % 5},
+        ),
+        role="staff",
+    ),
+    Endpoint(
+        "books delete",
+        "books:book-detail",
+        "DELETE",
+        7,
+        lambda f, i: (url("books:book-detail", f.spare_books[i]), None),
+        role="staff",
+        status=204,
+    ),
+    Endpoint(
+        "books stream",
+        "books:book-stream",
+        "GET",
+        2,
+        lambda f, i: (
+            url("books:book-stream"),
+            {"ids": ",".join(map(str, f.books[i % len(f.books) :][:20]))},
+        ),
+        # Ends the stream after its snapshot, timing how it is set up.
+        overrides={"BOOK_STREAM": {**settings.BOOK_STREAM, "MAX_AGE": 0}},
+    ),
+    Endpoint(
+        "books changes full sync",
+        "books:book-changes",
+        "GET",
+        4,
+        lambda f, i: (url("books:book-changes"), {"page_size": 1000}),
+    ),
+    Endpoint(
+        "books changes since",
+        "books:book-changes",
+        "GET",
+        4,
+        lambda f, i: (url("books:book-changes"), {"since": f.changes_token}),
+    ),
+    Endpoint(
+        "books cache stats",
+        "books:book-cache-stats",
+        "GET",
+        1,
+        lambda f, i: (url("books:book-cache-stats"), None),
+        role="staff",
+    ),
+    Endpoint(
+        "users register",
+        "users:register",
+        "POST",
+        2,
+        lambda f, i: (
+            url("users:register"),
+            {"email": f"new{i}@example.com", "password": PASSWORD},
+        ),
+        role="anon",
+        status=201,
+        slow=True,
+    ),
+    Endpoint(
+        "users me",
+        "users:manage-user",
+        "GET",
+        1,
+        lambda f, i: (url("users:manage-user"), None),
+    ),
+    Endpoint(
+        "users me update",
+        "users:manage-user",
+        "PATCH",
+        3,
+        lambda f, i: (url("users:manage-user"), {"email": f.user.email}),
+    ),
+    Endpoint(
+        "users token",
+        "users:token_obtain_pair",
+        "POST",
+        1,
+        lambda f, i: (
+            url("users:token_obtain_pair"),
+            {"email": f.user.email, "password": PASSWORD},
+        ),
+        role="anon",
+        slow=True,
+    ),
+    Endpoint(
+        "users token refresh",
+        "users:token_refresh",
+        "POST",
+        1,
+        lambda f, i: (url("users:token_refresh"), {"refresh": f.refresh}),
+        role="anon",
+    ),
+    Endpoint(
+        "users token verify",
+        "users:token_verify",
+        "POST",
+        0,
+        lambda f, i: (url("users:token_verify"), {"token": f.access["user"]}),
+        role="anon",
+    ),
+    Endpoint(
+        "borrowings list",
+        "borrowings:borrowings-list",
+        "GET",
+        3,
+        lambda f, i: (url("borrowings:borrowings-list"), {"page_size": 20}),
+    ),
+    Endpoint(
+        "borrowings list active",
+        "borrowings:borrowings-list",
+        "GET",
+        3,
+        lambda f, i: (
+            url("borrowings:borrowings-list"),
+            {"is_active": "true", "page_size": 20},
+        ),
+    ),
+    Endpoint(
+        "borrowings list staff by user",
+        "borrowings:borrowings-list",
+        "GET",
+        3,
+        lambda f, i: (
+            url("borrowings:borrowings-list"),
+            {"user_id": f.patrons[i % len(f.patrons)], "page_size": 20},
+        ),
+        role="staff",
+    ),
+    Endpoint(
+        "borrowings create",
+        "borrowings:borrowings-list",
+        "POST",
+        6,
+        lambda f, i: (
+            url("borrowings:borrowings-list"),
+            {"book_id": f.stock_book, "expected_return_date": f.due},
+        ),
+        status=201,
+        overrides=NO_BORROWING_LIMIT,
+    ),
+    Endpoint(
+        "borrowings create batch",
+        "borrowings:borrowings-list",
+        "POST",
+        7,
+        lambda f, i: (
+            url("borrowings:borrowings-list"),
+            [{"book_id": f.stock_book, "expected_return_date": f.due}] * 5,
+        ),
+        status=201,
+        overrides=NO_BORROWING_LIMIT,
+    ),
+    Endpoint(
+        "borrowings detail",
+        "borrowings:borrowings-detail",
+        "GET",
+        3,
+        lambda f, i: (
+            url("borrowings:borrowings-detail", f.loans[i % len(f.loans)]),
+            None,
+        ),
+    ),
+    Endpoint(
+        "borrowings return",
+        "borrowings:borrowings-return",
+        "POST",
+        9,
+        lambda f, i: (url("borrowings:borrowings-return", f.returnable[i]), None),
+    ),
+    Endpoint(
+        "borrowings bulk return",
+        "borrowings:borrowings-bulk-return",
+        "POST",
+        8,
+        lambda f, i: (
+            url("borrowings:borrowings-bulk-return"),
+            {"ids": f.bulk_returnable[i]},
+        ),
+        role="staff",
+    ),
+    Endpoint(
+        "borrowings export",
+        "borrowings:borrowings-export",
+        "GET",
+        2,
+        lambda f, i: (url("borrowings:borrowings-export"), {"format": "csv"}),
+        role="staff",
+    ),
+    Endpoint(
+        "borrowings overdue",
+        "borrowings:borrowings-overdue",
+        "GET",
+        2,
+        lambda f, i: (url("borrowings:borrowings-overdue"), None),
+        role="staff",
+    ),
+    Endpoint(
+        "holds list",
+        "borrowings:holds-list",
+        "GET",
+        2,
+        lambda f, i: (url("borrowings:holds-list"), {"page_size": 20}),
+    ),
+    Endpoint(
+        "holds create",
+        "borrowings:holds-list",
+        "POST",
+        6,
+        lambda f, i: (url("borrowings:holds-list"), {"book_id": f.hold_books[i]}),
+        status=201,
+    ),
+    Endpoint(
+        "holds detail",
+        "borrowings:holds-detail",
+        "GET",
+        2,
+        lambda f, i: (url("borrowings:holds-detail", f.cancellable[i]), None),
+    ),
+    Endpoint(
+        "holds cancel",
+        "borrowings:holds-detail",
+        "DELETE",
+        5,
+        lambda f, i: (url("borrowings:holds-detail", f.cancellable[i]), None),
+        status=204,
+    ),
+    Endpoint(
+        "holds pickup",
+        "borrowings:holds-pickup",
+        "POST",
+        8,
+        lambda f, i: (
+            url("borrowings:holds-pickup", f.ready_holds[i]),
+            {"expected_return_date": f.due},
+        ),
+        status=201,
+        overrides=NO_BORROWING_LIMIT,
+    ),
+    Endpoint(
+        "db pool stats",
+        "db-pool-stats",
+        "GET",
+        1,
+        lambda f, i: (url("db-pool-stats"), None),
+        role="staff",
+    ),
+    Endpoint(
+        "metrics", "metrics", "GET", 0, lambda f, i: (url("metrics"), None), role="anon"
+    ),
+    Endpoint(
+        "schema", "schema", "GET", 0, lambda f, i: (url("schema"), None), role="anon"
+    ),
+    Endpoint(
+        "swagger", "swagger", "GET", 0, lambda f, i: (url("swagger"), None), role="anon"
+    ),
+    Endpoint(
+        "redoc", "redoc", "GET", 0, lambda f, i: (url("redoc"), None), role="anon"
+    ),
+)
+
+
+def api_routes(resolver=None, namespace=""):
+    """View names of every named route outside ``SKIPPED_NAMESPACES``."""
+    routes = set()
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLPattern):
+            if pattern.name:
+                routes.add(f"{namespace}{pattern.name}")
+        elif pattern.namespace not in SKIPPED_NAMESPACES:
+            prefix = (
+                f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            )
+            routes |= api_routes(pattern, prefix)
+    return routes
+
+
+async def drain(content):
+    async for _ in content:
+        pass
+
+
+class Fixtures:
+    """Seeded data and credentials the endpoints' requests refer to."""
+
+
+class Command(BaseCommand):
+    """
+    Times every API route on a seeded dataset, asserts each endpoint's query
+    budget, and writes the results as JSON, optionally compared to a baseline
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--slow-requests",
+            type=int,
+            default=10,
+            help="Requests for endpoints that hash passwords.",
+        )
+        parser.add_argument("--books", type=int, default=5000)
+        parser.add_argument("--patrons", type=int, default=200)
+        parser.add_argument("--loans-per-patron", type=int, default=25)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--only", nargs="+", metavar="NAME")
+        parser.add_argument("--output", default="bench_endpoints.json")
+        parser.add_argument("--baseline", help="Results JSON to compare against.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed relative p50/p99 slowdown versus the baseline.",
+        )
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        endpoints = ENDPOINTS
+        if options["only"]:
+            endpoints = [e for e in ENDPOINTS if e.name in options["only"]]
+        else:
+            missing = api_routes() - {endpoint.route for endpoint in ENDPOINTS}
+            missing -= set(SKIPPED_ROUTES)
+            if missing:
+                raise CommandError(
+                    f"Routes without a benchmark and query budget: {sorted(missing)}"
+                )
+
+        with benchmark_database(keepdb=options["keepdb"]):
+            fixtures = self.seed(options)
+            # Schema warnings would repeat on every request to the schema views.
+            with patched_settings({"DISABLE_ERRORS_AND_WARNINGS": True}):
+                results = {
+                    endpoint.name: self.run(endpoint, fixtures, options)
+                    for endpoint in endpoints
+                }
+            vendor = connection.vendor
+
+        report = {
+            "environment": {
+                "database": vendor,
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                **{
+                    name: options[name]
+                    for name in ("requests", "books", "patrons", "loans_per_patron")
+                },
+            },
+            "endpoints": results,
+        }
+        Path(options["output"]).write_text(json.dumps(report, indent=2) + "\n")
+        self.stdout.write(f"Results written to {options['output']}")
+
+        problems = [
+            f"{name}: {result['max_queries']} queries, budget {result['budget']}"
+            for name, result in results.items()
+            if result["max_queries"] > result["budget"]
+        ]
+        if options["baseline"]:
+            problems += self.compare(results, options["baseline"], options["tolerance"])
+        if problems:
+            raise CommandError("\n".join(["Regressions:", *problems]))
+
+    def seed(self, options):
+        rng = random.Random(options["seed"])
+        today = now().date()
+        fixtures = Fixtures()
+        fixtures.rng = rng
+        fixtures.due = today + timedelta(days=14)
+        fixtures.words = ["ka", "lo", "mira", "senna", "tor", "vel", "andri"]
+
+        # A long tail of titles and authors, a few popular ones.
+        fixtures.books = [
+            book.id
+            for book in Book.objects.bulk_create(
+                Book(
+                    title=" ".join(rng.choices(fixtures.words, k=3)).title() + f" {i}",
+                    author=f"Author {int(rng.paretovariate(1.2)) % 500}",
+                    cover=rng.choice(("HARD", "SOFT")),
+                    inventory=rng.randint(0, 20),
+                    daily_fee=f"{rng.randint(10, 500) / 100:.2f}",
+                )
+                for i in range(options["books"])
+            )
+        ]
+        spare = max(options["requests"], options["slow_requests"])
+        fixtures.spare_books = [
+            book.id
+            for book in Book.objects.bulk_create(
+                Book(title=f"Spare {i}", author="Bench", inventory=1, daily_fee="1.00")
+                for i in range(spare)
+            )
+        ]
+        fixtures.stock_book = Book.objects.create(
+            title="Bestseller", author="Bench", inventory=10**6, daily_fee="1.00"
+        ).id
+
+        User = get_user_model()
+        password = User(email="x@example.com")
+        password.set_password(PASSWORD)
+        patrons = User.objects.bulk_create(
+            User(email=f"patron{i}@example.com", password=password.password)
+            for i in range(options["patrons"])
+        )
+        fixtures.patrons = [patron.id for patron in patrons]
+        fixtures.user = patrons[0]
+        staff = User.objects.create_user(
+            email="staff@example.com", password=PASSWORD, is_staff=True
+        )
+
+        loans = []
+        for patron in patrons:
+            for _ in range(options["loans_per_patron"]):
+                borrowed = today - timedelta(days=rng.randint(0, 120))
+                expected = borrowed + timedelta(days=rng.randint(7, 30))
+                returned = borrowed + timedelta(days=rng.randint(1, 40))
+                if returned > today or rng.random() < 0.2:
+                    returned = None
+                loans.append(
+                    Borrowing(
+                        user=patron,
+                        book_id=rng.choice(fixtures.books),
+                        borrow_date=borrowed,
+                        expected_return_date=expected,
+                        actual_return_date=returned,
+                    )
+                )
+        Borrowing.objects.bulk_create(loans, batch_size=2000)
+        fixtures.loans = list(
+            Borrowing.objects.filter(user=fixtures.user).values_list("id", flat=True)
+        )
+
+        # Active loans for the return endpoints to consume, one per request.
+        active = Borrowing.objects.bulk_create(
+            Borrowing(
+                user=fixtures.user,
+                book_id=fixtures.stock_book,
+                borrow_date=today,
+                expected_return_date=fixtures.due,
+            )
+            for _ in range(options["requests"] * (1 + BULK_RETURN_SIZE))
+        )
+        ids = [borrowing.id for borrowing in active]
+        fixtures.returnable = ids[: options["requests"]]
+        fixtures.bulk_returnable = [
+            ids[start : start + BULK_RETURN_SIZE]
+            for start in range(options["requests"], len(ids), BULK_RETURN_SIZE)
+        ]
+
+        # Out-of-stock books to place holds on, and open holds to cancel or
+        # pick up, one per request.
+        on_hold = Book.objects.bulk_create(
+            Book(title=f"On hold {i}", author="Bench", inventory=0, daily_fee="1.00")
+            for i in range(3 * options["requests"])
+        )
+        fixtures.hold_books = [book.id for book in on_hold[: options["requests"]]]
+        expires_at = now() + timedelta(days=3)
+        holds = Hold.objects.bulk_create(
+            Hold(
+                user=fixtures.user,
+                book=book,
+                status=Hold.Status.READY if ready else Hold.Status.WAITING,
+                ready_at=now() if ready else None,
+                expires_at=expires_at if ready else None,
+            )
+            for ready, books in (
+                (False, on_hold[options["requests"] : 2 * options["requests"]]),
+                (True, on_hold[2 * options["requests"] :]),
+            )
+            for book in books
+        )
+        fixtures.cancellable = [hold.id for hold in holds[: options["requests"]]]
+        fixtures.ready_holds = [hold.id for hold in holds[options["requests"] :]]
+
+        # The loans above were made around the managers.
+        call_command("repair_counters", stdout=StringIO())
+
+        # Syncs from here see only what earlier endpoints changed.
+        fixtures.changes_token = make_token(current_floor(connection), 0)
+
+        refresh = RefreshToken.for_user(fixtures.user)
+        fixtures.refresh = str(refresh)
+        fixtures.access = {
+            "user": str(refresh.access_token),
+            "staff": str(RefreshToken.for_user(staff).access_token),
+        }
+        return fixtures
+
+    def run(self, endpoint, fixtures, options):
+        client = APIClient()
+        if endpoint.role != "anon":
+            client.credentials(
+                HTTP_AUTHORIZE=f"Bearer {fixtures.access[endpoint.role]}"
+            )
+        send = getattr(client, endpoint.method.lower())
+        count = options["slow_requests"] if endpoint.slow else options["requests"]
+        # Every endpoint starts cold, so its first request pays for the caches.
+        cache.clear()
+        local_users.clear()
+
+        latencies, queries = [], []
+        with override_settings(**endpoint.overrides):
+            for i in range(count):
+                path, data = endpoint.build(fixtures, i)
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    if endpoint.method == "GET":
+                        response = send(path, data)
+                    else:
+                        response = send(path, data, format="json")
+                    if response.streaming:
+                        if response.is_async:
+                            async_to_sync(drain)(response.streaming_content)
+                        else:
+                            b"".join(response.streaming_content)
+                    latencies.append(time.perf_counter() - started)
+                queries.append(len(captured))
+                if response.status_code != endpoint.status:
+                    raise CommandError(
+                        f"{endpoint.name}: expected {endpoint.status}, got "
+                        f"{response.status_code} {getattr(response, 'data', '')}"
+                    )
+
+        stats = summarize(latencies, sum(latencies))
+        result = {
+            "route": endpoint.route,
+            "method": endpoint.method,
+            **stats,
+            "max_queries": max(queries),
+            "budget": endpoint.budget,
+        }
+        flag = " OVER BUDGET" if result["max_queries"] > endpoint.budget else ""
+        self.stdout.write(
+            f"{endpoint.name:>30}: {stats['per_second']:8.1f} requests/s, "
+            f"p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms, "
+            f"queries={result['max_queries']}/{endpoint.budget}{flag}"
+        )
+        return result
+
+    def compare(self, results, baseline_path, tolerance):
+        baseline = json.loads(Path(baseline_path).read_text())["endpoints"]
+        problems = []
+        self.stdout.write(f"\nCompared with {baseline_path}:")
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                self.stdout.write(f"{name:>30}: new")
+                continue
+            changes = []
+            for key in ("p50_ms", "p99_ms"):
+                ratio = result[key] / before[key] if before[key] else 1.0
+                changes.append(f"{key[:3]} {ratio - 1:+.0%}")
+                if ratio > 1 + tolerance:
+                    problems.append(
+                        f"{name}: {key} {before[key]:.2f} -> {result[key]:.2f}"
+                    )
+            if result["max_queries"] > before["max_queries"]:
+                problems.append(
+                    f"{name}: queries {before['max_queries']} -> {result['max_queries']}"
+                )
+            changes.append(
+                f"queries {before['max_queries']} -> {result['max_queries']}"
+            )
+            self.stdout.write(f"{name:>30}: {', '.join(changes)}")
+        return problems
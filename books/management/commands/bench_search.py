@@ -0,0 +1,101 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from library_service.benchmarks import benchmark_database, summarize
+
+SYLLABLES = (
+    "ka lo mi ra sen tor vel an dri mor quel ash bin cor dun el fa gor "
+    "hal is jor kel lun mar nor ol pen rus sil tam ur vin wes yor zan"
+).split()
+
+
+def make_words(rng, count):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    """Times GET /api/books/?q= on a large synthetic catalog"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        vocabulary = make_words(rng, 20_000)
+        names = make_words(rng, 2_000)
+
+        with benchmark_database(keepdb=options["keepdb"]):
+            self.seed(rng, vocabulary, names, options)
+
+            user = get_user_model().objects.create_user(
+                email="bench@example.com", password="benchpass"
+            )
+            client = APIClient()
+            client.force_authenticate(user=user)
+            url = reverse("books:book-list")
+
+            for kind, make_query in (
+                ("word", lambda: rng.choice(vocabulary)),
+                (
+                    "phrase",
+                    lambda: f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}",
+                ),
+                ("author", lambda: rng.choice(names).title()),
+                ("typo", lambda: self.typo(rng, rng.choice(vocabulary))),
+            ):
+                latencies = []
+                for _ in range(options["queries"]):
+                    params = {"q": make_query(), "page_size": 20}
+                    started = time.perf_counter()
+                    response = client.get(url, params)
+                    latencies.append(time.perf_counter() - started)
+                    assert response.status_code == 200
+                stats = summarize(latencies, sum(latencies))
+                self.stdout.write(
+                    f"{kind:>7}: {stats['per_second']:.1f} searches/s, "
+                    f"p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+                )
+
+    def seed(self, rng, vocabulary, names, options):
+        total, batch_size = options["books"], options["batch_size"]
+        if Book.objects.count() >= total:
+            return
+
+        started = time.perf_counter()
+        for offset in range(0, total, batch_size):
+            Book.objects.bulk_create(
+                Book(
+                    title=" ".join(
+                        rng.choices(vocabulary, k=rng.randint(1, 5))
+                    ).title(),
+                    author=f"{rng.choice(names)} {rng.choice(names)}".title(),
+                    inventory=rng.randint(0, 10),
+                    daily_fee="1.00",
+                )
+                for _ in range(min(batch_size, total - offset))
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE books_book")
+        self.stdout.write(
+            f"seeded {total} books in {time.perf_counter() - started:.1f}s"
+        )
+
+    @staticmethod
+    def typo(rng, word):
+        i = rng.randrange(len(word))
+        return word[:i] + rng.choice("aeiou") + word[i + 1 :]
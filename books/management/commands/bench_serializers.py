@@ -0,0 +1,83 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from rest_framework.renderers import JSONRenderer
+
+from books.models import Book
+from books.serializers import BookSerializer
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingSerializer
+from library_service.benchmarks import benchmark_database
+from library_service.fastpath import values_plan
+
+
+class Command(BaseCommand):
+    """Rows/s of serializer lists versus the values() fast path"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        with benchmark_database(keepdb=options["keepdb"]):
+            user = get_user_model().objects.create_user(
+                email="bench@example.com", password="benchpass"
+            )
+            books = Book.objects.bulk_create(
+                Book(
+                    title=f"Book {i}",
+                    author=f"Author {i % 500}",
+                    inventory=i % 10,
+                    daily_fee=f"{i % 7}.{i % 100:02d}",
+                )
+                for i in range(rows)
+            )
+            today = now().date()
+            Borrowing.objects.bulk_create(
+                Borrowing(
+                    user=user,
+                    book=book,
+                    borrow_date=today - timedelta(days=i % 30),
+                    expected_return_date=today + timedelta(days=i % 14),
+                    actual_return_date=today if i % 3 == 0 else None,
+                )
+                for i, book in enumerate(books)
+            )
+
+            renderer = JSONRenderer()
+            for name, queryset, serializer_class in (
+                ("books", Book.objects.order_by("id"), BookSerializer),
+                ("borrowings", Borrowing.objects.order_by("id"), BorrowingSerializer),
+            ):
+                plan = values_plan(serializer_class)
+
+                def serializer_path():
+                    data = serializer_class(queryset.all(), many=True).data
+                    return renderer.render(data)
+
+                def values_path():
+                    return renderer.render(
+                        plan.represent(queryset.values(*plan.lookups))
+                    )
+
+                assert serializer_path() == values_path(), name
+                for path_name, path in (
+                    ("serializer", serializer_path),
+                    ("values", values_path),
+                ):
+                    best = min(self.timed(path) for _ in range(repeat))
+                    self.stdout.write(
+                        f"{name:>10} {path_name:>10}: {rows / best:,.0f} rows/s "
+                        f"({best * 1000:.0f}ms for {rows} rows)"
+                    )
+
+    @staticmethod
+    def timed(path):
+        started = time.perf_counter()
+        path()
+        return time.perf_counter() - started
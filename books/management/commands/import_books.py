@@ -0,0 +1,238 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from books.cache import bump_catalog_version
+from books.models import Book
+from borrowings.models import Hold
+from library_service.db import copy_rows
+
+FIELDS = ("title", "author", "cover", "inventory", "daily_fee")
+UPDATE_FIELDS = ("cover", "inventory", "daily_fee", "updated_at")
+
+
+class Command(BaseCommand):
+    """Imports books from a CSV or JSONL file (or stdin) in batches"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='Input file, or "-" for stdin')
+        parser.add_argument("--format", choices=("csv", "jsonl"))
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help="Update books with the same title and author instead of "
+            "adding duplicates",
+        )
+        parser.add_argument(
+            "--errors", help="Write rejected rows to this file as JSON lines"
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or (
+            "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+        )
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        source = (
+            sys.stdin if path == "-" else open(path, newline="", encoding="utf-8-sig")
+        )
+        errors = open(options["errors"], "w") if options["errors"] else None
+        self.upsert = options["upsert"]
+        self.use_copy = connection.vendor == "postgresql"
+        self.processed = self.created = self.updated = self.rejected = 0
+        self.started = time.perf_counter()
+
+        try:
+            batch = []
+            for line_number, row in self.read(source, input_format):
+                self.processed += 1
+                book, row_errors = self.validate(row)
+                if row_errors:
+                    self.rejected += 1
+                    if errors:
+                        errors.write(
+                            json.dumps(
+                                {"line": line_number, "row": row, "errors": row_errors},
+                                default=str,
+                            )
+                            + "\n"
+                        )
+                    continue
+                batch.append(book)
+                if len(batch) >= options["batch_size"]:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if errors:
+                errors.close()
+            if self.updated:
+                # Restocked books owe their new copies to waiting holds first.
+                Hold.objects.serve()
+            if self.created or self.updated:
+                bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(self.progress()))
+        if self.rejected and not errors:
+            self.stdout.write("Pass --errors FILE to keep the rejected rows.")
+
+    def read(self, source, input_format):
+        """Yield ``(line_number, row)`` pairs; undecodable lines become errors."""
+        if input_format == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else {"_raw": line}
+
+    @staticmethod
+    def validate(row):
+        """Build a Book from ``row`` and check it against the model fields."""
+        if "_raw" in row:
+            return None, {"__all__": ["Not a JSON object."]}
+
+        values = {field: row.get(field) for field in FIELDS}
+        if isinstance(values["title"], str):
+            values["title"] = values["title"].strip()
+        if isinstance(values["author"], str):
+            values["author"] = values["author"].strip()
+        if values["cover"] in (None, ""):
+            values["cover"] = Book.Cover.HARD
+
+        book = Book(**values)
+        try:
+            book.clean_fields(exclude=("updated_at", "search_vector"))
+        except ValidationError as error:
+            return None, error.message_dict
+        return book, None
+
+    def flush(self, batch):
+        with transaction.atomic():
+            if self.upsert:
+                batch = list(
+                    {(book.title, book.author): book for book in batch}.values()
+                )
+                if self.use_copy:
+                    self.upsert_staged(batch)
+                else:
+                    self.insert(self.update_existing(batch))
+            else:
+                self.insert(batch)
+        self.stdout.write(self.progress())
+
+    def upsert_staged(self, books):
+        """Upsert through a temporary table filled by COPY (PostgreSQL)."""
+        table = connection.ops.quote_name(Book._meta.db_table)
+        timestamp = now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE import_books_staging ("
+                "title varchar(255), author varchar(255), cover varchar(4), "
+                "inventory integer, daily_fee numeric(10, 2)"
+                ") ON COMMIT DROP"
+            )
+            copy_rows(
+                connection,
+                "import_books_staging",
+                FIELDS,
+                ([getattr(book, field) for field in FIELDS] for book in books),
+            )
+            cursor.execute(
+                f"""
+                UPDATE {table} AS b
+                SET cover = s.cover, inventory = s.inventory,
+                    daily_fee = s.daily_fee, updated_at = %s
+                FROM import_books_staging AS s
+                WHERE b.title = s.title AND b.author = s.author
+                """,
+                [timestamp],
+            )
+            self.updated += cursor.rowcount
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (title, author, cover, inventory, daily_fee, updated_at)
+                SELECT s.title, s.author, s.cover, s.inventory, s.daily_fee, %s
+                FROM import_books_staging AS s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {table} AS b
+                    WHERE b.title = s.title AND b.author = s.author
+                )
+                """,
+                [timestamp],
+            )
+            self.created += cursor.rowcount
+
+    def update_existing(self, batch):
+        """Update books already in the catalog; return the ones still to insert."""
+        by_key = {(book.title, book.author): book for book in batch}
+        existing = Book.objects.filter(
+            Q(title__in={title for title, _ in by_key})
+            & Q(author__in={author for _, author in by_key})
+        ).values_list("id", "title", "author")
+
+        timestamp = now()
+        changed = []
+        for book_id, title, author in existing.iterator():
+            book = by_key.get((title, author))
+            if book is None:
+                continue
+            book.updated_at = timestamp
+            changed.append(
+                Book(
+                    id=book_id,
+                    **{field: getattr(book, field) for field in UPDATE_FIELDS},
+                )
+            )
+            book.pk = book_id
+        Book.objects.bulk_update(changed, UPDATE_FIELDS, batch_size=500)
+        self.updated += len(changed)
+        return [book for book in by_key.values() if book.pk is None]
+
+    def insert(self, books):
+        if not books:
+            return
+        if self.use_copy:
+            timestamp = now()
+            copy_rows(
+                connection,
+                Book._meta.db_table,
+                FIELDS + ("updated_at",),
+                (
+                    [getattr(book, field) for field in FIELDS] + [timestamp]
+                    for book in books
+                ),
+            )
+        else:
+            Book.objects.bulk_create(books)
+        self.created += len(books)
+
+    def progress(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.processed / elapsed if elapsed else 0.0
+        return (
+            f"{self.processed} rows: {self.created} created, "
+            f"{self.updated} updated, {self.rejected} rejected "
+            f"({rate:.0f} rows/s)"
+        )
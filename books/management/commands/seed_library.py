@@ -0,0 +1,300 @@
+import random
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from itertools import accumulate, chain
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.timezone import now
+
+from books.cache import bump_catalog_version
+from books.models import Book
+from borrowings.models import LOAN_COUNTERS, Borrowing
+from library_service.db import bulk_loading, insert_rows
+
+EMAIL_DOMAIN = "seed.library.test"
+WORDS = (
+    "river stone night garden silver winter empire shadow letters island memory "
+    "storm glass city forest secret ocean fire house journey kingdom light "
+    "mountain song machine history promise road summer war wind crown"
+).split()
+FIRST_NAMES = (
+    "Ada Amir Bea Chen Dara Elena Femi Goran Hana Ivan Jude Kira Luca Maya Nia "
+    "Omar Priya Quinn Rosa Sami Tomas Uma Vera Wen Yara Zoe"
+).split()
+LAST_NAMES = (
+    "Adams Bianchi Costa Dubois Eriksen Fischer Garcia Horvat Ito Jensen "
+    "Kowalski Lopez Moreau Novak Okafor Petrov Quist Rossi Silva Tanaka Ueda "
+    "Varga Weber Xu Yilmaz Zhang"
+).split()
+DAILY_FEES = tuple(f"{cents / 100:.2f}" for cents in range(50, 501, 25))
+HISTORY_DAYS = 730
+LOAN_DAYS = (14, 21, 28)
+BOOK_COLUMNS = ("title", "author", "cover", "inventory", "daily_fee", "updated_at")
+USER_COLUMNS = (
+    "email",
+    "password",
+    "first_name",
+    "last_name",
+    "is_staff",
+    "is_superuser",
+    "is_active",
+    "date_joined",
+)
+BORROWING_COLUMNS = (
+    "book_id",
+    "user_id",
+    "borrow_date",
+    "expected_return_date",
+    "actual_return_date",
+    "updated_at",
+)
+
+
+def zipf_cum_weights(n, exponent, rng):
+    """
+    Cumulative Zipf weights over ``n`` items in shuffled order, for
+    ``Random.choices``: a few items take most of the picks.
+    """
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(accumulate(rank**-exponent for rank in ranks))
+
+
+class Command(BaseCommand):
+    """
+    Fills the database with reproducible synthetic books, patrons and
+    borrowings for load testing
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=10000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--borrowings", type=int, default=50000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--active-share",
+            type=float,
+            default=0.1,
+            help="Fraction of borrowings not yet returned.",
+        )
+        parser.add_argument(
+            "--popularity",
+            type=float,
+            default=1.1,
+            help="Zipf exponent of book popularity; higher is more skewed.",
+        )
+        parser.add_argument(
+            "--password",
+            default="password",
+            help="Password of every generated user.",
+        )
+        parser.add_argument("--batch-size", type=int, default=20000)
+        parser.add_argument(
+            "--keep-indexes",
+            action="store_true",
+            help="Update indexes row by row instead of rebuilding them after "
+            "the load; faster when adding a little to large tables.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options["borrowings"] and not (options["books"] and options["users"]):
+            raise CommandError("Borrowings need at least one book and one user")
+        if not 0 <= options["active_share"] <= 1:
+            raise CommandError("--active-share must be between 0 and 1")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.timestamp = now()
+        self.db_timestamp = connection.ops.adapt_datetimefield_value(self.timestamp)
+        self.total = 0
+        self.started = time.perf_counter()
+
+        User = get_user_model()
+        tables = [model._meta.db_table for model in (Book, User, Borrowing)]
+        loading = (
+            nullcontext()
+            if options["keep_indexes"]
+            else bulk_loading(connection, tables)
+        )
+        # Numbered after earlier runs, so the command can be run again.
+        numbered_from = User.objects.filter(email__endswith=EMAIL_DOMAIN).count()
+        with loading:
+            book_ids = self.load(
+                Book, BOOK_COLUMNS, self.books(options["books"]), options["books"]
+            )
+            user_ids = self.load(
+                User,
+                USER_COLUMNS,
+                self.users(options["users"], options["password"], numbered_from),
+                options["users"],
+            )
+            self.load(
+                Borrowing,
+                BORROWING_COLUMNS,
+                self.borrowings(options["borrowings"], book_ids, user_ids, options),
+                options["borrowings"],
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                for table in tables:
+                    cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+        if options["borrowings"]:
+            self.count_loans()
+        if book_ids:
+            bump_catalog_version()
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {self.total} rows in {elapsed:.1f}s "
+                f"({self.total / elapsed if elapsed else 0:.0f} rows/s); "
+                f"users log in with password {options['password']!r}"
+            )
+        )
+
+    def load(self, model, columns, batches, count):
+        """
+        Stream ``batches`` of rows into ``model``'s table as one insert and
+        return the new primary keys in insertion order.
+        """
+        table = model._meta.db_table
+        last_id = model.objects.order_by("-pk").values_list("pk", flat=True).first()
+        started = time.perf_counter()
+        insert_rows(connection, table, columns, chain.from_iterable(batches))
+        self.total += count
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{table}: {count} rows in {elapsed:.1f}s "
+            f"({count / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        return list(
+            model.objects.filter(pk__gt=last_id or 0)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def count_loans(self):
+        """Set the loan counters of users and books from the new borrowings."""
+        started = time.perf_counter()
+        for model in LOAN_COUNTERS:
+            after = 0
+            while after is not None:
+                after, _ = Borrowing.objects.repair_counters(
+                    model, after, self.batch_size
+                )
+        self.stdout.write(f"loan counters: {time.perf_counter() - started:.1f}s")
+
+    def chunks(self, count):
+        for offset in range(0, count, self.batch_size):
+            yield offset, min(self.batch_size, count - offset)
+
+    def books(self, count):
+        rng = self.rng
+        random_ = rng.random
+        words = WORDS
+        vocabulary = len(words)
+        authors = [
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            for _ in range(max(count // 20, 1))
+        ]
+        # A few prolific authors, a long tail with one or two books each.
+        author_weights = zipf_cum_weights(len(authors), 1.0, rng)
+        covers = (Book.Cover.HARD, Book.Cover.SOFT)
+        timestamp = self.db_timestamp
+
+        for offset, size in self.chunks(count):
+            book_authors = rng.choices(authors, cum_weights=author_weights, k=size)
+            fees = rng.choices(DAILY_FEES, k=size)
+            rows = []
+            for i in range(size):
+                title = " ".join(
+                    words[int(random_() * vocabulary)]
+                    for _ in range(1 + int(random_() * 4))
+                )
+                rows.append(
+                    (
+                        f"{title.capitalize()} {offset + i + 1}",
+                        book_authors[i],
+                        covers[random_() < 0.4],
+                        int(random_() * 12),
+                        fees[i],
+                        timestamp,
+                    )
+                )
+            yield rows
+
+    def users(self, count, password, start):
+        rng = self.rng
+        # Every synthetic user shares one hash: hashing is the slow part.
+        hashed = make_password(password)
+        first_names = rng.choices(FIRST_NAMES, k=count)
+        last_names = rng.choices(LAST_NAMES, k=count)
+        joined = connection.ops.adapt_datetimefield_value(
+            self.timestamp - timedelta(days=HISTORY_DAYS)
+        )
+
+        for offset, size in self.chunks(count):
+            yield [
+                (
+                    f"patron{start + i + 1}@{EMAIL_DOMAIN}",
+                    hashed,
+                    first_names[i],
+                    last_names[i],
+                    False,
+                    False,
+                    True,
+                    joined,
+                )
+                for i in range(offset, offset + size)
+            ]
+
+    def borrowings(self, count, book_ids, user_ids, options):
+        rng = self.rng
+        random_ = rng.random
+        active_share = options["active_share"]
+        book_weights = zipf_cum_weights(len(book_ids), options["popularity"], rng)
+        # Some patrons are much more active than others.
+        user_weights = zipf_cum_weights(len(user_ids), 0.8, rng)
+        today = self.timestamp.date()
+        # days[ahead + n] is n days ago; due dates can be up to ``ahead`` days
+        # out. Formatted once here rather than for every row by the driver.
+        ahead = max(LOAN_DAYS)
+        days = [
+            (today + timedelta(days=ahead - n)).isoformat()
+            for n in range(ahead + HISTORY_DAYS)
+        ]
+        timestamp = self.db_timestamp
+
+        for _, size in self.chunks(count):
+            books = rng.choices(book_ids, cum_weights=book_weights, k=size)
+            users = rng.choices(user_ids, cum_weights=user_weights, k=size)
+            rows = []
+            for i in range(size):
+                loan_days = LOAN_DAYS[int(random_() * len(LOAN_DAYS))]
+                if random_() < active_share:
+                    # Out for up to twice the loan period, so some are overdue.
+                    age = int(random_() * loan_days * 2)
+                    returned = None
+                else:
+                    age = loan_days + int(random_() * (HISTORY_DAYS - loan_days))
+                    # Most come back on time, a few late.
+                    kept = min(int(random_() * loan_days * 1.2) + 1, age)
+                    returned = days[ahead + age - kept]
+                rows.append(
+                    (
+                        books[i],
+                        users[i],
+                        days[ahead + age],
+                        days[ahead + age - loan_days],
+                        returned,
+                        timestamp,
+                    )
+                )
+            yield rows
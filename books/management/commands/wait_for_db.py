@@ -1,22 +1,47 @@
 import time
 
-from django.core.management.base import BaseCommand
-from django.db import connections
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
 
 
 class Command(BaseCommand):
     """Waits for database to be available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60.0,
+            help="Give up after this many seconds.",
+        )
+        parser.add_argument("--initial-delay", type=float, default=0.25)
+        parser.add_argument("--max-delay", type=float, default=5.0)
+
     def handle(self, *args, **options):
         self.stdout.write("Waiting for database...")
+        connection = connections[options["database"]]
+        deadline = time.monotonic() + options["timeout"]
+        delay = options["initial_delay"]
 
         while True:
             try:
-                connections["default"].cursor()
+                connection.ensure_connection()
                 break
-            except OperationalError:
-                self.stdout.write("Database unavailable, waiting 1 second...")
-                time.sleep(1)
+            except OperationalError as error:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database unavailable after {options['timeout']:g}s: {error}"
+                    )
+                delay = min(delay, options["max_delay"], remaining)
+                self.stdout.write(
+                    f"Database unavailable, retrying in {delay:.2f}s "
+                    f"({remaining:.0f}s left)..."
+                )
+                time.sleep(delay)
+                delay *= 2
+        connection.close()
 
         self.stdout.write(self.style.SUCCESS("Database available!"))
@@ -0,0 +1,100 @@
+# Generated by Django 6.0.1 on 2026-10-17 18:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRESQL_FORWARDS = (
+    """
+    CREATE FUNCTION books_book_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(NEW.author, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER books_book_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, author ON books_book
+    FOR EACH ROW EXECUTE FUNCTION books_book_search_vector_update()
+    """,
+    """
+    UPDATE books_book SET search_vector =
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(author, '')), 'B')
+    """,
+    "CREATE INDEX books_book_search_vector_idx ON books_book USING gin (search_vector)",
+)
+
+POSTGRESQL_TRIGRAM_FORWARDS = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX books_book_title_trgm_idx ON books_book "
+    "USING gin (title gin_trgm_ops)",
+    "CREATE INDEX books_book_author_trgm_idx ON books_book "
+    "USING gin (author gin_trgm_ops)",
+)
+
+POSTGRESQL_BACKWARDS = (
+    "DROP INDEX IF EXISTS books_book_author_trgm_idx",
+    "DROP INDEX IF EXISTS books_book_title_trgm_idx",
+    "DROP INDEX IF EXISTS books_book_search_vector_idx",
+    "DROP TRIGGER IF EXISTS books_book_search_vector_trigger ON books_book",
+    "DROP FUNCTION IF EXISTS books_book_search_vector_update()",
+)
+
+FALLBACK_FORWARDS = (
+    "CREATE INDEX books_book_title_lower_idx ON books_book (lower(title))",
+    "CREATE INDEX books_book_author_lower_idx ON books_book (lower(author))",
+)
+
+FALLBACK_BACKWARDS = (
+    "DROP INDEX IF EXISTS books_book_author_lower_idx",
+    "DROP INDEX IF EXISTS books_book_title_lower_idx",
+)
+
+
+def trigram_installable(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_search_support(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        statements = POSTGRESQL_FORWARDS
+        if trigram_installable(schema_editor):
+            statements += POSTGRESQL_TRIGRAM_FORWARDS
+    else:
+        statements = FALLBACK_FORWARDS
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_support(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        statements = POSTGRESQL_BACKWARDS
+    else:
+        statements = FALLBACK_BACKWARDS
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_support, drop_search_support),
+    ]
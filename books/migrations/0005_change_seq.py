@@ -0,0 +1,139 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:30
+
+from django.db import migrations, models
+
+POSTGRESQL_FORWARDS = (
+    "UPDATE books_book SET change_seq = pg_current_xact_id()::text::bigint",
+    """
+    CREATE FUNCTION books_book_change_seq_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.change_seq := pg_current_xact_id()::text::bigint;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER books_book_change_seq_trigger
+    BEFORE INSERT OR UPDATE ON books_book
+    FOR EACH ROW EXECUTE FUNCTION books_book_change_seq_update()
+    """,
+    """
+    CREATE FUNCTION books_book_tombstone_insert() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO books_booktombstone (book_id, change_seq, deleted_at)
+        VALUES (OLD.id, pg_current_xact_id()::text::bigint, now());
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER books_book_tombstone_trigger
+    AFTER DELETE ON books_book
+    FOR EACH ROW EXECUTE FUNCTION books_book_tombstone_insert()
+    """,
+)
+
+POSTGRESQL_BACKWARDS = (
+    "DROP TRIGGER IF EXISTS books_book_tombstone_trigger ON books_book",
+    "DROP FUNCTION IF EXISTS books_book_tombstone_insert()",
+    "DROP TRIGGER IF EXISTS books_book_change_seq_trigger ON books_book",
+    "DROP FUNCTION IF EXISTS books_book_change_seq_update()",
+)
+
+# SQLite runs one writer at a time, so a counter one past the highest value
+# in use is assigned in commit order.
+SQLITE_NEXT_SEQ = """
+    (SELECT max(
+        coalesce((SELECT max(change_seq) FROM books_book), 0),
+        coalesce((SELECT max(change_seq) FROM books_booktombstone), 0)
+    ) + 1)
+"""
+
+# Also run by later migrations that rebuild the table, which drops them.
+SQLITE_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_book_change_seq_insert AFTER INSERT ON books_book
+    BEGIN
+        UPDATE books_book SET change_seq = {SQLITE_NEXT_SEQ} WHERE id = NEW.id;
+    END
+    """,
+    # Does not fire itself again: SQLite's recursive_triggers is off.
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_book_change_seq_update AFTER UPDATE ON books_book
+    BEGIN
+        UPDATE books_book SET change_seq = {SQLITE_NEXT_SEQ} WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_book_tombstone_insert AFTER DELETE ON books_book
+    BEGIN
+        INSERT INTO books_booktombstone (book_id, change_seq, deleted_at)
+        VALUES (OLD.id, {SQLITE_NEXT_SEQ}, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+)
+
+SQLITE_FORWARDS = ("UPDATE books_book SET change_seq = id", *SQLITE_TRIGGERS)
+
+SQLITE_BACKWARDS = (
+    "DROP TRIGGER IF EXISTS books_book_tombstone_insert",
+    "DROP TRIGGER IF EXISTS books_book_change_seq_update",
+    "DROP TRIGGER IF EXISTS books_book_change_seq_insert",
+)
+
+
+def create_change_tracking(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {"postgresql": POSTGRESQL_FORWARDS, "sqlite": SQLITE_FORWARDS}
+    for statement in statements.get(vendor, ()):
+        schema_editor.execute(statement)
+
+
+def drop_change_tracking(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {"postgresql": POSTGRESQL_BACKWARDS, "sqlite": SQLITE_BACKWARDS}
+    for statement in statements.get(vendor, ()):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_title_author_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("book_id", models.BigIntegerField()),
+                ("change_seq", models.BigIntegerField()),
+                ("deleted_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="change_seq",
+            field=models.BigIntegerField(db_default=0, editable=False),
+        ),
+        migrations.RunPython(create_change_tracking, drop_change_tracking),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["change_seq", "id"], name="book_change_seq_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="booktombstone",
+            index=models.Index(
+                fields=["change_seq", "book_id"], name="book_tombstone_seq_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:12
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+change_seq = import_module("books.migrations.0005_change_seq")
+
+
+def restore_sqlite_triggers(apps, schema_editor):
+    # SQLite adds a column with a CHECK constraint by rebuilding the table,
+    # which drops the change tracking triggers.
+    if schema_editor.connection.vendor == "sqlite":
+        for statement in change_seq.SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0005_change_seq"),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_sqlite_triggers),
+        migrations.AddField(
+            model_name="book",
+            name="checked_out",
+            field=models.PositiveIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.RunPython(restore_sqlite_triggers, migrations.RunPython.noop),
+    ]
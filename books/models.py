@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 
@@ -11,6 +12,38 @@ class Book(models.Model):
     cover = models.CharField(max_length=4, choices=Cover.choices, default=Cover.HARD)
     inventory = models.PositiveIntegerField()
     daily_fee = models.DecimalField(decimal_places=2, max_digits=10)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Maintained by a database trigger on PostgreSQL, see books.search.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Copies out on loan, kept by borrowings.models.
+    checked_out = models.PositiveIntegerField(default=0, db_default=0, editable=False)
+    # Set by database triggers on every write, see books.changes.
+    change_seq = models.BigIntegerField(db_default=0, editable=False)
+
+    class Meta:
+        indexes = (
+            # Lookup key of ``import_books --upsert``.
+            models.Index(fields=("title", "author"), name="book_title_author_idx"),
+            models.Index(fields=("change_seq", "id"), name="book_change_seq_idx"),
+        )
 
     def __str__(self):
         return f"Book: {self.title}, author: {self.author}"
+
+
+class BookTombstone(models.Model):
+    """A deleted book, written by a database trigger, see books.changes."""
+
+    book_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("change_seq", "book_id"), name="book_tombstone_seq_idx"
+            ),
+        )
+
+    def __str__(self):
+        return f"Deleted book {self.book_id}"
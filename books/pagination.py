@@ -0,0 +1,16 @@
+from library_service.pagination import KeysetPagination
+
+
+class BookPagination(KeysetPagination):
+    """Pages by id; search results (``?q=``) are always paged, best match first."""
+
+    ordering = ("id",)
+    search_ordering = ("-rank", "id")
+
+    def is_requested(self, request):
+        return "q" in request.query_params or super().is_requested(request)
+
+    def get_ordering(self, request, queryset, view):
+        if "rank" in queryset.query.annotations:
+            return self.search_ordering
+        return self.ordering
@@ -0,0 +1,73 @@
+"""
+Catalog search over ``Book.title`` and ``Book.author``.
+
+On PostgreSQL matches come from the GIN-indexed ``search_vector`` column,
+which a trigger keeps in sync with title and author, plus trigram
+similarity on both columns to catch typos when ``pg_trgm`` is installed.
+Other databases fall back to a case-insensitive prefix match served by
+``lower(title)`` / ``lower(author)`` expression indexes. Both paths
+annotate a ``rank`` to order results by.
+"""
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Greatest, Lower
+
+SEARCH_CONFIG = "english"
+
+_trigram_available = {}
+
+
+def search_books(queryset, query):
+    """Filter ``queryset`` to books matching ``query`` and annotate ``rank``."""
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        return _search_postgresql(queryset, query, connection)
+    return _search_prefix(queryset, query)
+
+
+def has_trigram(connection):
+    if connection.vendor != "postgresql":
+        return False
+    if connection.alias not in _trigram_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available[connection.alias] = cursor.fetchone() is not None
+    return _trigram_available[connection.alias]
+
+
+def _search_postgresql(queryset, query, connection):
+    ts_query = SearchQuery(query, search_type="websearch", config=SEARCH_CONFIG)
+    rank = SearchRank(F("search_vector"), ts_query)
+    condition = Q(search_vector=ts_query)
+
+    if has_trigram(connection):
+        condition |= Q(title__trigram_similar=query) | Q(author__trigram_similar=query)
+        rank = rank + Greatest(
+            TrigramSimilarity("title", query), TrigramSimilarity("author", query)
+        )
+
+    # ts_rank() is a float4; widen it so cursor values round-trip exactly.
+    return queryset.annotate(rank=Cast(rank, FloatField())).filter(condition)
+
+
+def _search_prefix(queryset, query):
+    prefix = query.strip().lower()
+    end = prefix + "\U0010ffff"
+    queryset = queryset.annotate(
+        title_lower=Lower("title"), author_lower=Lower("author")
+    )
+    title_match = Q(title_lower__gte=prefix, title_lower__lt=end)
+    author_match = Q(author_lower__gte=prefix, author_lower__lt=end)
+    return queryset.annotate(
+        rank=Case(
+            When(title_match, then=Value(1.0)),
+            default=Value(0.5),
+            output_field=FloatField(),
+        )
+    ).filter(title_match | author_match)
@@ -7,4 +7,20 @@ class BookSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Book
-        fields = ("id", "title", "author", "cover", "inventory", "daily_fee")
+        fields = (
+            "id",
+            "title",
+            "author",
+            "cover",
+            "inventory",
+            "checked_out",
+            "daily_fee",
+        )
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Borrows and returns change the counters after the instance is read;
+        # saving every field would write back the copies it saw.
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
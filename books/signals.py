@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from books import stream
+from books.cache import bump_catalog_version, catalog_changed
+from books.models import Book
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_catalog_cache(sender, using, **kwargs):
+    bump_catalog_version(using)
+
+
+@receiver(catalog_changed)
+def wake_stream_broadcasters(sender, **kwargs):
+    stream.wake()
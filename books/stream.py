@@ -0,0 +1,239 @@
+"""
+Server-sent events of book inventory changes.
+
+``GET /api/books/stream/`` keeps the response open and pushes ``inventory``
+events, each a JSON list of ``{"id": ..., "inventory": ...}`` deltas, as
+copies are borrowed, returned or edited. With ``?ids=1,2,3`` a client
+only hears about those books, and gets their current inventory first.
+
+Each worker runs one ``Broadcaster`` per event loop. While anyone
+listens, it asks the database for books updated since its last poll
+(``updated_at`` is indexed) and fans the changes out to every
+subscriber, so the database sees one query per poll however many
+clients are connected. Catalog changes made in this worker wake it
+early; changes from other workers arrive within
+``BOOK_STREAM["POLL_INTERVAL"]``. Rows are re-read for
+``BOOK_STREAM["COMMIT_LAG"]`` seconds, so a transaction that commits
+after a later one is not missed, and only changed inventories go out.
+
+A client that falls behind is sent the latest inventory of each book
+rather than every step in between. When a client disconnects, Django
+cancels its response and the subscription is dropped. Streams end after
+``BOOK_STREAM["MAX_AGE"]`` seconds; EventSource reconnects on its own,
+which also spreads clients over restarted workers.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import weakref
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, router
+from django.utils.timezone import now
+
+from books.models import Book
+
+logger = logging.getLogger(__name__)
+
+# Least time between two polls, however often writes wake the broadcaster.
+MIN_POLL_GAP = 0.05
+
+
+class Subscription:
+    """Changes not yet sent to one client, only the latest per book."""
+
+    def __init__(self, book_ids):
+        self.book_ids = book_ids
+        # Book id -> (inventory, updated_at).
+        self.pending = {}
+        self.ready = asyncio.Event()
+        # updated_at of the last value queued per book, so that a poll read
+        # before the initial snapshot cannot overwrite it. Only kept for a
+        # subset of books.
+        self.versions = {}
+
+    def push(self, changes):
+        if self.book_ids is None:
+            self.pending.update(changes)
+        else:
+            for book_id in self.book_ids.intersection(changes):
+                change = changes[book_id]
+                version = self.versions.get(book_id)
+                if version is None or change[1] > version:
+                    self.versions[book_id] = change[1]
+                    self.pending[book_id] = change
+        if self.pending:
+            self.ready.set()
+
+    def snapshot(self, rows):
+        """Take ``(id, inventory, updated_at)`` rows as sent to the client."""
+        for book_id, inventory, updated_at in rows:
+            version = self.versions.get(book_id)
+            if version is None or updated_at >= version:
+                self.versions[book_id] = updated_at
+                self.pending.pop(book_id, None)
+
+    async def get(self, timeout):
+        """Changes since the last call; empty if none came within ``timeout``."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except TimeoutError:
+            return {}
+        self.ready.clear()
+        changes, self.pending = self.pending, {}
+        return changes
+
+
+class Broadcaster:
+    def __init__(self):
+        self.subscribers = set()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.since = None
+        # Book id -> (inventory, updated_at) of rows read within COMMIT_LAG.
+        self.seen = {}
+
+    def subscribe(self, book_ids=None):
+        subscription = Subscription(book_ids)
+        self.subscribers.add(subscription)
+        if self.task is None:
+            self.since = now()
+            # A fresh context: the first subscriber's request must not own
+            # the task's thread-sensitive executor.
+            self.task = asyncio.create_task(self.run(), context=contextvars.Context())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.seen = {}
+
+    async def run(self):
+        config = settings.BOOK_STREAM
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), config["POLL_INTERVAL"])
+            except TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                changes = await sync_to_async(self.poll)(
+                    timedelta(seconds=config["COMMIT_LAG"])
+                )
+            except Exception:
+                logger.exception("Polling book inventory changes failed")
+                changes = None
+            if changes:
+                for subscription in self.subscribers:
+                    subscription.push(changes)
+            await asyncio.sleep(MIN_POLL_GAP)
+
+    def poll(self, lag):
+        """Inventories changed since the last poll, as ``push`` takes them."""
+        started = now()
+        db = router.db_for_read(Book)
+        try:
+            rows = list(
+                Book.objects.using(db)
+                .filter(updated_at__gte=self.since - lag)
+                .values_list("id", "inventory", "updated_at")
+            )
+        finally:
+            # As at the end of a request; tests hold it in a transaction.
+            connection = connections[db]
+            if not connection.in_atomic_block:
+                connection.close_if_unusable_or_obsolete()
+
+        changes = {}
+        for book_id, inventory, updated_at in rows:
+            seen = self.seen.get(book_id)
+            if seen is None or seen[0] != inventory:
+                changes[book_id] = (inventory, updated_at)
+            self.seen[book_id] = (inventory, updated_at)
+        self.since = started
+        cutoff = started - lag
+        self.seen = {
+            book_id: seen for book_id, seen in self.seen.items() if seen[1] >= cutoff
+        }
+        return changes
+
+
+_broadcasters = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_broadcaster():
+    """The running event loop's broadcaster."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        broadcaster = _broadcasters.get(loop)
+        if broadcaster is None:
+            broadcaster = _broadcasters[loop] = Broadcaster()
+    return broadcaster
+
+
+def wake():
+    """Make every broadcaster with subscribers poll now; any thread may call it."""
+    with _lock:
+        broadcasters = list(_broadcasters.items())
+    for loop, broadcaster in broadcasters:
+        if broadcaster.subscribers:
+            try:
+                loop.call_soon_threadsafe(broadcaster.wakeup.set)
+            except RuntimeError:
+                # The loop has been closed.
+                pass
+
+
+def _reset():
+    global _broadcasters, _lock
+    _broadcasters = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset)
+
+
+def format_event(changes):
+    data = json.dumps(
+        [
+            {"id": book_id, "inventory": inventory}
+            for book_id, (inventory, _) in changes.items()
+        ]
+    )
+    return f"event: inventory\ndata: {data}\n\n"
+
+
+async def events(broadcaster, book_ids):
+    """The body of one stream response."""
+    config = settings.BOOK_STREAM
+    subscription = broadcaster.subscribe(book_ids)
+    try:
+        yield f"retry: {int(config['RETRY'] * 1000)}\n\n"
+        if book_ids:
+            rows = [
+                row
+                async for row in Book.objects.filter(pk__in=book_ids).values_list(
+                    "id", "inventory", "updated_at"
+                )
+            ]
+            subscription.snapshot(rows)
+            if rows:
+                yield format_event({row[0]: row[1:] for row in rows})
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config["MAX_AGE"]
+        while (remaining := deadline - loop.time()) > 0:
+            changes = await subscription.get(min(config["HEARTBEAT"], remaining))
+            # A comment line keeps proxies from timing the stream out.
+            yield format_event(changes) if changes else ": keepalive\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -1,14 +1,54 @@
-from django.contrib.auth import get_user_model
+import asyncio
+import json
+import re
+import tempfile
+from contextlib import AsyncExitStack, suppress
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished, request_started
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Count, F
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.timezone import now
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
+from books.management.commands.bench_endpoints import (
+    ENDPOINTS,
+    SKIPPED_ROUTES,
+    api_routes,
+)
+from books import stream
 from books.models import Book
+from books.serializers import BookSerializer
+from books.views import BookViewSet
+from borrowings.models import LOAN_COUNTERS, Borrowing, Hold
+from library_service import metrics
+from library_service.asgi import application
+from library_service.fastpath import values_plan
 
 
 class BooksApiTests(APITestCase):
     def setUp(self):
         self.list_url = reverse("books:book-list")
+        cache.clear()
 
     def _create_user(
         self, email="user@example.com", password="testpass123", is_staff=False
@@ -82,3 +122,661 @@ class BooksApiTests(APITestCase):
 
         delete_res = self.client.delete(detail_url)
         self.assertEqual(delete_res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_staff_update_keeps_copies_borrowed_meanwhile(self):
+        book = self._create_book(inventory=5)
+        reader = self._create_user()
+        self.client.force_authenticate(
+            user=self._create_user(email="staff@example.com", is_staff=True)
+        )
+        get_object = BookViewSet.get_object
+
+        def borrow_after_reading(view):
+            instance = get_object(view)
+            Borrowing.objects.borrow(reader, book.id, now().date() + timedelta(days=7))
+            return instance
+
+        with mock.patch.object(BookViewSet, "get_object", borrow_after_reading):
+            res = self.client.patch(
+                reverse("books:book-detail", args=[book.id]), {"title": "Renamed"}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        book.refresh_from_db()
+        self.assertEqual(
+            (book.title, book.inventory, book.checked_out), ("Renamed", 4, 1)
+        )
+
+    def test_books_list_keyset_pagination(self):
+        books = [self._create_book(title=f"Book {i}") for i in range(5)]
+        self.client.force_authenticate(user=self._create_user())
+
+        seen = []
+        url = self.list_url + "?page_size=2"
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                res = self.client.get(url)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertLessEqual(len(res.data["results"]), 2)
+                seen += [item["id"] for item in res.data["results"]]
+                url = res.data["next"]
+
+        self.assertEqual(seen, [book.id for book in books])
+        self.assertFalse(
+            any("COUNT(" in query["sql"].upper() for query in queries.captured_queries)
+        )
+
+    def test_async_and_sync_book_reads_match(self):
+        book = self._create_book()
+        headers = {"Authorize": f"Bearer {AccessToken.for_user(self._create_user())}"}
+        detail_url = reverse("books:book-detail", args=[book.id])
+        # The async views only serve ASGI requests, as the async client sends.
+        get = {
+            True: async_to_sync(self.async_client.get),
+            False: self.client.get,
+        }
+
+        responses = {}
+        for async_views in (True, False):
+            cache.clear()
+            with self.settings(ASYNC_VIEWS=async_views):
+                responses[async_views] = [
+                    get[async_views](url, headers=headers)
+                    for url in (self.list_url, detail_url)
+                ]
+
+        for async_res, sync_res in zip(responses[True], responses[False]):
+            self.assertEqual(async_res.status_code, status.HTTP_200_OK)
+            self.assertEqual(async_res.data, sync_res.data)
+        # The list ETag follows the catalog version, which cache.clear() resets.
+        self.assertEqual(responses[True][1]["ETag"], responses[False][1]["ETag"])
+
+    def test_wsgi_requests_use_sync_views(self):
+        self.client.force_authenticate(user=self._create_user())
+
+        with mock.patch.object(BookViewSet, "alist") as alist:
+            res = self.client.get(self.list_url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        alist.assert_not_called()
+
+    def test_books_list_invalid_cursor(self):
+        self.client.force_authenticate(user=self._create_user())
+
+        res = self.client.get(self.list_url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_books_by_title_and_author(self):
+        dune = self._create_book(title="Dune", author="Frank Herbert")
+        emma = self._create_book(title="Emma", author="Jane Austen")
+        self._create_book(title="Persuasion", author="Someone Else")
+        self.client.force_authenticate(user=self._create_user())
+
+        by_title = self.client.get(self.list_url, {"q": "dune"})
+        by_author = self.client.get(self.list_url, {"q": "Jane Austen"})
+
+        self.assertEqual(by_title.status_code, status.HTTP_200_OK)
+        self.assertEqual([b["id"] for b in by_title.data["results"]], [dune.id])
+        self.assertEqual([b["id"] for b in by_author.data["results"]], [emma.id])
+
+    def test_search_results_are_paginated(self):
+        for i in range(3):
+            self._create_book(title=f"Dune {i}")
+        self.client.force_authenticate(user=self._create_user())
+
+        first = self.client.get(self.list_url, {"q": "dune", "page_size": 2})
+        second = self.client.get(first.data["next"])
+
+        self.assertEqual(len(first.data["results"]), 2)
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertIsNone(second.data["next"])
+
+    def test_books_list_values_path_matches_serializer_bytes(self):
+        self._create_book(title="Plain", daily_fee="10.5")
+        self._create_book(title="Ünïcode \u2028 line", cover="SOFT", daily_fee="0.01")
+        self.client.force_authenticate(user=self._create_user())
+        expected = BookSerializer(Book.objects.order_by("id"), many=True).data
+
+        res = self.client.get(self.list_url)
+        page = self.client.get(self.list_url, {"page_size": 1})
+
+        self.assertIsNotNone(values_plan(BookSerializer))
+        self.assertEqual(res.content, JSONRenderer().render(expected))
+        self.assertEqual(
+            page.content,
+            JSONRenderer().render({"next": page.data["next"], "results": expected[:1]}),
+        )
+
+    def test_books_list_is_served_from_cache(self):
+        self._create_book()
+        self.client.force_authenticate(user=self._create_user())
+
+        first = self.client.get(self.list_url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.list_url)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_book_cache_invalidated_by_borrowing(self):
+        book = self._create_book(inventory=2)
+        user = self._create_user()
+        self.client.force_authenticate(user=user)
+        detail_url = reverse("books:book-detail", args=[book.id])
+
+        self.assertEqual(self.client.get(detail_url).data["inventory"], 2)
+        self.client.post(
+            reverse("borrowings:borrowings-list"),
+            {
+                "book_id": book.id,
+                "expected_return_date": now().date() + timedelta(days=3),
+            },
+        )
+
+        self.assertEqual(self.client.get(detail_url).data["inventory"], 1)
+
+    def test_staff_can_read_cache_stats(self):
+        self._create_book()
+        self.client.force_authenticate(user=self._create_user(is_staff=True))
+        stats_url = reverse("books:book-cache-stats")
+        before = self.client.get(stats_url).data
+
+        self.client.get(self.list_url)
+        self.client.get(self.list_url)
+        after = self.client.get(stats_url).data
+
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(after["hits"] - before["hits"], 1)
+
+    def test_staff_can_read_db_pool_stats(self):
+        url = reverse("db-pool-stats")
+        self.client.force_authenticate(user=self._create_user())
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self._create_user("s@x.com", is_staff=True))
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        if res.data["pooled"]:
+            self.assertGreaterEqual(res.data["in_use"], 1)
+            self.assertLessEqual(res.data["size"], res.data["max_size"])
+
+    def test_metrics_report_route_status_and_queries(self):
+        self.client.force_authenticate(user=self._create_user())
+        self.client.get(self.list_url)
+        self.client.force_authenticate(user=None)
+        self.client.get(self.list_url)
+        metrics_url = reverse("metrics")
+
+        with self.settings(METRICS={**settings.METRICS, "TOKEN": "s3cret"}):
+            denied = self.client.get(metrics_url)
+            res = self.client.get(metrics_url, HTTP_AUTHORIZATION="Bearer s3cret")
+
+        self.assertEqual(denied.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res["Content-Type"], metrics.CONTENT_TYPE)
+        text = res.content.decode()
+        labels = 'route="books:book-list",method="GET"'
+        self.assertIn(f'library_http_requests_total{{{labels},status="200"}}', text)
+        self.assertIn(f'library_http_requests_total{{{labels},status="401"}}', text)
+        queries = re.search(
+            rf"^library_http_request_db_queries_sum{{{labels}}} (\d+)$", text, re.M
+        )
+        self.assertGreater(int(queries.group(1)), 0)
+        self.assertIn(
+            f'library_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}', text
+        )
+
+    def test_metrics_add_up_worker_snapshots(self):
+        self.client.force_authenticate(user=self._create_user())
+        self.client.get(self.list_url)
+        own = next(
+            entry
+            for entry in metrics.registry.snapshot()
+            if entry["route"] == "books:book-list" and entry["method"] == "GET"
+        )
+        other = {**own, "statuses": {"200": 5, "500": 1}}
+
+        with tempfile.TemporaryDirectory() as directory:
+            Path(directory, "other-worker.json").write_text(json.dumps([other]))
+            with self.settings(METRICS={**settings.METRICS, "DIR": directory}):
+                text = metrics.render()
+
+        labels = 'route="books:book-list",method="GET"'
+        total = own["statuses"]["200"] + 5
+        self.assertIn(
+            f'library_http_requests_total{{{labels},status="200"}} {total}', text
+        )
+        self.assertIn(f'library_http_requests_total{{{labels},status="500"}} 1', text)
+
+    def test_book_detail_etag_not_modified(self):
+        book = self._create_book()
+        self.client.force_authenticate(user=self._create_user())
+        detail_url = reverse("books:book-detail", args=[book.id])
+
+        res = self.client.get(detail_url)
+        etag = res["ETag"]
+        with self.assertNumQueries(1):
+            cached = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached["ETag"], etag)
+
+        book.inventory = 7
+        book.save()
+        changed = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_book_detail_malformed_pk_is_not_found(self):
+        self.client.force_authenticate(user=self._create_user())
+
+        res = self.client.get(self.list_url + "abc/")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ImportBooksTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, content):
+        path = Path(self.tmp.name) / name
+        path.write_text(content)
+        return str(path)
+
+    def test_import_csv_rejects_invalid_rows(self):
+        path = self._write(
+            "books.csv",
+            "title,author,cover,inventory,daily_fee\n"
+            "Dune,Frank Herbert,SOFT,4,1.25\n"
+            "Emma,Jane Austen,,2,0.50\n"
+            "Bad Cover,Someone,LEATHER,1,1.00\n"
+            "Bad Fee,Someone,HARD,1,1.005\n",
+        )
+        errors = str(Path(self.tmp.name) / "errors.jsonl")
+
+        call_command(
+            "import_books", path, batch_size=1, errors=errors, stdout=StringIO()
+        )
+
+        self.assertEqual(
+            set(Book.objects.values_list("title", "cover")),
+            {("Dune", "SOFT"), ("Emma", "HARD")},
+        )
+        rejected = [json.loads(line) for line in Path(errors).read_text().splitlines()]
+        self.assertEqual([row["line"] for row in rejected], [4, 5])
+        self.assertIn("cover", rejected[0]["errors"])
+        self.assertIn("daily_fee", rejected[1]["errors"])
+
+    def test_import_jsonl_upsert_by_title_and_author(self):
+        Book.objects.create(
+            title="Dune", author="Frank Herbert", inventory=1, daily_fee="1.00"
+        )
+        path = self._write(
+            "books.jsonl",
+            '{"title": "Dune", "author": "Frank Herbert", "inventory": 9, '
+            '"daily_fee": "2.00"}\n'
+            '{"title": "Emma", "author": "Jane Austen", "inventory": 2, '
+            '"daily_fee": "0.50"}\n'
+            "not json\n",
+        )
+        out = StringIO()
+
+        call_command("import_books", path, upsert=True, stdout=out)
+
+        self.assertEqual(Book.objects.count(), 2)
+        dune = Book.objects.get(title="Dune")
+        self.assertEqual((dune.inventory, str(dune.daily_fee)), (9, "2.00"))
+        self.assertIn("1 created, 1 updated, 1 rejected", out.getvalue())
+
+    def test_import_restock_serves_waiting_holds(self):
+        book = Book.objects.create(
+            title="Dune", author="Frank Herbert", inventory=0, daily_fee="1.00"
+        )
+        user = get_user_model().objects.create_user(
+            email="reader@example.com", password="pass1234"
+        )
+        hold = Hold.objects.place(user, book.id)
+        path = self._write(
+            "books.csv",
+            "title,author,cover,inventory,daily_fee\nDune,Frank Herbert,HARD,3,1.00\n",
+        )
+
+        call_command("import_books", path, upsert=True, stdout=StringIO())
+
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Hold.Status.READY)
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 2)
+
+
+class SeedLibraryTests(TestCase):
+    def seed(self, **options):
+        call_command(
+            "seed_library",
+            books=50,
+            users=10,
+            borrowings=400,
+            batch_size=64,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_seeds_reproducible_loans_for_users_who_can_log_in(self):
+        self.seed()
+        self.seed()
+
+        self.assertEqual(Book.objects.count(), 100)
+        self.assertEqual(get_user_model().objects.count(), 20)
+        self.assertEqual(Borrowing.objects.count(), 800)
+        titles = list(Book.objects.order_by("pk").values_list("title", flat=True))
+        self.assertEqual(titles[:50], titles[50:])
+
+        active = Borrowing.objects.filter(actual_return_date__isnull=True)
+        self.assertTrue(0 < active.count() < 200)
+        self.assertFalse(
+            Borrowing.objects.filter(actual_return_date__lt=F("borrow_date")).exists()
+        )
+        for model, (field, key) in LOAN_COUNTERS.items():
+            counters = model.objects.filter(**{f"{field}__gt": 0})
+            self.assertEqual(
+                dict(counters.values_list("pk", field)),
+                dict(active.order_by().values_list(key).annotate(Count("id"))),
+            )
+        user = get_user_model().objects.order_by("pk").last()
+        self.assertEqual(user.email, "patron20@seed.library.test")
+        self.assertEqual(authenticate(email=user.email, password="password"), user)
+
+    def test_popular_books_take_most_loans(self):
+        self.seed(popularity=1.5)
+
+        loans_per_book = sorted(
+            Book.objects.annotate(loans=Count("records")).values_list(
+                "loans", flat=True
+            ),
+            reverse=True,
+        )
+        self.assertGreater(sum(loans_per_book[:5]), 400 / 2)
+
+
+@mock.patch("books.management.commands.wait_for_db.connections")
+@mock.patch("books.management.commands.wait_for_db.time")
+class WaitForDbTests(SimpleTestCase):
+    def test_retries_with_exponential_backoff(self, time, connections):
+        time.monotonic.return_value = 0
+        connections.__getitem__().ensure_connection.side_effect = [
+            OperationalError,
+            OperationalError,
+            OperationalError,
+            None,
+        ]
+
+        call_command("wait_for_db", initial_delay=1, max_delay=3, stdout=StringIO())
+
+        self.assertEqual(
+            [call.args[0] for call in time.sleep.call_args_list], [1, 2, 3]
+        )
+
+    def test_gives_up_at_the_deadline(self, time, connections):
+        time.monotonic.side_effect = [0, 4, 10]
+        connections.__getitem__().ensure_connection.side_effect = OperationalError
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "wait_for_db",
+                timeout=10,
+                initial_delay=8,
+                max_delay=30,
+                stdout=StringIO(),
+            )
+
+        # The last wait is cut short to end at the deadline.
+        time.sleep.assert_called_once_with(6)
+
+
+@override_settings(
+    BOOK_STREAM={
+        **settings.BOOK_STREAM,
+        "POLL_INTERVAL": 0.05,
+        "COMMIT_LAG": 60.0,
+        "HEARTBEAT": 5.0,
+    }
+)
+class BookStreamTests(TestCase):
+    def setUp(self):
+        self.dune, self.emma = (
+            Book.objects.create(title=title, author="A", inventory=2, daily_fee="1.00")
+            for title in ("Dune", "Emma")
+        )
+        self.url = reverse("books:book-stream")
+        user = get_user_model().objects.create_user(
+            email="reader@example.com", password="pass1234"
+        )
+        self.token = str(AccessToken.for_user(user))
+        self.headers = {"Authorize": f"Bearer {self.token}"}
+
+    async def _open(self, streams, query):
+        response = await self.async_client.get(self.url, query, headers=self.headers)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = response.streaming_content
+        streams.push_async_callback(self._hang_up, content)
+        self.assertTrue((await anext(content)).startswith(b"retry:"))
+        return content
+
+    @staticmethod
+    async def _hang_up(content):
+        # What Django does when the client disconnects: cancel the task
+        # waiting for the next event.
+        reading = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0.01)
+        reading.cancel()
+        with suppress(asyncio.CancelledError, StopAsyncIteration):
+            await reading
+
+    @staticmethod
+    async def _next_event(content):
+        while True:
+            chunk = (await anext(content)).decode()
+            if chunk.startswith("event: inventory"):
+                return json.loads(chunk.split("data: ", 1)[1])
+
+    async def test_streams_snapshot_then_changes_of_followed_books(self):
+        async with AsyncExitStack() as streams:
+            content = await self._open(streams, {"ids": f"{self.dune.id},999"})
+            self.assertEqual(
+                await self._next_event(content),
+                [{"id": self.dune.id, "inventory": 2}],
+            )
+
+            await Book.objects.filter(pk=self.emma.pk).aupdate(
+                inventory=0, updated_at=now()
+            )
+            await Book.objects.filter(pk=self.dune.pk).aupdate(
+                inventory=1, updated_at=now()
+            )
+
+            self.assertEqual(
+                await self._next_event(content),
+                [{"id": self.dune.id, "inventory": 1}],
+            )
+
+    async def test_one_poll_serves_every_client_and_leaving_stops_it(self):
+        async with AsyncExitStack() as streams:
+            everything = await self._open(streams, {})
+            followers = [
+                await self._open(streams, {"ids": self.emma.id}) for _ in range(3)
+            ]
+            for content in followers:
+                await self._next_event(content)
+            broadcaster = stream.get_broadcaster()
+            self.assertEqual(len(broadcaster.subscribers), 4)
+
+            with mock.patch.object(broadcaster, "poll", wraps=broadcaster.poll) as poll:
+                await Book.objects.filter(pk=self.emma.pk).aupdate(
+                    inventory=5, updated_at=now()
+                )
+                events = [await self._next_event(content) for content in followers]
+            self.assertLess(poll.call_count, 3)
+            self.assertEqual(events, [[{"id": self.emma.id, "inventory": 5}]] * 3)
+            self.assertIn(
+                {"id": self.emma.id, "inventory": 5},
+                await self._next_event(everything),
+            )
+
+        self.assertEqual(broadcaster.subscribers, set())
+        self.assertIsNone(broadcaster.task)
+
+    async def test_rejects_malformed_ids(self):
+        response = await self.async_client.get(
+            self.url, {"ids": "1,two"}, headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_requires_authentication(self):
+        for headers in ({}, {"Authorize": "Bearer not-a-token"}):
+            response = await self.async_client.get(self.url, headers=headers)
+
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+        self.assertEqual(stream.get_broadcaster().subscribers, set())
+
+    async def test_asgi_application_sends_events_while_the_stream_is_open(self):
+        # The deployed entry point, not the test client: events must reach
+        # the client as they happen rather than when the stream ends.
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": self.url,
+            "query_string": f"ids={self.dune.id}".encode(),
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorize", f"Bearer {self.token}".encode()),
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        # As the test client does: closing the connection between requests
+        # would end the test's transaction.
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        requests = asyncio.Queue()
+        await requests.put({"type": "http.request", "body": b"", "more_body": False})
+        sent = asyncio.Queue()
+        serving = asyncio.ensure_future(application(scope, requests.get, sent.put))
+
+        async def next_event():
+            while True:
+                message = await asyncio.wait_for(sent.get(), 5)
+                self.assertTrue(message.get("more_body"), "the stream ended")
+                if message["body"].startswith(b"event: inventory"):
+                    return json.loads(message["body"].split(b"data: ", 1)[1])
+
+        try:
+            start = await asyncio.wait_for(sent.get(), 5)
+            self.assertEqual(start["status"], 200)
+            self.assertEqual(await next_event(), [{"id": self.dune.id, "inventory": 2}])
+            await Book.objects.filter(pk=self.dune.pk).aupdate(
+                inventory=1, updated_at=now()
+            )
+            self.assertEqual(await next_event(), [{"id": self.dune.id, "inventory": 1}])
+        finally:
+            await requests.put({"type": "http.disconnect"})
+            await asyncio.wait_for(serving, 5)
+
+
+# Committed for real: on PostgreSQL, tokens depend on which transactions
+# are still running.
+class BookChangesTests(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = get_user_model().objects.create_user(
+            email="staff@example.com", password="testpass123", is_staff=True
+        )
+        self.client.force_authenticate(user=self.staff)
+        self.url = reverse("books:book-changes")
+        self.books = [
+            Book.objects.create(
+                title=f"Book {i}", author="A", inventory=2, daily_fee="1.00"
+            )
+            for i in range(3)
+        ]
+
+    def _sync(self, token="", page_size=1000):
+        """Follow ``next`` until the end; return books, deleted ids, token."""
+        books, deleted = {}, []
+        while True:
+            res = self.client.get(self.url, {"since": token, "page_size": page_size})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            books.update((book["id"], book) for book in res.data["books"])
+            deleted += res.data["deleted"]
+            token = res.data["next"]
+            if not res.data["has_more"]:
+                return books, deleted, token
+
+    def test_changes_since_token_are_writes_and_deletes_only(self):
+        first, second, third = self.books
+        books, _, token = self._sync(page_size=2)
+        self.assertEqual(set(books), {book.id for book in self.books})
+        self.assertEqual(books[first.id]["daily_fee"], "1.00")
+
+        self.client.patch(
+            reverse("books:book-detail", args=[first.id]), {"title": "Renamed"}
+        )
+        self.client.delete(reverse("books:book-detail", args=[second.id]))
+        Borrowing.objects.borrow(self.staff, third.id, now().date() + timedelta(days=7))
+        added = Book.objects.create(
+            title="New", author="B", inventory=1, daily_fee="2.00"
+        )
+
+        with self.assertNumQueries(3):
+            res = self.client.get(self.url, {"since": token})
+        self.assertFalse(res.data["has_more"])
+        books = {book["id"]: book for book in res.data["books"]}
+        self.assertEqual(set(books), {first.id, third.id, added.id})
+        self.assertEqual(books[first.id]["title"], "Renamed")
+        self.assertEqual(books[third.id]["inventory"], 1)
+        self.assertEqual(res.data["deleted"], [second.id])
+
+        self.assertEqual(self._sync(res.data["next"])[:2], ({}, []))
+
+    def test_pages_follow_change_order_across_writes_and_deletes(self):
+        _, _, token = self._sync()
+        ids = [book.id for book in self.books]
+        self.books[0].delete()
+        self.books[2].save()
+        self.books[1].delete()
+
+        pages = []
+        has_more = True
+        while has_more:
+            res = self.client.get(self.url, {"since": token, "page_size": 1})
+            pages.append(
+                [("book", book["id"]) for book in res.data["books"]]
+                + [("deleted", book_id) for book_id in res.data["deleted"]]
+            )
+            token, has_more = res.data["next"], res.data["has_more"]
+
+        self.assertEqual(
+            [change for page in pages for change in page],
+            [("deleted", ids[0]), ("book", ids[2]), ("deleted", ids[1])],
+        )
+
+    def test_rejects_malformed_token(self):
+        res = self.client.get(self.url, {"since": "12.x"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EndpointBudgetTests(SimpleTestCase):
+    def test_every_api_route_has_a_benchmark_and_query_budget(self):
+        covered = {endpoint.route for endpoint in ENDPOINTS}
+
+        self.assertEqual(api_routes() - covered - set(SKIPPED_ROUTES), set())
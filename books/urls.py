@@ -1,11 +1,15 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from books.views import BookViewSet
+from books.views import BookViewSet, book_stream
 
 app_name = "books"
 
 router = DefaultRouter()
 router.register("", BookViewSet)
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    # Before the router, whose detail route would match "stream/".
+    path("stream/", book_stream, name="book-stream"),
+    path("", include(router.urls)),
+]
@@ -1,11 +1,173 @@
-from rest_framework import viewsets
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions, serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
 
+from books import cache, stream
+from books.changes import InvalidToken, changes_since
 from books.models import Book
+from books.pagination import BookPagination
 from books.permissions import IsOwnerOrReadOnly
+from books.search import has_trigram, search_books
 from books.serializers import BookSerializer
+from library_service.async_views import AsyncReadModelMixin
+from library_service.conditional import ConditionalGetMixin
+from library_service.fastpath import ValuesListMixin
+from library_service.replicas import ReplicaReadMixin
+from users.authentication import CachedJWTAuthentication
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    cache.CatalogCacheMixin,
+    ValuesListMixin,
+    AsyncReadModelMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = (IsOwnerOrReadOnly,)
+    pagination_class = BookPagination
+    changes_page_size = 1000
+    max_changes_page_size = 5000
+
+    def get_queryset(self):
+        queryset = self.queryset
+        query = self.request.query_params.get("q", "").strip()
+
+        if self.action == "list" and query:
+            queryset = search_books(queryset, query)
+
+        return queryset
+
+    def get_list_validator(self):
+        # Every change to the catalog bumps its version, deletes included.
+        return cache.catalog_version()
+
+    def get_object_validator(self):
+        return (
+            Book.objects.filter(pk=self.kwargs["pk"])
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        if request.query_params.get("q", "").strip():
+            # get_queryset() may look up pg_trgm once per process; do that
+            # off the event loop.
+            await sync_to_async(lambda: has_trigram(connections[Book.objects.db]))()
+        return await super().alist(request, *args, **kwargs)
+
+    async def aget_list_validator(self):
+        return await cache.acatalog_version()
+
+    async def aget_object_validator(self):
+        return (
+            await Book.objects.filter(pk=self.kwargs["pk"])
+            .values_list("updated_at", flat=True)
+            .afirst()
+        )
+
+    @action(detail=False, url_path="changes", url_name="changes", pagination_class=None)
+    def changes(self, request):
+        """
+        Books created or updated and ids of books deleted since ``?since=``,
+        oldest change first, for clients that keep a copy of the catalog.
+
+        Omit ``since`` for a full sync. Pass the returned ``next`` token on
+        the next call, at once while ``has_more`` is true. See
+        ``books.changes``.
+        """
+        try:
+            limit = int(request.query_params.get("page_size", self.changes_page_size))
+        except ValueError:
+            limit = self.changes_page_size
+        limit = min(max(limit, 1), self.max_changes_page_size)
+        try:
+            written, deleted, token, has_more = changes_since(
+                request.query_params.get("since", ""),
+                limit,
+                BookSerializer.Meta.fields,
+            )
+        except InvalidToken:
+            raise serializers.ValidationError({"since": ["Invalid token."]})
+        return Response(
+            {
+                "books": BookSerializer(written, many=True).data,
+                "deleted": deleted,
+                "next": token,
+                "has_more": has_more,
+            }
+        )
+
+    @action(
+        detail=False,
+        url_path="cache-stats",
+        url_name="cache-stats",
+        permission_classes=(IsAdminUser,),
+    )
+    def cache_stats(self, request):
+        """Hit/miss counters of the catalog cache in this worker."""
+        return Response(cache.stats.snapshot())
+
+
+def _unauthorized(request, authenticator, exc):
+    """The 401 DRF would answer ``exc`` with."""
+    detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+    response = JsonResponse(detail, status=exc.status_code)
+    response["WWW-Authenticate"] = authenticator.authenticate_header(request)
+    return response
+
+
+@require_GET
+async def book_stream(request):
+    """
+    Server-sent events of inventory changes, see ``books.stream``. Pass
+    ``?ids=1,2,3`` to follow only those books. Like the rest of the
+    catalog, it is only open to authenticated users.
+    """
+    authenticator = CachedJWTAuthentication()
+    try:
+        user_auth = await authenticator.aauthenticate(request)
+    except exceptions.AuthenticationFailed as exc:
+        return _unauthorized(request, authenticator, exc)
+    if user_auth is None:
+        return _unauthorized(request, authenticator, exceptions.NotAuthenticated())
+    request.user, request.auth = user_auth
+
+    config = settings.BOOK_STREAM
+    book_ids = None
+    if request.GET.get("ids"):
+        try:
+            book_ids = frozenset(int(i) for i in request.GET["ids"].split(","))
+        except ValueError:
+            return JsonResponse(
+                {"ids": ["Expected comma-separated book ids."]}, status=400
+            )
+        if len(book_ids) > config["MAX_IDS"]:
+            return JsonResponse(
+                {"ids": [f"Follow at most {config['MAX_IDS']} books per stream."]},
+                status=400,
+            )
+
+    broadcaster = stream.get_broadcaster()
+    if len(broadcaster.subscribers) >= config["MAX_CLIENTS"]:
+        response = JsonResponse(
+            {"detail": "Too many open streams, try again later."}, status=503
+        )
+        response["Retry-After"] = str(int(config["RETRY"]))
+        return response
+
+    response = StreamingHttpResponse(
+        stream.events(broadcaster, book_ids), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Keep nginx from buffering the events.
+    response["X-Accel-Buffering"] = "no"
+    return response
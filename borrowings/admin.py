@@ -1,8 +1,20 @@
 from django.contrib import admin
 
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, Hold, OverdueNotification
 
 
 @admin.register(Borrowing)
 class BorrowingAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(OverdueNotification)
+class OverdueNotificationAdmin(admin.ModelAdmin):
+    list_display = ("borrowing", "user", "created_at", "sent_at", "attempts")
+    list_filter = ("sent_at",)
+
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ("book", "user", "status", "created_at", "expires_at")
+    list_filter = ("status",)
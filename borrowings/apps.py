@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class BorrowingsConfig(AppConfig):
     name = "borrowings"
+
+    def ready(self):
+        import borrowings.signals  # noqa: F401
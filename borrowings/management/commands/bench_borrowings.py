@@ -0,0 +1,178 @@
+import logging
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from borrowings.models import Borrowing
+from library_service.benchmarks import benchmark_database, run_concurrently, summarize
+
+
+class LegacyBorrowingCreateSerializer(serializers.ModelSerializer):
+    """The read-modify-write borrow path, kept for comparison only."""
+
+    book_id = serializers.PrimaryKeyRelatedField(
+        queryset=Book.objects.all(), source="book"
+    )
+
+    class Meta:
+        model = Borrowing
+        fields = ("book_id", "expected_return_date")
+
+    def validate(self, attrs):
+        if attrs["book"].inventory <= 0:
+            raise serializers.ValidationError({"book_id": "This book is out of stock"})
+        return attrs
+
+    def create(self, validated_data):
+        borrowing = Borrowing.objects.create(
+            user=self.context["request"].user,
+            borrow_date=now().date(),
+            **validated_data,
+        )
+        book = borrowing.book
+        book.inventory -= 1
+        book.save(update_fields=("inventory",))
+        return borrowing
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks POST /api/borrowings/.
+
+    The "concurrency" scenario fires parallel single-book POSTs and checks
+    stock accounting. Run it with --stock below --requests to provoke
+    overselling, and with --stock at or above --requests to compare pure
+    borrow throughput. The "batch" scenario checks out --batch-size books
+    per patron, once as separate POSTs and once as a single list POST.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario", choices=("concurrency", "batch"), default="concurrency"
+        )
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--stock", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument("--rounds", type=int, default=100)
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        # Rejected borrows are expected here; keep 400 warnings off the report.
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+
+        # A bench patron borrows far more than the per-patron limit allows.
+        with benchmark_database(keepdb=options["keepdb"]), override_settings(
+            MAX_ACTIVE_BORROWINGS=10**6
+        ):
+            users = get_user_model().objects.bulk_create(
+                get_user_model()(
+                    email=f"bench{i}@example.com", password=make_password(None)
+                )
+                for i in range(options["concurrency"])
+            )
+            if options["scenario"] == "batch":
+                self.run_batch(users[0], options)
+                return
+
+            with mock.patch(
+                "borrowings.views.BorrowingCreateSerializer",
+                LegacyBorrowingCreateSerializer,
+            ):
+                self.report("legacy", self.run_scenario(users, options))
+            self.report("atomic", self.run_scenario(users, options))
+
+    def run_scenario(self, users, options):
+        stock = options["stock"]
+        book = Book.objects.create(
+            title="Bench Book", author="Bench", inventory=stock, daily_fee="1.00"
+        )
+        url = reverse("borrowings:borrowings-list")
+        payload = {
+            "book_id": book.id,
+            "expected_return_date": now().date() + timedelta(days=7),
+        }
+
+        def borrow(i):
+            client = APIClient()
+            client.force_authenticate(user=users[i % len(users)])
+            return client.post(url, payload, format="json").status_code
+
+        statuses, latencies, elapsed = run_concurrently(
+            borrow, options["requests"], options["concurrency"]
+        )
+
+        book.refresh_from_db()
+        created = Borrowing.objects.filter(book=book).count()
+        stats = summarize(latencies, elapsed)
+        stats.update(
+            accepted=statuses.count(201),
+            created=created,
+            oversold=max(0, created - stock),
+            lost_updates=created - (stock - book.inventory),
+            borrows_per_second=created / elapsed if elapsed else 0.0,
+        )
+        return stats
+
+    def run_batch(self, user, options):
+        size, rounds = options["batch_size"], options["rounds"]
+        books = Book.objects.bulk_create(
+            Book(
+                title=f"Bench Book {i}",
+                author="Bench",
+                inventory=2 * rounds,
+                daily_fee="1.00",
+            )
+            for i in range(size)
+        )
+        url = reverse("borrowings:borrowings-list")
+        return_date = now().date() + timedelta(days=7)
+        items = [
+            {"book_id": book.id, "expected_return_date": return_date} for book in books
+        ]
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZE=f"Bearer {AccessToken.for_user(user)}")
+
+        def checkout_singly():
+            for item in items:
+                assert client.post(url, item, format="json").status_code == 201
+
+        def checkout_batch():
+            assert client.post(url, items, format="json").status_code == 201
+
+        for name, checkout in (("single", checkout_singly), ("batch", checkout_batch)):
+            latencies = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                checkout()
+                latencies.append(time.perf_counter() - started)
+            stats = summarize(latencies, sum(latencies))
+            self.stdout.write(
+                f"{name:>7}: {size} books x {rounds} patrons, "
+                f"{stats['per_second'] * size:.1f} checkouts/s, "
+                f"per patron p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+            )
+
+    def report(self, name, stats):
+        line = (
+            f"{name:>7}: {stats['accepted']} accepted, {stats['created']} created, "
+            f"oversold={stats['oversold']}, lost_updates={stats['lost_updates']}, "
+            f"{stats['per_second']:.1f} requests/s, "
+            f"{stats['borrows_per_second']:.1f} borrows/s, "
+            f"p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+        )
+        if stats["oversold"] or stats["lost_updates"]:
+            self.stdout.write(self.style.ERROR(line))
+        else:
+            self.stdout.write(self.style.SUCCESS(line))
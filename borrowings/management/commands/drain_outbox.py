@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import now
+
+from borrowings.models import OverdueNotification
+from borrowings.notifications import get_backend
+
+
+class Command(BaseCommand):
+    """Delivers pending overdue notifications in batches"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            help="Stop after this many batches (default: until the outbox is empty).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+
+        backend = get_backend()
+        max_attempts = settings.OVERDUE_NOTIFICATIONS["MAX_ATTEMPTS"]
+        sent = failed = batches = 0
+        last_id = 0
+        try:
+            while options["max_batches"] is None or batches < options["max_batches"]:
+                with transaction.atomic():
+                    # Rows held by a concurrent drain are skipped, not waited on.
+                    batch = list(
+                        OverdueNotification.objects.select_for_update(skip_locked=True)
+                        .filter(
+                            sent_at__isnull=True,
+                            attempts__lt=max_attempts,
+                            pk__gt=last_id,
+                        )
+                        .order_by("pk")[:batch_size]
+                    )
+                    if not batch:
+                        break
+
+                    for notification in batch:
+                        notification.attempts += 1
+                        try:
+                            backend.send(notification)
+                        except Exception as error:
+                            notification.last_error = str(error)
+                            failed += 1
+                        else:
+                            notification.sent_at = now()
+                            notification.last_error = ""
+                            sent += 1
+                    OverdueNotification.objects.bulk_update(
+                        batch, ("attempts", "sent_at", "last_error")
+                    )
+                last_id = batch[-1].pk
+                batches += 1
+        finally:
+            close = getattr(backend, "close", None)
+            if close:
+                close()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Sent {sent} notifications, {failed} failed")
+        )
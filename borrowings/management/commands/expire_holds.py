@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from borrowings.models import Hold
+
+
+class Command(BaseCommand):
+    """
+    Expires ready holds not picked up within the pickup window and passes
+    their copies to the next hold in line or back on the shelf, then serves
+    waiting holds from any copies restocked without passing them on
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between chunks to leave room for live traffic.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        # Fixed, so copies passed on during the sweep are not expired by it.
+        timestamp = now()
+        expired = 0
+        while True:
+            count = Hold.objects.expire(chunk_size, timestamp)
+            if not count:
+                break
+            expired += count
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        served = Hold.objects.serve()
+        self.stdout.write(
+            self.style.SUCCESS(f"Expired {expired} holds, served {served}")
+        )
@@ -0,0 +1,76 @@
+from itertools import product
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from borrowings.models import Borrowing
+from borrowings.pagination import BorrowingPagination
+from borrowings.views import BorrowingViewSet
+
+
+class Command(BaseCommand):
+    """Prints query plans for every filter combination of the borrowings list"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user-id",
+            type=int,
+            help="Patron to filter on (default: the owner of the first borrowing).",
+        )
+        parser.add_argument(
+            "--paginated",
+            action="store_true",
+            help="Explain the first keyset page instead of the whole list.",
+        )
+
+    def handle(self, *args, **options):
+        user_id = options["user_id"] or (
+            Borrowing.objects.values_list("user_id", flat=True).first()
+        )
+        if user_id is None:
+            raise CommandError("No borrowings found; seed some data or pass --user-id")
+
+        User = get_user_model()
+        patron = User(pk=user_id)
+        staff = User(is_staff=True)
+        explain_options = (
+            {"analyze": True, "buffers": True}
+            if connection.vendor == "postgresql"
+            else {}
+        )
+
+        for requester, user_filter, is_active in product(
+            (patron, staff), (None, user_id), (None, "true", "false")
+        ):
+            if user_filter is not None and not requester.is_staff:
+                # Patrons always see their own borrowings; user_id is ignored.
+                continue
+
+            params = {}
+            if user_filter is not None:
+                params["user_id"] = user_filter
+            if is_active is not None:
+                params["is_active"] = is_active
+
+            queryset = self.list_queryset(requester, params)
+            if options["paginated"]:
+                queryset = queryset.order_by(*BorrowingPagination.ordering)[
+                    : BorrowingPagination.page_size
+                ]
+
+            role = "staff" if requester.is_staff else "patron"
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{role} {params or ''}"))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
+
+    @staticmethod
+    def list_queryset(user, params):
+        request = Request(APIRequestFactory().get("/", params))
+        request.user = user
+        view = BorrowingViewSet(
+            request=request, action="list", format_kwarg=None, args=(), kwargs={}
+        )
+        return view.get_queryset()
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from borrowings.models import LOAN_COUNTERS, Borrowing
+
+
+class Command(BaseCommand):
+    """
+    Recounts every user's active borrowings and every book's checked-out
+    copies from the borrowings, reporting and correcting counters that
+    have drifted, e.g. after admin edits or deletes
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between chunks to leave room for live traffic.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted counters without correcting them.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        for model, (field, _) in LOAN_COUNTERS.items():
+            label = f"{model._meta.label}.{field}"
+            after = drifted = 0
+            while True:
+                after, drift = Borrowing.objects.repair_counters(
+                    model, after, chunk_size, dry_run=options["dry_run"]
+                )
+                if after is None:
+                    break
+                drifted += len(drift)
+                for pk, stored, actual in drift:
+                    self.stdout.write(f"{label} of {pk}: {stored}, counted {actual}")
+                if options["pause"]:
+                    time.sleep(options["pause"])
+
+            action = "found" if options["dry_run"] else "corrected"
+            message = f"{label}: {action} {drifted} drifted counters"
+            self.stdout.write(
+                self.style.WARNING(message) if drifted else self.style.SUCCESS(message)
+            )
@@ -0,0 +1,102 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import now
+
+from borrowings.models import Borrowing, Checkpoint, OverdueNotification
+
+JOB = "scan_overdue"
+
+
+class Command(BaseCommand):
+    """Queues one notification per overdue borrowing in the outbox"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between chunks to leave room for live traffic.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the saved checkpoint and start from the first borrowing.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        checkpoint, _ = Checkpoint.objects.get_or_create(job=JOB)
+        if options["restart"]:
+            checkpoint.last_id = 0
+        if checkpoint.last_id:
+            self.stdout.write(f"Resuming after borrowing {checkpoint.last_id}")
+
+        today = now().date()
+        scanned = queued = 0
+        while True:
+            chunk = list(
+                Borrowing.objects.overdue(today)
+                .with_fines(today)
+                .filter(pk__gt=checkpoint.last_id)
+                .order_by("pk")
+                .values(
+                    "id",
+                    "user_id",
+                    "user__email",
+                    "book__title",
+                    "expected_return_date",
+                    "fine",
+                )[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            notified = set(
+                OverdueNotification.objects.filter(
+                    borrowing_id__in=[row["id"] for row in chunk]
+                ).values_list("borrowing_id", flat=True)
+            )
+            new = [row for row in chunk if row["id"] not in notified]
+            with transaction.atomic():
+                # ignore_conflicts covers a concurrent scan inserting the same
+                # borrowing; the one-to-one key keeps the outbox idempotent.
+                OverdueNotification.objects.bulk_create(
+                    (
+                        OverdueNotification(
+                            borrowing_id=row["id"],
+                            user_id=row["user_id"],
+                            payload={
+                                "email": row["user__email"],
+                                "book_title": row["book__title"],
+                                "expected_return_date": str(
+                                    row["expected_return_date"]
+                                ),
+                                "fine": f"{row['fine']:.2f}",
+                            },
+                        )
+                        for row in new
+                    ),
+                    ignore_conflicts=True,
+                )
+                checkpoint.last_id = chunk[-1]["id"]
+                checkpoint.save(update_fields=("last_id", "updated_at"))
+
+            scanned += len(chunk)
+            queued += len(new)
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        # The walk is complete; the next run starts from the beginning again.
+        checkpoint.last_id = 0
+        checkpoint.save(update_fields=("last_id", "updated_at"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scanned {scanned} overdue borrowings, queued {queued} notifications"
+            )
+        )
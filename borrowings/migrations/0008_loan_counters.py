@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:12
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_active_borrowings(apps, schema_editor):
+    Borrowing = apps.get_model("borrowings", "Borrowing")
+    db = schema_editor.connection.alias
+    for model, key, field in (
+        (apps.get_model("users", "User"), "user", "active_borrowings"),
+        (apps.get_model("books", "Book"), "book", "checked_out"),
+    ):
+        active = (
+            Borrowing.objects.using(db)
+            .filter(**{key: OuterRef("pk")}, actual_return_date__isnull=True)
+            .order_by()
+            .values(key)
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        model.objects.using(db).update(**{field: Coalesce(Subquery(active), Value(0))})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0006_book_checked_out"),
+        ("borrowings", "0007_holds"),
+        ("users", "0002_user_active_borrowings"),
+    ]
+
+    operations = [
+        migrations.RunPython(count_active_borrowings, migrations.RunPython.noop),
+    ]
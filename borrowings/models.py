@@ -1,15 +1,738 @@
-from django.db import models
+from collections import Counter, defaultdict
 
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    Exists,
+    ExpressionWrapper,
+    F,
+    Func,
+    IntegerField,
+    OuterRef,
+    Sum,
+    Value,
+    When,
+    Window,
+)
+from django.db.models.functions import Coalesce, Greatest, RowNumber
+from django.utils.timezone import now
+
+from books.cache import bump_catalog_version
 from books.models import Book
 from users.models import User
 
 
+def _per_id(counts, field="pk"):
+    """CASE expression mapping every id in ``counts`` to its count."""
+    ids_by_count = defaultdict(list)
+    for id_, count in counts.items():
+        ids_by_count[count].append(id_)
+    return Case(
+        *(
+            When(**{f"{field}__in": ids}, then=Value(count))
+            for count, ids in ids_by_count.items()
+        ),
+        output_field=IntegerField(),
+    )
+
+
+def _minus(field, counts):
+    """``field`` less each row's count; drift never takes it below zero."""
+    return Greatest(F(field) - _per_id(counts), Value(0))
+
+
+class DaysBetween(Func):
+    """Whole days from the ``start`` date to the ``end`` date."""
+
+    arity = 2
+    output_field = IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # Subtracting two dates yields an integer number of days on PostgreSQL.
+        return super().as_sql(
+            compiler, connection, template="(%(expressions)s)", arg_joiner=" - "
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            template="CAST(julianday(%(expressions)s) AS integer)",
+            arg_joiner=") - julianday(",
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function="DATEDIFF")
+
+
+class BorrowingQuerySet(models.QuerySet):
+    def overdue(self, today=None):
+        """Borrowings still out after their expected return date."""
+        return self.filter(
+            actual_return_date__isnull=True,
+            expected_return_date__lt=today or now().date(),
+        )
+
+    def with_fines(self, today=None):
+        """
+        Annotate ``fine``: days past ``expected_return_date`` times the daily fee.
+
+        Active borrowings accrue up to ``today``; returned ones up to their
+        return date. Borrowings returned on time have a fine of zero.
+        """
+        today = today or now().date()
+        days_late = Greatest(
+            DaysBetween(
+                Coalesce("actual_return_date", Value(today)), "expected_return_date"
+            ),
+            Value(0),
+        )
+        return self.annotate(
+            fine=ExpressionWrapper(
+                days_late * F("book__daily_fee"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+    def overdue_totals(self, today=None):
+        """Per-user count and total fine of overdue borrowings, largest first."""
+        return (
+            self.overdue(today)
+            .with_fines(today)
+            .values("user_id", "user__email")
+            .annotate(overdue_borrowings=Count("id"), total_fine=Sum("fine"))
+            .order_by("-total_fine", "user_id")
+        )
+
+
+class ConcurrentReturn(Exception):
+    """Another request returned some of the borrowings, or changed a hold, first."""
+
+
+class BorrowingLimitReached(Exception):
+    """The patron already has ``MAX_ACTIVE_BORROWINGS`` books out."""
+
+
+# Counter of active borrowings on each model, and the borrowing's key to it.
+LOAN_COUNTERS = {User: ("active_borrowings", "user"), Book: ("checked_out", "book")}
+
+
+def _atomic_retrying(db, func, *args):
+    """Run ``func`` in a transaction, again each time it hits ConcurrentReturn."""
+    while True:
+        try:
+            with transaction.atomic(using=db):
+                return func(*args)
+        except ConcurrentReturn:
+            continue
+
+
+def _count_loans(db, user_id, count):
+    """
+    Add ``count`` borrowings to the user's counter, or raise
+    BorrowingLimitReached if that would take it over the limit.
+    """
+    counted = (
+        User.objects.using(db)
+        .filter(
+            pk=user_id,
+            active_borrowings__lte=settings.MAX_ACTIVE_BORROWINGS - count,
+        )
+        .update(active_borrowings=F("active_borrowings") + count)
+    )
+    if not counted:
+        raise BorrowingLimitReached
+
+
+def has_waiting_holds():
+    """Whether the book has holds queued for it; their copies are not for loan."""
+    return Exists(Hold.objects.filter(book=OuterRef("pk"), status=Hold.Status.WAITING))
+
+
+def _serve_holds(db, counts, timestamp):
+    """
+    Set aside up to ``counts[book_id]`` copies on the shelf for the oldest
+    waiting holds on each book, and return how many were served per book.
+    The books must already be updated or locked by the caller.
+    """
+    allocated = Hold.objects.using(db)._allocate(counts, timestamp)
+    if allocated:
+        Book.objects.using(db).filter(pk__in=allocated).update(
+            inventory=F("inventory") - _per_id(allocated)
+        )
+    return allocated
+
+
+def _release_copies(db, counts, returned=False):
+    """
+    Put copies back: each goes to the oldest waiting hold on its book, the
+    rest onto the shelf. ``counts`` maps book ids to copies; ``returned``
+    says they were out on loan rather than set aside for a hold.
+
+    The books are updated first, so their row locks keep ``place`` from
+    queueing a hold that this call would miss.
+    """
+    timestamp = now()
+    changes = {"inventory": F("inventory") + _per_id(counts)}
+    if returned:
+        changes["checked_out"] = _minus("checked_out", counts)
+    Book.objects.using(db).filter(pk__in=counts).update(**changes, updated_at=timestamp)
+    _serve_holds(db, counts, timestamp)
+    bump_catalog_version(db)
+
+
+class BorrowingManager(models.Manager.from_queryset(BorrowingQuerySet)):
+    def borrow(self, user, book_id, expected_return_date):
+        """
+        Take one copy of the book off the shelf and record the borrowing.
+
+        Returns the new borrowing, or None if the book does not exist or is
+        out of stock, which includes copies owed to waiting holds; raises
+        BorrowingLimitReached if the user has too many books out. Stock and
+        the limit are checked by conditional UPDATEs of the counters
+        themselves, so concurrent checkouts can neither oversell nor lose
+        updates. On PostgreSQL all the writes go out as a single statement.
+        """
+        db = router.db_for_write(self.model)
+        timestamp = now()
+        borrow_date = timestamp.date()
+
+        if connections[db].vendor == "postgresql":
+            borrowing_id, available = self._borrow_in_one_statement(
+                db, user, book_id, borrow_date, expected_return_date, timestamp
+            )
+            if borrowing_id is None:
+                if available:
+                    raise BorrowingLimitReached
+                return None
+            bump_catalog_version(db)
+            borrowing = self.model(
+                id=borrowing_id,
+                borrow_date=borrow_date,
+                expected_return_date=expected_return_date,
+                book_id=book_id,
+                user=user,
+                updated_at=timestamp,
+            )
+            borrowing._state.adding = False
+            borrowing._state.db = db
+            return borrowing
+
+        with transaction.atomic(using=db):
+            taken = (
+                Book.objects.using(db)
+                .filter(~has_waiting_holds(), pk=book_id, inventory__gt=0)
+                .update(
+                    inventory=F("inventory") - 1,
+                    checked_out=F("checked_out") + 1,
+                    updated_at=timestamp,
+                )
+            )
+            if not taken:
+                return None
+            _count_loans(db, user.pk, 1)
+            bump_catalog_version(db)
+            return self.using(db).create(
+                borrow_date=borrow_date,
+                expected_return_date=expected_return_date,
+                book_id=book_id,
+                user=user,
+            )
+
+    def borrow_many(self, user, items):
+        """
+        Check out several books for one user, all or nothing.
+
+        ``items`` are dicts with ``book_id`` and ``expected_return_date``.
+        Returns the created borrowings, or None if any book no longer has
+        enough copies or has holds waiting for them; nothing is written in
+        that case, nor when BorrowingLimitReached is raised. Inventories are
+        decremented by one UPDATE and the borrowings inserted by one
+        ``bulk_create``.
+        """
+        db = router.db_for_write(self.model)
+        borrow_date = now().date()
+        needed = Counter(item["book_id"] for item in items)
+        per_book = _per_id(needed)
+
+        with transaction.atomic(using=db):
+            taken = (
+                Book.objects.using(db)
+                .filter(~has_waiting_holds(), pk__in=needed, inventory__gte=per_book)
+                .update(
+                    inventory=F("inventory") - per_book,
+                    checked_out=F("checked_out") + per_book,
+                    updated_at=now(),
+                )
+            )
+            if taken != len(needed):
+                transaction.set_rollback(True, using=db)
+                return None
+            _count_loans(db, user.pk, len(items))
+            bump_catalog_version(db)
+            return self.using(db).bulk_create(
+                self.model(user=user, borrow_date=borrow_date, **item) for item in items
+            )
+
+    def return_books(self, ids, return_date=None):
+        """
+        Mark the given borrowings returned and put their copies back on the shelf.
+
+        Returns the ids returned by this call. Unknown and already returned
+        borrowings are skipped; they are filtered out by a plain SELECT, so
+        no row locks are taken for them. Copies go to the oldest waiting
+        holds first. The whole batch costs the same five statements however
+        many borrowings, books and users it touches, plus two when holds are
+        served.
+        """
+        db = router.db_for_write(self.model)
+        return_date = return_date or now().date()
+        return _atomic_retrying(db, self._return_books, db, ids, return_date)
+
+    def _return_books(self, db, ids, return_date):
+        active = {
+            borrowing_id: (book_id, user_id)
+            for borrowing_id, book_id, user_id in self.using(db)
+            .filter(pk__in=ids, actual_return_date__isnull=True)
+            .values_list("id", "book_id", "user_id")
+        }
+        if not active:
+            return []
+
+        updated = (
+            self.using(db)
+            .filter(pk__in=active, actual_return_date__isnull=True)
+            .update(actual_return_date=return_date, updated_at=now())
+        )
+        if updated != len(active):
+            raise ConcurrentReturn
+
+        _release_copies(
+            db, Counter(book_id for book_id, _ in active.values()), returned=True
+        )
+        users = Counter(user_id for _, user_id in active.values())
+        User.objects.using(db).filter(pk__in=users).update(
+            active_borrowings=_minus("active_borrowings", users)
+        )
+        return sorted(active)
+
+    def repair_counters(self, model, after, limit, dry_run=False):
+        """
+        Recount the active borrowings of up to ``limit`` users or books
+        (``model``, see LOAN_COUNTERS) with primary keys above ``after``,
+        and correct the counters that have drifted unless ``dry_run``.
+
+        Returns the last primary key checked, None once there are no more,
+        and ``(pk, stored, actual)`` for each drifted counter. The rows are
+        locked while they are counted, so loans made or returned meanwhile
+        are neither lost nor counted twice.
+        """
+        db = router.db_for_write(self.model)
+        field, key = LOAN_COUNTERS[model]
+        with transaction.atomic(using=db):
+            stored = dict(
+                model.objects.using(db)
+                .select_for_update()
+                .filter(pk__gt=after)
+                .order_by("pk")
+                .values_list("pk", field)[:limit]
+            )
+            if not stored:
+                return None, []
+            actual = dict(
+                self.using(db)
+                .filter(**{f"{key}__in": stored}, actual_return_date__isnull=True)
+                .order_by()
+                .values_list(key)
+                .annotate(Count("id"))
+            )
+            drift = [
+                (pk, count, actual.get(pk, 0))
+                for pk, count in stored.items()
+                if count != actual.get(pk, 0)
+            ]
+            if drift and not dry_run:
+                counts = {pk: count for pk, _, count in drift}
+                model.objects.using(db).filter(pk__in=counts).update(
+                    **{field: _per_id(counts)}
+                )
+        return max(stored), drift
+
+    def _borrow_in_one_statement(
+        self, db, user, book_id, borrow_date, expected_return_date, timestamp
+    ):
+        """
+        The new borrowing's id, or None, and whether the book had a copy.
+
+        The book row is locked and checked first, and has no copy to lend
+        while holds wait for it; the user's counter only goes up if it had a
+        copy, and the copy is only taken if the counter
+        did, so either all the writes happen or none.
+        """
+        connection = connections[db]
+        quote = connection.ops.quote_name
+        sql = f"""
+            WITH available AS (
+                SELECT id FROM {quote(Book._meta.db_table)}
+                WHERE id = %s AND inventory > 0
+                    AND NOT EXISTS (
+                        SELECT 1 FROM {quote(Hold._meta.db_table)}
+                        WHERE book_id = %s AND status = %s
+                    )
+                FOR UPDATE
+            ), counted AS (
+                UPDATE {quote(User._meta.db_table)}
+                SET active_borrowings = active_borrowings + 1
+                WHERE id = %s AND active_borrowings < %s
+                    AND EXISTS (SELECT 1 FROM available)
+                RETURNING id
+            ), taken AS (
+                UPDATE {quote(Book._meta.db_table)}
+                SET inventory = inventory - 1,
+                    checked_out = checked_out + 1,
+                    updated_at = %s
+                WHERE id IN (SELECT id FROM available)
+                    AND EXISTS (SELECT 1 FROM counted)
+                RETURNING id
+            ), created AS (
+                INSERT INTO {quote(self.model._meta.db_table)}
+                    (borrow_date, expected_return_date, book_id, user_id, updated_at)
+                SELECT %s, %s, taken.id, %s, %s FROM taken
+                RETURNING id
+            )
+            SELECT (SELECT id FROM created), EXISTS (SELECT 1 FROM available)
+        """
+        params = [
+            book_id,
+            book_id,
+            Hold.Status.WAITING,
+            user.pk,
+            settings.MAX_ACTIVE_BORROWINGS,
+            timestamp,
+            borrow_date,
+            expected_return_date,
+            user.pk,
+            timestamp,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+
+
 class Borrowing(models.Model):
     borrow_date = models.DateField()
     expected_return_date = models.DateField()
     actual_return_date = models.DateField(null=True, blank=True)
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="records")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="records")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BorrowingManager()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("user",),
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_user_idx",
+            ),
+            models.Index(
+                fields=("user", "borrow_date"), name="borrowing_user_date_idx"
+            ),
+            # BorrowingPagination's order, read backwards.
+            models.Index(fields=("borrow_date", "id"), name="borrowing_date_id_idx"),
+            models.Index(
+                fields=("expected_return_date",),
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_overdue_idx",
+            ),
+            # scan_overdue walks active borrowings in key order.
+            models.Index(
+                fields=("id",),
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_id_idx",
+            ),
+        )
 
     def __str__(self):
         return f"Book: {self.book.title}, Borrow date: {self.borrow_date}"
+
+
+class OverdueNotification(models.Model):
+    """Outbox entry telling a patron that a borrowing is overdue."""
+
+    borrowing = models.OneToOneField(
+        Borrowing, on_delete=models.CASCADE, related_name="overdue_notification"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="overdue_notifications"
+    )
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("id",),
+                condition=models.Q(sent_at__isnull=True),
+                name="notification_pending_idx",
+            ),
+        )
+
+    def __str__(self):
+        return f"Overdue notification for borrowing {self.borrowing_id}"
+
+
+class HoldQuerySet(models.QuerySet):
+    def open(self):
+        return self.filter(status__in=(Hold.Status.WAITING, Hold.Status.READY))
+
+    def _allocate(self, counts, timestamp):
+        """
+        Mark the oldest waiting holds ready, up to ``counts[book_id]`` per
+        book, and return how many were served per book.
+        """
+        queue = (
+            self.filter(book_id__in=counts, status=Hold.Status.WAITING)
+            .annotate(
+                place=Window(
+                    RowNumber(),
+                    partition_by=F("book_id"),
+                    order_by=("created_at", "id"),
+                )
+            )
+            .filter(place__lte=max(counts.values()))
+            .values_list("id", "book_id", "place")
+        )
+        served = Counter()
+        ids = []
+        for hold_id, book_id, place in queue:
+            if place <= counts[book_id]:
+                ids.append(hold_id)
+                served[book_id] += 1
+        if not ids:
+            return served
+
+        updated = self.filter(pk__in=ids, status=Hold.Status.WAITING).update(
+            status=Hold.Status.READY,
+            ready_at=timestamp,
+            expires_at=timestamp + settings.HOLD_PICKUP_WINDOW,
+            updated_at=timestamp,
+        )
+        if updated != len(ids):
+            # A hold was cancelled under us.
+            raise ConcurrentReturn
+        return served
+
+
+class HoldManager(models.Manager.from_queryset(HoldQuerySet)):
+    def place(self, user, book_id):
+        """
+        Queue ``user`` for the next copy of the book.
+
+        Returns the new hold, or None if the book does not exist or has
+        copies on the shelf that no other hold is waiting for. The book row
+        stays locked until the hold is saved, so a copy returned meanwhile
+        is allocated to it.
+        """
+        db = router.db_for_write(self.model)
+        return _atomic_retrying(db, self._place, db, user, book_id)
+
+    def _place(self, db, user, book_id):
+        book = (
+            Book.objects.using(db)
+            .select_for_update()
+            .annotate(reserved=has_waiting_holds())
+            .filter(pk=book_id)
+            .first()
+        )
+        if book is None or (book.inventory and not book.reserved):
+            return None
+        hold = self.using(db).create(user=user, book=book)
+        if book.inventory:
+            # Copies left on the shelf behind the queue, see ``serve``.
+            _serve_holds(db, {book.pk: book.inventory}, now())
+            bump_catalog_version(db)
+        return hold
+
+    def serve(self, book_ids=None):
+        """
+        Set aside copies on the shelf for the oldest waiting holds, e.g.
+        after staff or an import raised the inventory. ``book_ids`` limits
+        it to those books. Returns how many holds were served.
+        """
+        db = router.db_for_write(self.model)
+        return _atomic_retrying(db, self._serve, db, book_ids)
+
+    def _serve(self, db, book_ids):
+        books = (
+            Book.objects.using(db)
+            .select_for_update()
+            .filter(has_waiting_holds(), inventory__gt=0)
+            .order_by("pk")
+        )
+        if book_ids is not None:
+            books = books.filter(pk__in=book_ids)
+        counts = dict(books.values_list("id", "inventory"))
+        if not counts:
+            return 0
+        served = _serve_holds(db, counts, now())
+        if served:
+            bump_catalog_version(db)
+        return sum(served.values())
+
+    def pick_up(self, hold, expected_return_date):
+        """
+        Check out the copy set aside for a ready hold.
+
+        Returns the new borrowing, or None if the hold is not ready or its
+        pickup window has passed; raises BorrowingLimitReached if the user
+        has too many books out. The copy is already off the shelf, so the
+        inventory is not touched.
+        """
+        db = router.db_for_write(self.model)
+        timestamp = now()
+        with transaction.atomic(using=db):
+            taken = (
+                self.using(db)
+                .filter(pk=hold.pk, status=Hold.Status.READY, expires_at__gt=timestamp)
+                .update(status=Hold.Status.FULFILLED, updated_at=timestamp)
+            )
+            if not taken:
+                return None
+            Book.objects.using(db).filter(pk=hold.book_id).update(
+                checked_out=F("checked_out") + 1, updated_at=timestamp
+            )
+            _count_loans(db, hold.user_id, 1)
+            bump_catalog_version(db)
+            return Borrowing.objects.using(db).create(
+                borrow_date=timestamp.date(),
+                expected_return_date=expected_return_date,
+                book_id=hold.book_id,
+                user_id=hold.user_id,
+            )
+
+    def cancel(self, hold):
+        """
+        Withdraw an open hold; a copy set aside for it goes to the next
+        hold in line or back on the shelf. Returns False if the hold was
+        no longer open.
+        """
+        db = router.db_for_write(self.model)
+        return _atomic_retrying(db, self._cancel, db, hold)
+
+    def _cancel(self, db, hold):
+        # Each status is matched exactly, so a copy allocated to the hold
+        # meanwhile is never cancelled along with it without being passed on.
+        statuses = [Hold.Status.WAITING, Hold.Status.READY]
+        if hold.status == Hold.Status.READY:
+            statuses.reverse()
+        for status in statuses:
+            if (
+                self.using(db)
+                .filter(pk=hold.pk, status=status)
+                .update(status=Hold.Status.CANCELLED, updated_at=now())
+            ):
+                if status == Hold.Status.READY:
+                    _release_copies(db, {hold.book_id: 1})
+                return True
+        return False
+
+    def expire(self, limit, timestamp=None):
+        """
+        Expire up to ``limit`` ready holds whose pickup window has passed,
+        oldest first, passing their copies on. Returns how many expired.
+        """
+        db = router.db_for_write(self.model)
+        return _atomic_retrying(db, self._expire, db, limit, timestamp or now())
+
+    def _expire(self, db, limit, timestamp):
+        expired = dict(
+            self.using(db)
+            .filter(status=Hold.Status.READY, expires_at__lte=timestamp)
+            .order_by("expires_at")
+            .values_list("id", "book_id")[:limit]
+        )
+        if not expired:
+            return 0
+
+        updated = (
+            self.using(db)
+            .filter(pk__in=expired, status=Hold.Status.READY)
+            .update(status=Hold.Status.EXPIRED, updated_at=timestamp)
+        )
+        if updated != len(expired):
+            # Picked up or cancelled meanwhile.
+            raise ConcurrentReturn
+        _release_copies(db, Counter(expired.values()))
+        return len(expired)
+
+
+class Hold(models.Model):
+    """A patron's place in the queue for an out-of-stock book."""
+
+    class Status(models.TextChoices):
+        WAITING = "WAITING", "waiting"
+        # A returned copy is set aside until ``expires_at``.
+        READY = "READY", "ready for pickup"
+        FULFILLED = "FULFILLED", "picked up"
+        CANCELLED = "CANCELLED", "cancelled"
+        EXPIRED = "EXPIRED", "expired"
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="holds")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="holds")
+    status = models.CharField(
+        max_length=9, choices=Status.choices, default=Status.WAITING
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    ready_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = HoldManager()
+
+    class Meta:
+        indexes = (
+            # The queue of a book, oldest first.
+            models.Index(
+                fields=("book", "created_at", "id"),
+                condition=models.Q(status="WAITING"),
+                name="hold_queue_idx",
+            ),
+            models.Index(fields=("user", "id"), name="hold_user_idx"),
+            models.Index(
+                fields=("expires_at",),
+                condition=models.Q(status="READY"),
+                name="hold_expiry_idx",
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "book"),
+                condition=models.Q(status__in=("WAITING", "READY")),
+                name="hold_one_open_per_user_book",
+            ),
+        )
+
+    def __str__(self):
+        return f"Hold on book {self.book_id} for user {self.user_id}: {self.status}"
+
+
+class Checkpoint(models.Model):
+    """Last primary key processed by a resumable batch job."""
+
+    job = models.CharField(max_length=64, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.job}: {self.last_id}"
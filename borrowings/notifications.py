@@ -0,0 +1,74 @@
+"""
+Delivery backends for overdue notifications.
+
+``drain_outbox`` hands every pending notification to the backend named by
+``OVERDUE_NOTIFICATIONS["BACKEND"]``. A backend only needs a
+``send(notification)`` method that raises if the message was not
+delivered; the notification is then retried on a later drain.
+"""
+
+import json
+import sys
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils.module_loading import import_string
+
+
+def get_backend():
+    return import_string(settings.OVERDUE_NOTIFICATIONS["BACKEND"])()
+
+
+def render(notification):
+    payload = notification.payload
+    return (
+        f"Overdue: {payload['book_title']}",
+        f"\"{payload['book_title']}\" was due back on "
+        f"{payload['expected_return_date']}. The fine so far is "
+        f"{payload['fine']}; it grows every day until the book is returned.",
+    )
+
+
+class ConsoleBackend:
+    """Writes each notification to stdout as a JSON line."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, notification):
+        subject, body = render(notification)
+        self.stream.write(
+            json.dumps(
+                {
+                    "to": notification.payload["email"],
+                    "subject": subject,
+                    "body": body,
+                }
+            )
+            + "\n"
+        )
+        self.stream.flush()
+
+
+class FileBackend(ConsoleBackend):
+    """Appends notifications to ``OVERDUE_NOTIFICATIONS["FILE_PATH"]``."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.OVERDUE_NOTIFICATIONS["FILE_PATH"]
+        super().__init__(stream=open(self.path, "a"))
+
+    def close(self):
+        self.stream.close()
+
+
+class EmailBackend:
+    """Sends notifications with Django's configured email backend."""
+
+    def send(self, notification):
+        subject, body = render(notification)
+        send_mail(
+            subject,
+            body,
+            settings.DEFAULT_FROM_EMAIL,
+            [notification.payload["email"]],
+        )
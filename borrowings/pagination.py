@@ -0,0 +1,5 @@
+from library_service.pagination import KeysetPagination
+
+
+class BorrowingPagination(KeysetPagination):
+    ordering = ("-borrow_date", "-id")
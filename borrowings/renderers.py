@@ -0,0 +1,96 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+class StreamingRowRenderer(BaseRenderer):
+    """
+    Renders tabular rows for ``StreamingHttpResponse``.
+
+    ``stream`` turns an iterator of row tuples into encoded chunks of
+    ``chunk_rows`` rows each, and ``astream`` does the same for an async
+    iterator. ``render`` only serves the small payloads DRF renders itself,
+    such as error responses.
+    """
+
+    charset = "utf-8"
+    chunk_rows = 500
+
+    def stream(self, columns, rows):
+        lines = [self.header(columns)]
+        for row in rows:
+            lines.append(self.line(columns, row))
+            if len(lines) >= self.chunk_rows:
+                yield "".join(lines).encode(self.charset)
+                lines = []
+        if lines:
+            yield "".join(lines).encode(self.charset)
+
+    async def astream(self, columns, rows):
+        lines = [self.header(columns)]
+        async for row in rows:
+            lines.append(self.line(columns, row))
+            if len(lines) >= self.chunk_rows:
+                yield "".join(lines).encode(self.charset)
+                lines = []
+        if lines:
+            yield "".join(lines).encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        columns = list(rows[0]) if rows and isinstance(rows[0], dict) else ["detail"]
+        return b"".join(
+            self.stream(
+                columns,
+                (
+                    (
+                        [row.get(column) for column in columns]
+                        if isinstance(row, dict)
+                        else [row]
+                    )
+                    for row in rows
+                ),
+            )
+        )
+
+    def header(self, columns):
+        raise NotImplementedError
+
+    def line(self, columns, row):
+        raise NotImplementedError
+
+
+class CSVRenderer(StreamingRowRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def __init__(self):
+        self.writer = csv.writer(_Echo())
+
+    def header(self, columns):
+        return self.writer.writerow(columns)
+
+    def line(self, columns, row):
+        return self.writer.writerow(row)
+
+
+class NDJSONRenderer(StreamingRowRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def header(self, columns):
+        return ""
+
+    def line(self, columns, row):
+        return json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
@@ -1,10 +1,27 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError
 from django.utils.timezone import now
 from rest_framework import serializers
 
 from books.models import Book
-from borrowings.models import Borrowing
+from borrowings.models import (
+    Borrowing,
+    BorrowingLimitReached,
+    Hold,
+    has_waiting_holds,
+)
 from users.models import User
 
+ALREADY_HELD = "You already have a hold on this book"
+
+
+def limit_reached():
+    return serializers.ValidationError(
+        f"You can have at most {settings.MAX_ACTIVE_BORROWINGS} books out at once"
+    )
+
 
 class BorrowingSerializer(serializers.ModelSerializer):
     book = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all())
@@ -28,6 +45,8 @@ class BorrowingDetailSerializer(BorrowingSerializer):
         source="book.daily_fee", max_digits=10, decimal_places=2, read_only=True
     )
     user_email = serializers.EmailField(source="user.email", read_only=True)
+    # Annotated by BorrowingQuerySet.with_fines().
+    fine = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Borrowing
@@ -39,17 +58,81 @@ class BorrowingDetailSerializer(BorrowingSerializer):
             "book_title",
             "book_daily_fee",
             "user_email",
+            "fine",
         )
 
 
+class OverdueTotalSerializer(serializers.Serializer):
+    user = serializers.IntegerField(source="user_id")
+    user_email = serializers.EmailField(source="user__email")
+    overdue_borrowings = serializers.IntegerField()
+    total_fine = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class BorrowingCreateListSerializer(serializers.ListSerializer):
+    """Checks out a list of books in one all-or-nothing batch."""
+
+    max_batch_size = 20
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("allow_empty", False)
+        kwargs.setdefault("max_length", self.max_batch_size)
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        errors = self.stock_errors(items)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return items
+
+    def create(self, validated_data):
+        try:
+            borrowings = Borrowing.objects.borrow_many(
+                self.context["request"].user, validated_data
+            )
+        except BorrowingLimitReached:
+            raise limit_reached()
+        if borrowings is None:
+            # Someone else took the last copies since validation.
+            raise serializers.ValidationError(self.stock_errors(validated_data))
+        return borrowings
+
+    @staticmethod
+    def stock_errors(items):
+        """Per-item errors for books that are missing or run out, in one query."""
+        needed = Counter(item["book_id"] for item in items)
+        # Copies on the shelf of a book with waiting holds are theirs.
+        stock = {
+            book_id: 0 if reserved else inventory
+            for book_id, inventory, reserved in Book.objects.filter(pk__in=needed)
+            .annotate(reserved=has_waiting_holds())
+            .values_list("id", "inventory", "reserved")
+        }
+
+        errors = []
+        taken = Counter()
+        for item in items:
+            book_id = item["book_id"]
+            taken[book_id] += 1
+            if book_id not in stock:
+                errors.append(
+                    {"book_id": [f'Invalid pk "{book_id}" - object does not exist.']}
+                )
+            elif taken[book_id] > stock[book_id]:
+                errors.append({"book_id": ["This book is out of stock"]})
+            else:
+                errors.append({})
+        return errors if any(errors) else None
+
+
 class BorrowingCreateSerializer(serializers.ModelSerializer):
-    book_id = serializers.PrimaryKeyRelatedField(
-        queryset=Book.objects.all(), source="book"
-    )
+    book_id = serializers.IntegerField(min_value=1)
 
     class Meta:
         model = Borrowing
         fields = ("book_id", "expected_return_date")
+        list_serializer_class = BorrowingCreateListSerializer
 
     def validate_expected_return_date(self, value):
         if value <= now().date():
@@ -58,21 +141,105 @@ class BorrowingCreateSerializer(serializers.ModelSerializer):
             )
         return value
 
-    def validate(self, attrs):
-        book = attrs["book"]
-        if book.inventory <= 0:
-            raise serializers.ValidationError({"book_id": "This book is out of stock"})
-        return attrs
+    def create(self, validated_data):
+        # The limit is checked against the user's row as the copy is taken;
+        # request.user may come from the auth cache and be out of date.
+        try:
+            borrowing = Borrowing.objects.borrow(
+                user=self.context["request"].user, **validated_data
+            )
+        except BorrowingLimitReached:
+            raise limit_reached()
+        if borrowing is None:
+            book_id = validated_data["book_id"]
+            if Book.objects.filter(pk=book_id).exists():
+                message = "This book is out of stock"
+            else:
+                message = f'Invalid pk "{book_id}" - object does not exist.'
+            raise serializers.ValidationError({"book_id": message})
+        return borrowing
+
+
+class BorrowingReturnSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
 
     def create(self, validated_data):
-        request = self.context["request"]
+        ids = set(validated_data["ids"])
+        returned = Borrowing.objects.return_books(ids)
+
+        rejected = ids.difference(returned)
+        already_returned = set(
+            Borrowing.objects.filter(pk__in=rejected).values_list("id", flat=True)
+            if rejected
+            else ()
+        )
+        return {
+            "returned": returned,
+            "already_returned": sorted(already_returned),
+            "not_found": sorted(rejected - already_returned),
+        }
+
+
+class HoldSerializer(serializers.ModelSerializer):
+    book_id = serializers.IntegerField(min_value=1)
+    book_title = serializers.CharField(source="book.title", read_only=True)
+    user = serializers.IntegerField(source="user_id", read_only=True)
 
-        borrowing = Borrowing.objects.create(
-            user=request.user, borrow_date=now().date(), **validated_data
+    class Meta:
+        model = Hold
+        fields = (
+            "id",
+            "book_id",
+            "book_title",
+            "user",
+            "status",
+            "created_at",
+            "ready_at",
+            "expires_at",
         )
+        read_only_fields = ("status", "created_at", "ready_at", "expires_at")
+
+    def validate_book_id(self, value):
+        user = self.context["request"].user
+        if Hold.objects.open().filter(user=user, book_id=value).exists():
+            raise serializers.ValidationError(ALREADY_HELD)
+        return value
+
+    def create(self, validated_data):
+        book_id = validated_data["book_id"]
+        try:
+            hold = Hold.objects.place(self.context["request"].user, book_id)
+        except IntegrityError:
+            # A concurrent request placed the same hold since validation.
+            raise serializers.ValidationError({"book_id": [ALREADY_HELD]})
+        if hold is None:
+            if Book.objects.filter(pk=book_id).exists():
+                message = "This book is in stock"
+            else:
+                message = f'Invalid pk "{book_id}" - object does not exist.'
+            raise serializers.ValidationError({"book_id": message})
+        return hold
 
-        book = borrowing.book
-        book.inventory -= 1
-        book.save(update_fields=("inventory",))
 
+class HoldPickupSerializer(BorrowingCreateSerializer):
+    """Borrows the copy set aside for the hold in ``context["hold"]``."""
+
+    book_id = None
+
+    class Meta(BorrowingCreateSerializer.Meta):
+        fields = ("expected_return_date",)
+
+    def create(self, validated_data):
+        try:
+            borrowing = Hold.objects.pick_up(
+                self.context["hold"], validated_data["expected_return_date"]
+            )
+        except BorrowingLimitReached:
+            raise limit_reached()
+        if borrowing is None:
+            raise serializers.ValidationError("This hold is not ready for pickup")
         return borrowing
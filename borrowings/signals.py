@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from books.models import Book
+from borrowings.models import Hold
+
+
+@receiver(post_save, sender=Book)
+def serve_holds(sender, instance, created, update_fields, **kwargs):
+    # A new book has no holds; one saved without copies has none to give.
+    if created or not instance.inventory:
+        return
+    if update_fields is not None and "inventory" not in update_fields:
+        return
+    # Most books have no queue; skip locking them for one.
+    if Hold.objects.filter(book=instance, status=Hold.Status.WAITING).exists():
+        Hold.objects.serve([instance.pk])
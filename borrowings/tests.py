@@ -1,13 +1,39 @@
+import json
+import tempfile
 from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
 from books.models import Book
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, Checkpoint, Hold, OverdueNotification
+from borrowings.pagination import BorrowingPagination
+from borrowings.serializers import (
+    BorrowingDetailSerializer,
+    BorrowingSerializer,
+    HoldSerializer,
+)
+from library_service.fastpath import values_plan
+from library_service.replicas import (
+    is_pinned,
+    replica_routing_middleware,
+    use_replica,
+)
 
 
 class BorrowingsApiTests(APITestCase):
@@ -78,6 +104,39 @@ class BorrowingsApiTests(APITestCase):
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("book_id", res.data)
 
+    def test_create_borrowing_takes_last_copy_only_once(self):
+        user = self._create_user()
+        book = self._create_book(inventory=1)
+        self.client.force_authenticate(user=user)
+
+        payload = {
+            "book_id": book.id,
+            "expected_return_date": now().date() + timedelta(days=2),
+        }
+        first = self.client.post(self.list_url, payload)
+        second = self.client.post(self.list_url, payload)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.data["book_id"], "This book is out of stock")
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 0)
+        self.assertEqual(Borrowing.objects.filter(book=book).count(), 1)
+
+    def test_create_borrowing_unknown_book(self):
+        user = self._create_user()
+        self.client.force_authenticate(user=user)
+
+        payload = {
+            "book_id": 999,
+            "expected_return_date": now().date() + timedelta(days=2),
+        }
+        res = self.client.post(self.list_url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("book_id", res.data)
+        self.assertFalse(Borrowing.objects.exists())
+
     def test_list_borrowings_user_sees_only_own(self):
         user1 = self._create_user(email="u1@example.com")
         user2 = self._create_user(email="u2@example.com")
@@ -186,3 +245,904 @@ class BorrowingsApiTests(APITestCase):
         self.assertIn("user_email", res.data)
         self.assertEqual(res.data["book_title"], "X")
         self.assertEqual(res.data["user_email"], user.email)
+
+    def test_return_borrowing_sets_date_and_restores_inventory(self):
+        user = self._create_user()
+        book = self._create_book(inventory=0)
+        borrowing = Borrowing.objects.create(
+            user=user,
+            book=book,
+            borrow_date=now().date(),
+            expected_return_date=now().date() + timedelta(days=3),
+        )
+        self.client.force_authenticate(user=user)
+        return_url = reverse("borrowings:borrowings-return", args=[borrowing.id])
+
+        res = self.client.post(return_url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["actual_return_date"], str(now().date()))
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 1)
+
+        again = self.client.post(return_url)
+
+        self.assertEqual(again.status_code, status.HTTP_400_BAD_REQUEST)
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 1)
+
+    def test_user_cannot_return_someone_elses_borrowing(self):
+        owner = self._create_user(email="u1@example.com")
+        other = self._create_user(email="u2@example.com")
+        borrowing = Borrowing.objects.create(
+            user=owner,
+            book=self._create_book(),
+            borrow_date=now().date(),
+            expected_return_date=now().date() + timedelta(days=3),
+        )
+        self.client.force_authenticate(user=other)
+
+        res = self.client.post(
+            reverse("borrowings:borrowings-return", args=[borrowing.id])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_return_uses_fixed_number_of_queries(self):
+        staff = self._create_user(email="staff@example.com", is_staff=True)
+        user = self._create_user(email="u1@example.com")
+        books = [self._create_book(inventory=0) for _ in range(3)]
+        borrowings = [
+            Borrowing.objects.create(
+                user=user,
+                book=book,
+                borrow_date=now().date(),
+                expected_return_date=now().date() + timedelta(days=3),
+            )
+            for book in books + books[:1]
+        ]
+        returned = borrowings[-1]
+        returned.actual_return_date = now().date()
+        returned.save()
+        self.client.force_authenticate(user=staff)
+
+        ids = [b.id for b in borrowings] + [999]
+        with self.assertNumQueries(8):
+            res = self.client.post(
+                reverse("borrowings:borrowings-bulk-return"),
+                {"ids": ids},
+                format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["returned"], [b.id for b in borrowings[:3]])
+        self.assertEqual(res.data["already_returned"], [returned.id])
+        self.assertEqual(res.data["not_found"], [999])
+        self.assertEqual(
+            sorted(Book.objects.values_list("inventory", flat=True)), [1, 1, 1]
+        )
+
+    def test_bulk_return_is_staff_only(self):
+        user = self._create_user()
+        self.client.force_authenticate(user=user)
+
+        res = self.client.post(
+            reverse("borrowings:borrowings-bulk-return"), {"ids": [1]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_batch_checkout_creates_all_borrowings(self):
+        user = self._create_user()
+        book1 = self._create_book(inventory=2)
+        book2 = self._create_book(inventory=1)
+        self.client.force_authenticate(user=user)
+        return_date = now().date() + timedelta(days=5)
+
+        payload = [
+            {"book_id": book1.id, "expected_return_date": return_date},
+            {"book_id": book1.id, "expected_return_date": return_date},
+            {"book_id": book2.id, "expected_return_date": return_date},
+        ]
+        res = self.client.post(self.list_url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(Borrowing.objects.filter(user=user).count(), 3)
+        book1.refresh_from_db()
+        book2.refresh_from_db()
+        self.assertEqual((book1.inventory, book2.inventory), (0, 0))
+
+    def test_batch_checkout_is_all_or_nothing(self):
+        user = self._create_user()
+        book1 = self._create_book(inventory=5)
+        book2 = self._create_book(inventory=1)
+        self.client.force_authenticate(user=user)
+        return_date = now().date() + timedelta(days=5)
+
+        payload = [
+            {"book_id": book1.id, "expected_return_date": return_date},
+            {"book_id": book2.id, "expected_return_date": return_date},
+            {"book_id": book2.id, "expected_return_date": return_date},
+        ]
+        res = self.client.post(self.list_url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertEqual(res.data[1], {})
+        self.assertEqual(res.data[2]["book_id"], ["This book is out of stock"])
+        self.assertFalse(Borrowing.objects.exists())
+        book1.refresh_from_db()
+        self.assertEqual(book1.inventory, 5)
+
+    def test_list_borrowings_paginates_with_filters(self):
+        staff = self._create_user(email="staff@example.com", is_staff=True)
+        user = self._create_user(email="u1@example.com")
+        other = self._create_user(email="u2@example.com")
+        book = self._create_book(inventory=5)
+        today = now().date()
+
+        expected = []
+        for days_ago in (0, 0, 1, 2, 2):
+            expected.append(
+                Borrowing.objects.create(
+                    user=user,
+                    book=book,
+                    borrow_date=today - timedelta(days=days_ago),
+                    expected_return_date=today + timedelta(days=3),
+                )
+            )
+        Borrowing.objects.create(
+            user=other,
+            book=book,
+            borrow_date=today,
+            expected_return_date=today + timedelta(days=3),
+        )
+        Borrowing.objects.create(
+            user=user,
+            book=book,
+            borrow_date=today,
+            expected_return_date=today + timedelta(days=3),
+            actual_return_date=today,
+        )
+        self.client.force_authenticate(user=staff)
+
+        seen = []
+        res = self.client.get(
+            self.list_url, {"user_id": user.id, "is_active": "true", "page_size": 2}
+        )
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen += [item["id"] for item in res.data["results"]]
+            if res.data["next"] is None:
+                break
+            res = self.client.get(res.data["next"])
+
+        expected.sort(key=lambda b: (b.borrow_date, b.id), reverse=True)
+        self.assertEqual(seen, [b.id for b in expected])
+
+    def test_explain_borrowings_covers_every_filter_combination(self):
+        user = self._create_user()
+        out = StringIO()
+
+        call_command("explain_borrowings", user_id=user.id, stdout=out)
+
+        headings = [
+            line
+            for line in out.getvalue().splitlines()
+            if line.startswith(("patron", "staff"))
+        ]
+        self.assertEqual(len(headings), 9)
+
+    def test_staff_borrowings_page_seeks_date_index_in_order(self):
+        pagination = BorrowingPagination()
+        pagination.current_ordering = pagination.ordering
+        page = Borrowing.objects.order_by(*pagination.ordering).filter(
+            pagination.rows_after([now().date(), 10])
+        )[: pagination.page_size]
+        if connection.vendor == "postgresql":
+            # An empty table is cheapest to read whole; ask for the plan
+            # the index gives once the table has grown.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+        plan = page.explain()
+        self.assertIn("borrowing_date_id_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_borrowings_list_etag_is_per_user(self):
+        user1 = self._create_user(email="u1@example.com")
+        user2 = self._create_user(email="u2@example.com")
+        book = self._create_book(inventory=5)
+        Borrowing.objects.create(
+            user=user1,
+            book=book,
+            borrow_date=now().date(),
+            expected_return_date=now().date() + timedelta(days=3),
+        )
+        self.client.force_authenticate(user=user1)
+        etag = self.client.get(self.list_url)["ETag"]
+
+        self.client.force_authenticate(user=user2)
+        self.client.post(
+            self.list_url,
+            {
+                "book_id": book.id,
+                "expected_return_date": now().date() + timedelta(days=3),
+            },
+        )
+
+        self.client.force_authenticate(user=user1)
+        res = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(
+            self.list_url,
+            {
+                "book_id": book.id,
+                "expected_return_date": now().date() + timedelta(days=3),
+            },
+        )
+        res = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
+
+    def test_borrowings_page_etag_reads_only_that_page(self):
+        staff = self._create_user(email="staff@example.com", is_staff=True)
+        user = self._create_user(email="u1@example.com")
+        book = self._create_book(inventory=5)
+        today = now().date()
+        for days_ago in range(4, 0, -1):
+            Borrowing.objects.create(
+                user=user,
+                book=book,
+                borrow_date=today - timedelta(days=days_ago),
+                expected_return_date=today + timedelta(days=3),
+            )
+        self.client.force_authenticate(user=staff)
+        first = self.client.get(self.list_url, {"page_size": 2})
+        second = self.client.get(first.data["next"])
+
+        Borrowing.objects.borrow(user, book.id, today + timedelta(days=3))
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(first.data["next"], HTTP_IF_NONE_MATCH=second["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        (validator,) = [query["sql"] for query in queries]
+        self.assertIn("LIMIT 3", validator)
+        self.assertNotIn("COUNT(", validator.upper())
+
+        res = self.client.get(
+            self.list_url, {"page_size": 2}, HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        Borrowing.objects.return_books([second.data["results"][0]["id"]])
+        res = self.client.get(first.data["next"], HTTP_IF_NONE_MATCH=second["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_export_streams_filtered_borrowings(self):
+        staff = self._create_user(email="staff@example.com", is_staff=True)
+        user = self._create_user(email="u1@example.com")
+        book = self._create_book(title="Dune, Part 1")
+        active = Borrowing.objects.create(
+            user=user,
+            book=book,
+            borrow_date=now().date(),
+            expected_return_date=now().date() + timedelta(days=3),
+        )
+        Borrowing.objects.create(
+            user=user,
+            book=book,
+            borrow_date=now().date(),
+            expected_return_date=now().date() + timedelta(days=3),
+            actual_return_date=now().date(),
+        )
+        self.client.force_authenticate(user=staff)
+        export_url = reverse("borrowings:borrowings-export")
+
+        csv_res = self.client.get(export_url, {"format": "csv", "is_active": "true"})
+        ndjson_res = self.client.get(export_url, {"format": "ndjson"})
+
+        self.assertEqual(csv_res.status_code, status.HTTP_200_OK)
+        self.assertTrue(csv_res.streaming)
+        lines = b"".join(csv_res.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[0], "id")
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f"{active.id},"))
+        self.assertIn('"Dune, Part 1"', lines[1])
+
+        records = b"".join(ndjson_res.streaming_content).decode().splitlines()
+        self.assertEqual(len(records), 2)
+        self.assertEqual(json.loads(records[0])["user__email"], user.email)
+
+    async def test_export_streams_asynchronously_under_asgi(self):
+        staff = await sync_to_async(self._create_user)(
+            email="staff@example.com", is_staff=True
+        )
+        book = await sync_to_async(self._create_book)()
+        borrowing = await Borrowing.objects.acreate(
+            user=staff,
+            book=book,
+            borrow_date=now().date(),
+            expected_return_date=now().date() + timedelta(days=3),
+        )
+
+        res = await self.async_client.get(
+            reverse("borrowings:borrowings-export"),
+            {"format": "ndjson"},
+            headers={"Authorize": f"Bearer {AccessToken.for_user(staff)}"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.is_async)
+        body = b"".join([chunk async for chunk in res.streaming_content])
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([record["id"] for record in records], [borrowing.id])
+
+    def test_export_is_staff_only(self):
+        self.client.force_authenticate(user=self._create_user())
+
+        res = self.client.get(reverse("borrowings:borrowings-export"))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def _create_borrowing(self, user, book, days_ago, due_days_ago, returned=None):
+        today = now().date()
+        return Borrowing.objects.create(
+            user=user,
+            book=book,
+            borrow_date=today - timedelta(days=days_ago),
+            expected_return_date=today - timedelta(days=due_days_ago),
+            actual_return_date=(
+                None if returned is None else today - timedelta(days=returned)
+            ),
+        )
+
+    def test_borrowing_detail_includes_fine(self):
+        user = self._create_user()
+        book = self._create_book(daily_fee="1.50")
+        overdue = self._create_borrowing(user, book, days_ago=10, due_days_ago=4)
+        returned_late = self._create_borrowing(
+            user, book, days_ago=10, due_days_ago=8, returned=5
+        )
+        on_time = self._create_borrowing(user, book, days_ago=3, due_days_ago=-3)
+        self.client.force_authenticate(user=user)
+
+        fines = {
+            borrowing.id: self.client.get(
+                reverse("borrowings:borrowings-detail", args=[borrowing.id])
+            ).data["fine"]
+            for borrowing in (overdue, returned_late, on_time)
+        }
+
+        self.assertEqual(
+            fines,
+            {overdue.id: "6.00", returned_late.id: "4.50", on_time.id: "0.00"},
+        )
+
+    def test_overdue_report_totals_per_user(self):
+        staff = self._create_user(email="staff@example.com", is_staff=True)
+        alice = self._create_user(email="alice@example.com")
+        bob = self._create_user(email="bob@example.com")
+        cheap = self._create_book(daily_fee="1.00")
+        dear = self._create_book(daily_fee="2.50")
+        self._create_borrowing(alice, cheap, days_ago=10, due_days_ago=3)
+        self._create_borrowing(alice, dear, days_ago=10, due_days_ago=2)
+        self._create_borrowing(alice, dear, days_ago=10, due_days_ago=2, returned=0)
+        self._create_borrowing(bob, cheap, days_ago=10, due_days_ago=1)
+        self._create_borrowing(bob, cheap, days_ago=1, due_days_ago=-5)
+        self.client.force_authenticate(user=staff)
+        url = reverse("borrowings:borrowings-overdue")
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            [
+                {
+                    "user": alice.id,
+                    "user_email": alice.email,
+                    "overdue_borrowings": 2,
+                    "total_fine": "8.00",
+                },
+                {
+                    "user": bob.id,
+                    "user_email": bob.email,
+                    "overdue_borrowings": 1,
+                    "total_fine": "1.00",
+                },
+            ],
+        )
+
+    def test_overdue_report_is_staff_only(self):
+        self.client.force_authenticate(user=self._create_user())
+
+        res = self.client.get(reverse("borrowings:borrowings-overdue"))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_borrowings_list_values_path_matches_serializer_bytes(self):
+        user = self._create_user()
+        book = self._create_book()
+        self._create_borrowing(user, book, days_ago=10, due_days_ago=4)
+        self._create_borrowing(user, book, days_ago=10, due_days_ago=8, returned=5)
+        self.client.force_authenticate(user=user)
+        expected = BorrowingSerializer(Borrowing.objects.order_by("id"), many=True).data
+
+        res = self.client.get(self.list_url)
+
+        self.assertIsNotNone(values_plan(BorrowingSerializer))
+        self.assertIsNone(values_plan(BorrowingDetailSerializer))
+        self.assertEqual(res.content, JSONRenderer().render(expected))
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    def test_new_loan_is_read_from_primary_after_borrowing(self):
+        cache.clear()
+        user = self._create_user()
+        book = self._create_book()
+        self.client.force_authenticate(user=user)
+
+        self.client.post(
+            self.list_url,
+            {
+                "book_id": book.id,
+                "expected_return_date": now().date() + timedelta(days=3),
+            },
+        )
+        # The "replica" alias does not exist, so this only works pinned.
+        res = self.client.get(self.list_url)
+
+        self.assertTrue(is_pinned(user.id))
+        self.assertEqual([item["book"] for item in res.data], [book.id])
+
+
+class HoldTests(APITestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.borrower, self.first, self.second = (
+            User.objects.create_user(email=f"{name}@example.com", password="pass1234")
+            for name in ("borrower", "first", "second")
+        )
+        self.book = Book.objects.create(
+            title="Dune", author="Frank Herbert", inventory=0, daily_fee="2.00"
+        )
+        self.loan = Borrowing.objects.create(
+            user=self.borrower,
+            book=self.book,
+            borrow_date=now().date(),
+            expected_return_date=now().date() + timedelta(days=7),
+        )
+        self.holds_url = reverse("borrowings:holds-list")
+        self.due = now().date() + timedelta(days=14)
+
+    def _place(self, user, book=None):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.holds_url, {"book_id": (book or self.book).id})
+
+    def _queue(self):
+        holds = [
+            Hold.objects.get(pk=self._place(user).data["id"])
+            for user in (self.first, self.second)
+        ]
+        Borrowing.objects.return_books([self.loan.id])
+        for hold in holds:
+            hold.refresh_from_db()
+        return holds
+
+    def test_hold_only_on_out_of_stock_book_once_per_patron(self):
+        in_stock = Book.objects.create(
+            title="Emma", author="Jane Austen", inventory=1, daily_fee="1.00"
+        )
+
+        res = self._place(self.first, in_stock)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["book_id"], "This book is in stock")
+
+        res = self._place(self.first)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["status"], Hold.Status.WAITING)
+        self.assertEqual(res.data["book_title"], "Dune")
+
+        res = self._place(self.first)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_concurrent_duplicate_hold_is_rejected(self):
+        self.assertEqual(self._place(self.first).status_code, status.HTTP_201_CREATED)
+
+        # The second request validated before the first one's hold was saved.
+        with mock.patch.object(
+            HoldSerializer, "validate_book_id", lambda serializer, value: value
+        ):
+            res = self._place(self.first)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["book_id"], ["You already have a hold on this book"])
+        self.assertEqual(Hold.objects.filter(user=self.first).count(), 1)
+
+    def test_returned_copy_goes_to_oldest_hold(self):
+        first, second = self._queue()
+
+        self.assertEqual(first.status, Hold.Status.READY)
+        self.assertEqual(first.expires_at - first.ready_at, timedelta(hours=72))
+        self.assertEqual(second.status, Hold.Status.WAITING)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+    def test_pickup_borrows_the_copy_set_aside(self):
+        first, second = self._queue()
+
+        self.client.force_authenticate(user=self.second)
+        res = self.client.post(
+            reverse("borrowings:holds-pickup", args=[second.id]),
+            {"expected_return_date": self.due},
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.first)
+        res = self.client.post(
+            reverse("borrowings:holds-pickup", args=[first.id]),
+            {"expected_return_date": self.due},
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["user"], self.first.id)
+        first.refresh_from_db()
+        self.assertEqual(first.status, Hold.Status.FULFILLED)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+    def test_cancelling_ready_hold_passes_copy_on(self):
+        first, second = self._queue()
+
+        self.client.force_authenticate(user=self.first)
+        res = self.client.delete(reverse("borrowings:holds-detail", args=[first.id]))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        second.refresh_from_db()
+        self.assertEqual(second.status, Hold.Status.READY)
+        res = self.client.delete(reverse("borrowings:holds-detail", args=[first.id]))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expire_holds_passes_copy_on_then_shelves_it(self):
+        first, second = self._queue()
+        later = now() + timedelta(hours=73)
+
+        self.assertEqual(Hold.objects.expire(10, later), 1)
+        second.refresh_from_db()
+        self.assertEqual(second.status, Hold.Status.READY)
+
+        Hold.objects.filter(pk=second.pk).update(expires_at=now())
+        call_command("expire_holds", stdout=StringIO())
+
+        self.assertEqual(
+            set(Hold.objects.values_list("status", flat=True)),
+            {Hold.Status.EXPIRED},
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+    def test_restocked_copies_go_to_waiting_holds_first(self):
+        first, second = (
+            Hold.objects.get(pk=self._place(user).data["id"])
+            for user in (self.first, self.second)
+        )
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", password="pass1234", is_staff=True
+        )
+        self.client.force_authenticate(user=staff)
+        res = self.client.patch(
+            reverse("books:book-detail", args=[self.book.id]), {"inventory": 1}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, Hold.Status.READY)
+        self.assertEqual(second.status, Hold.Status.WAITING)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+        # Restocked without passing the copy on; the queue still comes first.
+        Book.objects.filter(pk=self.book.pk).update(inventory=1)
+        self.client.force_authenticate(user=self.borrower)
+        item = {"book_id": self.book.id, "expected_return_date": self.due}
+        list_url = reverse("borrowings:borrowings-list")
+        for data in (item, [item]):
+            res = self.client.post(list_url, data, format="json")
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self._place(self.borrower).status_code, status.HTTP_201_CREATED
+        )
+
+        self.assertEqual(Hold.objects.serve(), 0)
+        second.refresh_from_db()
+        self.assertEqual(second.status, Hold.Status.READY)
+        self.assertEqual(
+            Hold.objects.get(user=self.borrower).status, Hold.Status.WAITING
+        )
+
+    def test_expire_holds_serves_restocked_copies(self):
+        hold = Hold.objects.get(pk=self._place(self.first).data["id"])
+        Book.objects.filter(pk=self.book.pk).update(inventory=2)
+
+        call_command("expire_holds", stdout=StringIO())
+
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Hold.Status.READY)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+    def test_patrons_see_own_holds_and_staff_filter_by_book(self):
+        self._place(self.first)
+        self._place(self.second)
+
+        res = self.client.get(self.holds_url)
+        self.assertEqual([hold["user"] for hold in res.data], [self.second.id])
+
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", password="pass1234", is_staff=True
+        )
+        self.client.force_authenticate(user=staff)
+        res = self.client.get(self.holds_url, {"book_id": self.book.id})
+        self.assertEqual(
+            [hold["user"] for hold in res.data], [self.first.id, self.second.id]
+        )
+
+
+@override_settings(MAX_ACTIVE_BORROWINGS=3)
+class LoanCounterTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="patron@example.com", password="pass1234"
+        )
+        self.book = Book.objects.create(
+            title="Dune", author="Frank Herbert", inventory=10, daily_fee="2.00"
+        )
+        self.list_url = reverse("borrowings:borrowings-list")
+        self.due = now().date() + timedelta(days=14)
+        self.client.force_authenticate(user=self.user)
+
+    def _borrow(self, count=None):
+        item = {"book_id": self.book.id, "expected_return_date": self.due}
+        return self.client.post(
+            self.list_url, item if count is None else [item] * count, format="json"
+        )
+
+    def _counters(self):
+        self.user.refresh_from_db()
+        self.book.refresh_from_db()
+        return self.user.active_borrowings, self.book.checked_out
+
+    def test_borrows_and_returns_keep_counters(self):
+        self.assertEqual(self._borrow().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._borrow(2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._counters(), (3, 3))
+        res = self.client.get(reverse("books:book-detail", args=[self.book.id]))
+        self.assertEqual(res.data["checked_out"], 3)
+
+        first, *rest = Borrowing.objects.filter(user=self.user).order_by("id")
+        self.client.post(reverse("borrowings:borrowings-return", args=[first.id]))
+        self.assertEqual(self._counters(), (2, 2))
+        Borrowing.objects.return_books([borrowing.id for borrowing in rest])
+        self.assertEqual(self._counters(), (0, 0))
+
+    def test_limit_is_checked_without_counting_borrowings(self):
+        self._borrow(2)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self._borrow(2)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, ["You can have at most 3 books out at once"])
+        self.assertFalse(
+            [query for query in queries if "COUNT(" in query["sql"].upper()]
+        )
+
+        self.assertEqual(self._borrow().status_code, status.HTTP_201_CREATED)
+        res = self._borrow()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._counters(), (3, 3))
+        self.assertEqual(self.book.inventory, 7)
+
+    def test_pickup_counts_towards_limit(self):
+        self._borrow(3)
+        book = Book.objects.create(
+            title="Emma", author="Jane Austen", inventory=0, daily_fee="1.00"
+        )
+        hold = Hold.objects.create(
+            user=self.user,
+            book=book,
+            status=Hold.Status.READY,
+            expires_at=now() + timedelta(days=1),
+        )
+        pickup_url = reverse("borrowings:holds-pickup", args=[hold.id])
+
+        res = self.client.post(pickup_url, {"expected_return_date": self.due})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Hold.Status.READY)
+
+        Borrowing.objects.return_books(
+            Borrowing.objects.filter(user=self.user).values_list("id", flat=True)[:1]
+        )
+        res = self.client.post(pickup_url, {"expected_return_date": self.due})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        book.refresh_from_db()
+        self.assertEqual(book.checked_out, 1)
+        self.assertEqual(self._counters(), (3, 2))
+
+    def test_repair_counters_reports_and_corrects_drift(self):
+        self._borrow(2)
+        # Made behind the managers' backs, as the admin would.
+        Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            borrow_date=now().date(),
+            expected_return_date=self.due,
+        )
+        Book.objects.filter(pk=self.book.pk).update(checked_out=5)
+
+        out = StringIO()
+        call_command("repair_counters", "--dry-run", "--chunk-size=1", stdout=out)
+        self.assertIn(
+            f"users.User.active_borrowings of {self.user.id}: 2, counted 3",
+            out.getvalue(),
+        )
+        self.assertIn(
+            f"books.Book.checked_out of {self.book.id}: 5, counted 3", out.getvalue()
+        )
+        self.assertEqual(self._counters(), (2, 5))
+
+        call_command("repair_counters", stdout=StringIO())
+        self.assertEqual(self._counters(), (3, 3))
+        out = StringIO()
+        call_command("repair_counters", stdout=out)
+        self.assertIn("books.Book.checked_out: corrected 0 drifted", out.getvalue())
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.routed = []
+        self.middleware = replica_routing_middleware(self.view)
+
+    def view(self, request):
+        use_replica(request.user)
+        self.routed.append(Book.objects.all().db)
+        if request.method == "POST":
+            Book.objects.filter(pk=0).update(inventory=0)
+            self.routed.append(Book.objects.all().db)
+        return HttpResponse()
+
+    def request(self, method, user):
+        request = getattr(RequestFactory(), method)("/")
+        request.user = user
+        self.middleware(request)
+
+    def test_reads_go_to_replica_until_the_user_writes(self):
+        writer = get_user_model().objects.create_user("w@x.com", "testpass123")
+        other = get_user_model().objects.create_user("o@x.com", "testpass123")
+
+        self.request("get", writer)
+        self.request("post", writer)
+        self.request("get", writer)
+        self.request("get", other)
+
+        self.assertEqual(
+            self.routed, ["replica", "replica", "default", "default", "replica"]
+        )
+        self.assertEqual(Book.objects.all().db, "default")
+
+
+class FailingBackend:
+    def send(self, notification):
+        raise ConnectionError("mail server down")
+
+
+class OverdueOutboxTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="patron@example.com", password="testpass123"
+        )
+        self.book = Book.objects.create(
+            title="Dune", author="Frank Herbert", inventory=3, daily_fee="2.00"
+        )
+        today = now().date()
+        self.overdue = [
+            Borrowing.objects.create(
+                user=self.user,
+                book=self.book,
+                borrow_date=today - timedelta(days=10),
+                expected_return_date=today - timedelta(days=days),
+            )
+            for days in (1, 2, 3)
+        ]
+        Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            borrow_date=today,
+            expected_return_date=today + timedelta(days=7),
+        )
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.outbox_file = Path(tmp.name) / "outbox.jsonl"
+
+    def _scan(self, **options):
+        call_command("scan_overdue", stdout=StringIO(), **options)
+
+    def _drain(self, backend="borrowings.notifications.FileBackend", **options):
+        config = {
+            "BACKEND": backend,
+            "FILE_PATH": str(self.outbox_file),
+            "MAX_ATTEMPTS": 2,
+        }
+        with override_settings(OVERDUE_NOTIFICATIONS=config):
+            call_command("drain_outbox", stdout=StringIO(), **options)
+
+    def test_scan_queues_each_overdue_borrowing_once(self):
+        self._scan(chunk_size=2)
+        self._scan(chunk_size=2)
+
+        self.assertEqual(
+            sorted(OverdueNotification.objects.values_list("borrowing_id", flat=True)),
+            [borrowing.id for borrowing in self.overdue],
+        )
+        notification = OverdueNotification.objects.get(borrowing=self.overdue[2])
+        self.assertEqual(notification.payload["fine"], "6.00")
+        self.assertEqual(Checkpoint.objects.get(job="scan_overdue").last_id, 0)
+
+    def test_scan_resumes_from_checkpoint(self):
+        Checkpoint.objects.create(job="scan_overdue", last_id=self.overdue[0].id)
+
+        self._scan()
+
+        self.assertEqual(
+            sorted(OverdueNotification.objects.values_list("borrowing_id", flat=True)),
+            [borrowing.id for borrowing in self.overdue[1:]],
+        )
+
+    def test_scan_chunks_seek_active_id_index(self):
+        today = now().date()
+        chunk = (
+            Borrowing.objects.overdue(today)
+            .filter(pk__gt=self.overdue[0].id)
+            .order_by("pk")[:2]
+        )
+        if connection.vendor == "postgresql":
+            # A handful of rows is cheapest to fetch by bitmap and sort;
+            # ask for the ordered scan the index gives a grown table.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_bitmapscan = off")
+
+        plan = chunk.explain()
+        self.assertIn("borrowing_active_id_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_drain_delivers_pending_notifications(self):
+        self._scan()
+
+        self._drain(batch_size=2)
+        self._drain(batch_size=2)
+
+        messages = [
+            json.loads(line) for line in self.outbox_file.read_text().splitlines()
+        ]
+        self.assertEqual(len(messages), 3)
+        self.assertEqual(messages[0]["to"], self.user.email)
+        self.assertIn("Dune", messages[0]["subject"])
+        self.assertFalse(OverdueNotification.objects.filter(sent_at=None).exists())
+
+    def test_drain_gives_up_after_max_attempts(self):
+        self._scan()
+
+        for _ in range(3):
+            self._drain(backend="borrowings.tests.FailingBackend")
+
+        self.assertEqual(
+            set(OverdueNotification.objects.values_list("attempts", "last_error")),
+            {(2, "mail server down")},
+        )
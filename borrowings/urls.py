@@ -1,9 +1,11 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from borrowings.views import BorrowingViewSet
+from borrowings.views import BorrowingViewSet, HoldViewSet
 
 router = DefaultRouter()
+# Before "", whose detail route would otherwise match "holds/".
+router.register("holds", HoldViewSet, basename="holds")
 router.register("", BorrowingViewSet, basename="borrowings")
 
 urlpatterns = [path("", include(router.urls))]
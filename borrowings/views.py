@@ -1,22 +1,54 @@
-from rest_framework import mixins, viewsets
-from rest_framework.permissions import IsAuthenticated
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.timezone import now
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
 
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, Hold
+from borrowings.pagination import BorrowingPagination
+from borrowings.renderers import CSVRenderer, NDJSONRenderer
 from borrowings.serializers import (
     BorrowingCreateSerializer,
     BorrowingDetailSerializer,
+    BorrowingReturnSerializer,
     BorrowingSerializer,
+    HoldPickupSerializer,
+    HoldSerializer,
+    OverdueTotalSerializer,
 )
+from library_service.async_views import AsyncReadModelMixin
+from library_service.conditional import ConditionalGetMixin
+from library_service.fastpath import ValuesListMixin
+from library_service.pagination import KeysetPagination
+from library_service.replicas import ReplicaReadMixin
 
 
 class BorrowingViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    AsyncReadModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
     viewsets.GenericViewSet,
 ):
     queryset = Borrowing.objects.select_related("book", "user")
+    export_fields = (
+        "id",
+        "borrow_date",
+        "expected_return_date",
+        "actual_return_date",
+        "book_id",
+        "book__title",
+        "user_id",
+        "user__email",
+    )
+    export_chunk_size = 2000
     permission_classes = (IsAuthenticated,)
+    pagination_class = BorrowingPagination
 
     def get_queryset(self):
         queryset = self.queryset
@@ -38,11 +70,208 @@ class BorrowingViewSet(
             elif val in ("false", "0", "no"):
                 queryset = queryset.filter(actual_return_date__isnull=False)
 
+        if self.action in ("retrieve", "return_book"):
+            queryset = queryset.with_fines()
+
         return queryset
 
+    def get_list_validator(self):
+        return list(self.list_validator_queryset())
+
+    def get_object_validator(self):
+        # The fine of an overdue borrowing grows every day, so the date is
+        # part of the validator.
+        row = self.object_validator_queryset().first()
+        return row and (*row, now().date())
+
+    async def aget_list_validator(self):
+        return [row async for row in self.list_validator_queryset()]
+
+    async def aget_object_validator(self):
+        row = await self.object_validator_queryset().afirst()
+        return row and (*row, now().date())
+
+    def list_validator_queryset(self):
+        """
+        Keys and ``updated_at`` of the rows the response will hold, the
+        look-ahead row of a page included. Nothing outside them can change
+        the response, so the validator costs one page read through the
+        pagination index rather than a scan of every borrowing in the list.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginator.get_page_queryset(queryset, self.request, view=self)
+        if page is None:
+            page = queryset.order_by("pk")
+        return page.values_list("pk", "updated_at")
+
+    def object_validator_queryset(self):
+        return (
+            self.get_queryset()
+            .filter(pk=self.kwargs["pk"])
+            .values_list("updated_at", "book__updated_at", "user__email")
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        # A list posted to the create endpoint checks out several books at once.
+        if isinstance(kwargs.get("data"), list):
+            kwargs["many"] = True
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_class(self):
         if self.action == "create":
             return BorrowingCreateSerializer
-        if self.action == "retrieve":
+        if self.action in ("retrieve", "return_book"):
             return BorrowingDetailSerializer
+        if self.action == "bulk_return":
+            return BorrowingReturnSerializer
+        if self.action == "overdue":
+            return OverdueTotalSerializer
         return BorrowingSerializer
+
+    @action(detail=True, methods=["post"], url_path="return", url_name="return")
+    def return_book(self, request, pk=None):
+        """Return a single borrowed book."""
+        borrowing = self.get_object()
+        return_date = now().date()
+
+        if borrowing.actual_return_date is not None or not (
+            Borrowing.objects.return_books([borrowing.id], return_date)
+        ):
+            raise serializers.ValidationError(
+                "This borrowing has already been returned"
+            )
+
+        borrowing.actual_return_date = return_date
+        serializer = self.get_serializer(borrowing)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="return",
+        url_name="bulk-return",
+        permission_classes=(IsAdminUser,),
+    )
+    def bulk_return(self, request):
+        """Return many borrowings at once, e.g. from a drop box scan."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save(), status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        url_path="overdue",
+        url_name="overdue",
+        permission_classes=(IsAdminUser,),
+        pagination_class=None,
+    )
+    def overdue(self, request):
+        """
+        Per-user totals of borrowings that are past due and not yet returned.
+
+        Counts and fines are summed by a single GROUP BY query; the
+        ``user_id`` filter of the list endpoint applies.
+        """
+        totals = self.get_queryset().overdue_totals()
+        serializer = self.get_serializer(totals, many=True)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        url_path="export",
+        url_name="export",
+        permission_classes=(IsAdminUser,),
+        renderer_classes=(CSVRenderer, NDJSONRenderer),
+    )
+    def export(self, request):
+        """
+        Stream borrowings as CSV or NDJSON (``?format=csv|ndjson``).
+
+        Rows come from a server-side cursor as plain tuples and are written
+        out chunk by chunk, so memory use does not depend on the row count.
+        Honors the same filters as the list endpoint. Under ASGI the rows
+        are read asynchronously: Django would read a plain iterator to the
+        end before sending anything.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by("id")
+        fields, chunk_size = self.export_fields, self.export_chunk_size
+        renderer = request.accepted_renderer
+        if isinstance(request._request, ASGIRequest):
+            # Plain values_list() rows would be queried on the event loop as
+            # aiterator() starts; named ones are read in a thread throughout.
+            rows = queryset.values_list(*fields, named=True)
+            content = renderer.astream(fields, rows.aiterator(chunk_size=chunk_size))
+        else:
+            rows = queryset.values_list(*fields)
+            content = renderer.stream(fields, rows.iterator(chunk_size=chunk_size))
+        response = StreamingHttpResponse(
+            content,
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="borrowings.{renderer.format}"'
+        )
+        return response
+
+
+class HoldViewSet(
+    ReplicaReadMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Holds on out-of-stock books. A copy coming back on the shelf, returned
+    or restocked, goes to the oldest waiting hold and stays set aside until
+    picked up or the pickup window passes, so patrons wait for their hold
+    to turn ``READY`` instead of retrying the checkout.
+    """
+
+    queryset = Hold.objects.select_related("book")
+    serializer_class = HoldSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = self.queryset
+        user = self.request.user
+        params = self.request.query_params
+
+        if user.is_staff:
+            user_id = params.get("user_id")
+            if user_id:
+                queryset = queryset.filter(user_id=user_id)
+        else:
+            queryset = queryset.filter(user=user)
+
+        book_id = params.get("book_id")
+        if book_id:
+            queryset = queryset.filter(book_id=book_id)
+        status_ = params.get("status")
+        if status_:
+            queryset = queryset.filter(status=status_.upper())
+        return queryset.order_by("id")
+
+    def get_serializer_class(self):
+        if self.action == "pickup":
+            return HoldPickupSerializer
+        return HoldSerializer
+
+    def perform_destroy(self, instance):
+        if not Hold.objects.cancel(instance):
+            raise serializers.ValidationError("This hold is no longer open")
+
+    @action(detail=True, methods=["post"], url_path="pickup", url_name="pickup")
+    def pickup(self, request, pk=None):
+        """Borrow the copy set aside for a ready hold."""
+        hold = self.get_object()
+        serializer = self.get_serializer(
+            data=request.data, context={**self.get_serializer_context(), "hold": hold}
+        )
+        serializer.is_valid(raise_exception=True)
+        borrowing = serializer.save()
+        return Response(
+            BorrowingSerializer(borrowing).data, status=status.HTTP_201_CREATED
+        )
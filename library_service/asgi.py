@@ -2,6 +2,9 @@
 ASGI config for library_service project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The project is served through it (see docker-compose.yaml): long-lived
+responses such as the book stream (see books.stream) wait on the event loop
+instead of holding a thread, and stream as they are written.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -9,8 +12,14 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "library_service.settings")
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    # Serve the admin's and API docs' static files, as runserver does.
+    application = ASGIStaticFilesHandler(application)
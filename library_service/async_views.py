@@ -0,0 +1,144 @@
+"""
+Async read paths for DRF views.
+
+DRF dispatches synchronously, so under ASGI every request holds a worker
+thread for its whole lifetime. ``AsyncViewMixin`` gives a view an async
+entry point instead: a request whose handler has an async twin (``alist``,
+``aretrieve``, or ``aget``/``apost`` on plain API views) is authenticated
+and served on the event loop, with the ORM reached through its async API.
+Every other request falls back to the regular synchronous view, run in a
+thread the same way Django runs any sync view under ASGI, as does every
+request when ``settings.ASYNC_VIEWS`` is off. So do requests served over
+WSGI, where Django would start an event loop per request just to run the
+async handler.
+"""
+
+from functools import wraps
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+from rest_framework import exceptions
+from rest_framework.response import Response
+
+
+class AsyncViewMixin:
+    @classonlymethod
+    def as_view(cls, *args, **initkwargs):
+        sync_view = super().as_view(*args, **initkwargs)
+        actions = getattr(sync_view, "actions", None)
+        initkwargs = getattr(sync_view, "initkwargs", initkwargs)
+
+        async def view(request, *args, **kwargs):
+            if (
+                not settings.ASYNC_VIEWS
+                or not isinstance(request, ASGIRequest)
+                or cls.async_handler_name(request.method, actions) is None
+            ):
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            if actions is not None:
+                self.action_map = actions
+            self.setup(request, *args, **kwargs)
+            return await self.adispatch(request, *args, **kwargs)
+
+        # Keep cls, initkwargs, actions and csrf_exempt for routers and
+        # schema generation.
+        view = wraps(sync_view)(view)
+        markcoroutinefunction(view)
+        return view
+
+    @classmethod
+    def async_handler_name(cls, method, actions):
+        method = method.lower()
+        if method in ("head", "options"):
+            return None
+        name = "a" + (actions.get(method, "") if actions else method)
+        return name if hasattr(cls, name) else None
+
+    async def adispatch(self, request, *args, **kwargs):
+        """``APIView.dispatch`` with async authentication and handler."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.aperform_authentication(request)
+            # The user is already set, so initial() skips authentication.
+            self.initial(request, *args, **kwargs)
+            actions = getattr(self, "action_map", None)
+            handler = getattr(self, self.async_handler_name(request.method, actions))
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        # Render here so Django does not hand the response to a thread for it.
+        return self.response.render()
+
+    async def aperform_authentication(self, request):
+        """``Request._authenticate`` for authenticators that may be async."""
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(
+                        request
+                    )
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+
+class AsyncReadModelMixin(AsyncViewMixin):
+    """Async ``list`` and ``retrieve`` for generic viewsets."""
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        paginator = self.paginator
+        page_queryset = (
+            paginator.get_page_queryset(queryset, request, view=self)
+            if paginator is not None
+            else None
+        )
+        if page_queryset is not None:
+            # A page is small and bounded; fetch it in one round trip.
+            page = paginator.get_page([row async for row in page_queryset])
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        rows = [row async for row in queryset.aiterator()]
+        serializer = self.get_serializer(rows, many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    async def aget_object(self):
+        """``get_object`` through ``QuerySet.aget``."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
@@ -0,0 +1,129 @@
+"""Helpers shared by the ``bench_*`` management commands."""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def benchmark_database(keepdb=False, verbosity=0):
+    """Run the block against a throwaway copy of the default database."""
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(
+            old_name, verbosity=verbosity, keepdb=keepdb
+        )
+        teardown_test_environment()
+
+
+async def asgi_request(application, method, path, query="", headers=(), body=b""):
+    """
+    Serve one request through ``application`` the way an ASGI server would
+    and return the response status.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    finished = asyncio.Event()
+    requested = False
+    status = None
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Stay connected until the application is done: a disconnect cancels
+        # the request before Django closes its database connections.
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        finished.set()
+    return status
+
+
+def run_concurrently(task, count, concurrency):
+    """
+    Call ``task(i)`` for ``i`` in ``range(count)`` from ``concurrency`` threads.
+
+    Returns ``(results, latencies, elapsed)`` where ``results`` and
+    ``latencies`` are indexed by ``i`` and ``elapsed`` is the wall time.
+    """
+    results = [None] * count
+    latencies = [0.0] * count
+    next_index = iter(range(count))
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    i = next(next_index, None)
+                if i is None:
+                    return
+                started = time.perf_counter()
+                results[i] = task(i)
+                latencies[i] = time.perf_counter() - started
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, latencies, time.perf_counter() - started
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples`` (``pct`` in 0..100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and latency percentiles (in milliseconds) of one run."""
+    return {
+        "requests": len(latencies),
+        "per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
@@ -0,0 +1,175 @@
+"""Database helpers that go below the ORM."""
+
+import csv
+import io
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+def copy_rows(connection, table, columns, rows, chunk_size=10000):
+    """
+    Load ``rows`` into ``table`` with ``COPY ... FROM STDIN`` (PostgreSQL only).
+
+    Rows are sent as CSV, so empty strings arrive as NULL; validate them out
+    beforehand. Works with both psycopg2 and psycopg 3; with psycopg 3,
+    ``rows`` may be a generator and is sent ``chunk_size`` rows at a time
+    while the server inserts the previous ones; it must not query through
+    ``connection`` meanwhile.
+    """
+    quote = connection.ops.quote_name
+    sql = (
+        f"COPY {quote(table)} ({', '.join(quote(column) for column in columns)}) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):
+            writer.writerows(rows)
+            buffer.seek(0)
+            raw.copy_expert(sql, buffer)
+            return
+
+        rows = iter(rows)
+        with raw.copy(sql) as copy:
+            while chunk := list(islice(rows, chunk_size)):
+                writer.writerows(chunk)
+                copy.write(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+
+
+def insert_rows(connection, table, columns, rows):
+    """
+    Insert ``rows`` as fast as the backend allows: ``copy_rows`` on
+    PostgreSQL, a single ``executemany`` elsewhere.
+
+    Values go to the driver as they are, skipping the ORM's per-value
+    preparation; pass ones it adapts natively (adapt aware datetimes with
+    ``connection.ops.adapt_datetimefield_value``).
+    """
+    if connection.vendor == "postgresql":
+        copy_rows(connection, table, columns, rows)
+        return
+
+    quote = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {quote(table)} "
+        f"({', '.join(quote(column) for column in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+@contextmanager
+def bulk_loading(connection, tables):
+    """
+    Load many rows into ``tables`` with their secondary indexes, and foreign
+    keys on PostgreSQL, dropped; they are rebuilt in one pass each on exit,
+    which is much cheaper than updating them row by row. Primary keys and
+    unique indexes stay.
+
+    Everything runs in one transaction, so a failed load leaves the schema
+    as it was; the tables are locked against other writers until it ends.
+    Foreign keys are checked once the rows are in.
+    """
+    with connection.constraint_checks_disabled():
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                recreate = []
+                for table in tables:
+                    if connection.vendor == "postgresql":
+                        recreate += _drop_postgresql_indexes(connection, cursor, table)
+                    elif connection.vendor == "sqlite":
+                        recreate += _drop_sqlite_indexes(connection, cursor, table)
+            yield
+            with connection.cursor() as cursor:
+                for sql in recreate:
+                    cursor.execute(sql)
+            connection.check_constraints(table_names=tables)
+
+
+def _drop_postgresql_indexes(connection, cursor, table):
+    quote = connection.ops.quote_name
+    quoted = quote(table)
+    cursor.execute(
+        """
+        SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+        FROM pg_index
+        WHERE indrelid = %s::regclass AND NOT indisprimary AND NOT indisunique
+        """,
+        [quoted],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        """,
+        [quoted],
+    )
+    foreign_keys = cursor.fetchall()
+
+    recreate = []
+    for name, definition in indexes:
+        cursor.execute(f"DROP INDEX {name}")
+        recreate.append(definition)
+    for name, definition in foreign_keys:
+        name = quote(name)
+        cursor.execute(f"ALTER TABLE {quoted} DROP CONSTRAINT {name}")
+        recreate.append(f"ALTER TABLE {quoted} ADD CONSTRAINT {name} {definition}")
+    return recreate
+
+
+def _drop_sqlite_indexes(connection, cursor, table):
+    # Indexes without SQL back PRIMARY KEY and UNIQUE column constraints.
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+        [table],
+    )
+    recreate = []
+    for name, sql in cursor.fetchall():
+        if sql.upper().startswith("CREATE UNIQUE"):
+            continue
+        cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+        recreate.append(sql)
+    return recreate
+
+
+def pool_stats(alias=DEFAULT_DB_ALIAS):
+    """
+    Live counters of this process's connection pool for ``alias``.
+
+    Returns None when the database is not pooled. ``recycled`` counts
+    connections closed for age or idleness; ``lost`` those found broken on
+    checkout or return.
+    """
+    pool = getattr(connections[alias], "pool", None)
+    if pool is None:
+        return None
+
+    stats = pool.get_stats()
+    size = stats.get("pool_size", 0)
+    created = stats.get("connections_num", 0)
+    lost = stats.get("connections_lost", 0) + stats.get("returns_bad", 0)
+    return {
+        "min_size": stats.get("pool_min", pool.min_size),
+        "max_size": stats.get("pool_max", pool.max_size),
+        "size": size,
+        "idle": stats.get("pool_available", 0),
+        "in_use": size - stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "created": created,
+        "recycled": max(created - size - lost, 0),
+        "lost": lost,
+        "requests": stats.get("requests_num", 0),
+        "requests_queued": stats.get("requests_queued", 0),
+        "requests_failed": stats.get("requests_errors", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+    }
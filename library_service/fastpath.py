@@ -0,0 +1,191 @@
+"""
+Read-only ``list`` straight from ``QuerySet.values()``.
+
+For plain model serializers most of the time spent on a list goes into
+DRF's per-row field machinery rather than the database. ``values_plan``
+checks once per serializer class whether every readable field is a
+simple column whose representation depends only on its value; if so,
+``ValuesListMixin`` fetches just those columns as dicts and formats them
+in place the way the fields' ``to_representation`` would (not at all when
+that is the identity), so the JSON renderer produces the same bytes as
+the serializer. Anything else — nested or method fields, dotted
+sources, custom ``to_representation``, non-JSON renderers — falls back to
+the regular serializer.
+"""
+
+import decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Fields whose to_representation() returns a column value unchanged.
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+# Fields whose to_representation() depends on nothing but the value.
+FORMATTED_FIELDS = (
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.UUIDField,
+)
+
+_plans = {}
+
+
+class ValuesPlan:
+    """Columns to fetch and how to turn each row into the serializer output."""
+
+    def __init__(self, columns):
+        # (output key, values() lookup, converter or None)
+        self.columns = columns
+        self.lookups = [lookup for _, lookup, _ in columns]
+        self.converters = [(key, convert) for key, _, convert in columns if convert]
+        self.renamed = any(key != lookup for key, lookup, _ in columns)
+
+    def represent(self, rows):
+        """Turn ``values()`` rows into output dicts, reusing them where possible."""
+        if self.renamed or (rows and len(rows[0]) != len(self.columns)):
+            # Renamed fields or extra columns, e.g. a rank used for the cursor.
+            rows = [
+                {key: row[lookup] for key, lookup, _ in self.columns} for row in rows
+            ]
+        for key, convert in self.converters:
+            for row in rows:
+                value = row[key]
+                if value is not None:
+                    row[key] = convert(value)
+        return rows
+
+
+def decimal_converter(field):
+    """``DecimalField.to_representation`` with the quantize context built once."""
+    if (
+        field.decimal_places is None
+        or field.localize
+        or field.normalize_output
+        or not getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    ):
+        return field.to_representation
+
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return "{:f}".format(
+            value.quantize(exponent, rounding=rounding, context=context)
+        )
+
+    return convert
+
+
+def values_plan(serializer_class):
+    """Return the ``ValuesPlan`` of ``serializer_class``, or None if unsupported."""
+    if serializer_class not in _plans:
+        _plans[serializer_class] = _build_plan(serializer_class)
+    return _plans[serializer_class]
+
+
+def _build_plan(serializer_class):
+    if (
+        not issubclass(serializer_class, serializers.ModelSerializer)
+        or serializer_class.to_representation
+        is not serializers.Serializer.to_representation
+    ):
+        return None
+
+    model = serializer_class.Meta.model
+    columns = []
+    for field in serializer_class()._readable_fields:
+        source = field.source
+        if "." in source or source == "*":
+            return None
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+
+        field_type = type(field)
+        if field_type is serializers.PrimaryKeyRelatedField:
+            # values() yields the foreign key, as the pk-only optimization does.
+            if not model_field.many_to_one or field.pk_field is not None:
+                return None
+            convert = None
+        elif model_field.is_relation:
+            return None
+        elif field_type in IDENTITY_FIELDS:
+            convert = None
+        elif field_type is serializers.DecimalField:
+            convert = decimal_converter(field)
+        elif field_type in FORMATTED_FIELDS:
+            convert = field.to_representation
+        else:
+            return None
+        columns.append((field.field_name, source, convert))
+    return ValuesPlan(columns)
+
+
+class ValuesListMixin:
+    """Serves ``list`` (and ``alist``) through ``values_plan`` when possible."""
+
+    def get_values_plan(self):
+        if type(self.request.accepted_renderer) is not JSONRenderer:
+            return None
+        return values_plan(self.get_serializer_class())
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_values_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset, paginated = self.get_values_queryset(plan)
+        return self.get_values_response(plan, list(queryset), paginated)
+
+    async def alist(self, request, *args, **kwargs):
+        plan = self.get_values_plan()
+        if plan is None:
+            return await super().alist(request, *args, **kwargs)
+        queryset, paginated = self.get_values_queryset(plan)
+        if paginated:
+            rows = [row async for row in queryset]
+        else:
+            rows = [row async for row in queryset.aiterator()]
+        return self.get_values_response(plan, rows, paginated)
+
+    def get_values_queryset(self, plan):
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        page_queryset = (
+            paginator.get_page_queryset(queryset, self.request, view=self)
+            if paginator is not None
+            else None
+        )
+        if page_queryset is None:
+            return queryset.values(*plan.lookups), False
+
+        # The cursor needs the ordering values, e.g. a search rank.
+        ordering = [
+            name.lstrip("-")
+            for name in paginator.current_ordering
+            if name.lstrip("-") not in plan.lookups
+        ]
+        return page_queryset.values(*plan.lookups, *ordering), True
+
+    def get_values_response(self, plan, rows, paginated):
+        if paginated:
+            rows = self.paginator.get_page(rows)
+            return self.get_paginated_response(plan.represent(rows))
+        return Response(plan.represent(rows))
@@ -0,0 +1,327 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+``metrics_middleware`` times every request and keys it by the resolved URL
+name (``borrowings:borrowings-list``); a query wrapper installed on each
+database connection adds the request's query count and time. Recording is
+a handful of list increments under a lock, kept in this process.
+
+With several worker processes, set ``METRICS["DIR"]`` to a directory they
+share: each process writes its snapshot there every
+``METRICS["FLUSH_INTERVAL"]`` seconds from a background thread, and
+``render()`` adds up all of them. As with counters anywhere, clear the
+directory when redeploying rather than while workers run.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.decorators import sync_and_async_middleware
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# RouteMetrics attribute, name, help, buckets
+HISTOGRAMS = (
+    (
+        "latency",
+        "library_http_request_duration_seconds",
+        "Time to produce the response, until its headers for streams.",
+        LATENCY_BUCKETS,
+    ),
+    (
+        "queries",
+        "library_http_request_db_queries",
+        "Database queries per request.",
+        QUERY_BUCKETS,
+    ),
+    (
+        "db_time",
+        "library_http_request_db_duration_seconds",
+        "Time per request spent executing database queries.",
+        LATENCY_BUCKETS,
+    ),
+    (
+        "size",
+        "library_http_response_size_bytes",
+        "Response body size; streamed responses are not counted.",
+        SIZE_BUCKETS,
+    ),
+)
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+
+class QueryUsage:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_usage = ContextVar("metrics_query_usage", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """Connection execute wrapper adding to the current request's usage."""
+    usage = _usage.get()
+    if usage is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        usage.queries += 1
+        usage.seconds += time.perf_counter() - started
+
+
+def install_query_counter(connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(install_query_counter)
+
+
+class RouteMetrics:
+    """
+    Histograms and status counts of one (route, method). A histogram is a
+    list of per-bucket counts, the +Inf bucket, and the sum.
+    """
+
+    __slots__ = ("latency", "queries", "db_time", "size", "statuses")
+
+    def __init__(self):
+        for attribute, _, _, buckets in HISTOGRAMS:
+            setattr(self, attribute, [0] * (len(buckets) + 2))
+        self.statuses = {}
+
+
+class Registry:
+    """``RouteMetrics`` per (route, method) in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._path = None
+        self._flushing = False
+
+    def observe(self, route, method, status, seconds, usage, size):
+        with self._lock:
+            metrics = self._routes.get((route, method))
+            if metrics is None:
+                metrics = self._routes[(route, method)] = RouteMetrics()
+                if not self._flushing and settings.METRICS["DIR"]:
+                    self._start_flushing()
+
+            histogram = metrics.latency
+            histogram[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+            histogram = metrics.queries
+            histogram[bisect_left(QUERY_BUCKETS, usage.queries)] += 1
+            histogram[-1] += usage.queries
+            histogram = metrics.db_time
+            histogram[bisect_left(LATENCY_BUCKETS, usage.seconds)] += 1
+            histogram[-1] += usage.seconds
+            if size is not None:
+                histogram = metrics.size
+                histogram[bisect_left(SIZE_BUCKETS, size)] += 1
+                histogram[-1] += size
+
+            statuses = metrics.statuses
+            statuses[status] = statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        """This process's metrics as JSON-compatible data."""
+        with self._lock:
+            return [
+                {
+                    "route": route,
+                    "method": method,
+                    "histograms": [
+                        list(getattr(metrics, attribute))
+                        for attribute, _, _, _ in HISTOGRAMS
+                    ],
+                    "statuses": {str(k): v for k, v in metrics.statuses.items()},
+                }
+                for (route, method), metrics in self._routes.items()
+            ]
+
+    def reset_after_fork(self):
+        # Counts inherited from the parent process are the parent's.
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._path = None
+        self._flushing = False
+
+    def _start_flushing(self):
+        self._flushing = True
+        pid = os.getpid()
+        self._path = Path(settings.METRICS["DIR"]) / f"{pid}-{time.time_ns()}.json"
+        threading.Thread(
+            target=self._flush_forever, args=(pid,), name="metrics-flush", daemon=True
+        ).start()
+        atexit.register(self.flush)
+
+    def _flush_forever(self, pid):
+        while os.getpid() == pid:
+            time.sleep(settings.METRICS["FLUSH_INTERVAL"])
+            self.flush()
+
+    def flush(self):
+        """Write this process's snapshot for the other workers to read."""
+        path = self._path
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Snapshots of every worker, this one's live."""
+        snapshots = [self.snapshot()]
+        directory = settings.METRICS["DIR"]
+        if directory:
+            for path in Path(directory).glob("*.json"):
+                if path == self._path:
+                    continue
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+        return snapshots
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset_after_fork)
+
+
+def merge(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for entry in snapshot:
+            key = (entry["route"], entry["method"])
+            if key not in merged:
+                merged[key] = {
+                    "histograms": [list(h) for h in entry["histograms"]],
+                    "statuses": dict(entry["statuses"]),
+                }
+                continue
+            target = merged[key]
+            for histogram, other in zip(target["histograms"], entry["histograms"]):
+                for i, value in enumerate(other):
+                    histogram[i] += value
+            for status, count in entry["statuses"].items():
+                target["statuses"][status] = target["statuses"].get(status, 0) + count
+    return merged
+
+
+def _labels(**labels):
+    return ",".join(
+        f'{name}="{value}"' for name, value in labels.items() if value is not None
+    )
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """All workers' metrics in the Prometheus text exposition format."""
+    merged = sorted(merge(registry.collect()).items())
+    lines = [
+        "# HELP library_http_requests_total Requests by route, method and status.",
+        "# TYPE library_http_requests_total counter",
+    ]
+    for (route, method), entry in merged:
+        for status, count in sorted(entry["statuses"].items()):
+            labels = _labels(route=route, method=method, status=status)
+            lines.append(f"library_http_requests_total{{{labels}}} {count}")
+
+    for index, (_, name, help_text, buckets) in enumerate(HISTOGRAMS):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (route, method), entry in merged:
+            histogram = entry["histograms"][index]
+            labels = _labels(route=route, method=method)
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), histogram):
+                cumulative += count
+                le = _labels(le=bound if bound == "+Inf" else _number(bound))
+                lines.append(f"{name}_bucket{{{labels},{le}}} {cumulative}")
+            lines.append(f"{name}_sum{{{labels}}} {_number(histogram[-1])}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "unmatched"
+
+
+def _size(response):
+    if response.streaming:
+        return None
+    length = response.get("Content-Length")
+    return int(length) if length is not None else len(response.content)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Records latency, queries, size and status of every request."""
+    # Connections opened before this module was imported, e.g. by the test
+    # runner, missed connection_created.
+    for connection in connections.all(initialized_only=True):
+        install_query_counter(connection)
+
+    def record(request, response, started, usage):
+        method = request.method if request.method in METHODS else "OTHER"
+        registry.observe(
+            _route(request),
+            method,
+            response.status_code,
+            time.perf_counter() - started,
+            usage,
+            _size(response),
+        )
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            started = time.perf_counter()
+            usage = QueryUsage()
+            token = _usage.set(usage)
+            try:
+                response = await get_response(request)
+            finally:
+                _usage.reset(token)
+            record(request, response, started, usage)
+            return response
+
+        return markcoroutinefunction(middleware)
+
+    def middleware(request):
+        started = time.perf_counter()
+        usage = QueryUsage()
+        token = _usage.set(usage)
+        try:
+            response = get_response(request)
+        finally:
+            _usage.reset(token)
+        record(request, response, started, usage)
+        return response
+
+    return middleware
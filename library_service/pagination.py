@@ -0,0 +1,204 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import BooleanField, F, Func, Q, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RowComparison(Func):
+    """
+    ``(a, b, ...) > (x, y, ...)``, or ``<``: a single range seek on an
+    index over the same columns, where the equivalent ``OR`` of per-column
+    conditions is not.
+    """
+
+    output_field = BooleanField()
+
+    def __init__(self, names, operator, values):
+        self.operator = operator
+        super().__init__(*map(F, names), *map(Value, values))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        parts, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            parts.append(sql)
+            params.extend(expression_params)
+        half = len(parts) // 2
+        columns, values = ", ".join(parts[:half]), ", ".join(parts[half:])
+        return f"({columns}) {self.operator} ({values})", params
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (seek) pagination.
+
+    Lists stay unpaginated unless the client sends ``page_size`` or
+    ``cursor``. The cursor holds the ordering values of the last row served
+    and the next page is fetched with a ``WHERE (a, b) > (x, y)`` style
+    filter, so deep pages cost the same as the first one and no
+    ``COUNT(*)`` is ever issued. Pages only go forward.
+    """
+
+    ordering = ("id",)
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.get_page(list(page_queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Unevaluated queryset of the requested page plus one look-ahead row.
+
+        Returns None when pagination was not requested. Pass the fetched
+        rows to ``get_page``; async views use the pair to run the query
+        through the async ORM.
+        """
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.current_ordering = self.get_ordering(request, queryset, view)
+        self.current_page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.current_ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.rows_after(position))
+        return queryset[: self.current_page_size + 1]
+
+    def get_page(self, rows):
+        """Trim the look-ahead row off ``rows`` and remember the next cursor."""
+        self.next_position = None
+        if len(rows) > self.current_page_size:
+            rows = rows[: self.current_page_size]
+            self.next_position = self.position_of(rows[-1])
+        return rows
+
+    def rows_after(self, position):
+        """Filter for rows that sort strictly after ``position``."""
+        descending = {field.startswith("-") for field in self.current_ordering}
+        if len(descending) == 1:
+            return RowComparison(
+                [field.lstrip("-") for field in self.current_ordering],
+                "<" if descending.pop() else ">",
+                position,
+            )
+
+        # Mixed directions, e.g. a search rank then id, have no row value.
+        conditions = []
+        for i, field in enumerate(self.current_ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            equal = {
+                previous.lstrip("-"): position[j]
+                for j, previous in enumerate(self.current_ordering[:i])
+            }
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": position[i]}))
+        return reduce(or_, conditions)
+
+    def position_of(self, row):
+        names = [field.lstrip("-") for field in self.current_ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        return [getattr(row, name) for name in names]
+
+    def encode_cursor(self, position):
+        payload = json.dumps(position, cls=DjangoJSONEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded))
+            if not isinstance(position, list) or len(position) != len(
+                self.current_ordering
+            ):
+                raise ValueError
+            return [
+                self.to_python(model, field.lstrip("-"), value)
+                for field, value in zip(self.current_ordering, position)
+            ]
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def to_python(model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations such as a search rank are kept as JSON decoded them.
+            return value
+        return field.to_python(value)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor returned in the `next` link of the previous page.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results per page; enables pagination.",
+                "schema": {"type": "integer"},
+            },
+        ]
@@ -0,0 +1,138 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Everything goes to the primary (``default``) unless a view opts in with
+``ReplicaReadMixin``: its safe requests read from one of
+``settings.DATABASE_REPLICAS``, picked once per request. Any write sends
+the rest of the request back to the primary. It also pins the user to the
+primary for ``settings.REPLICA_PIN_SECONDS``, so replication lag cannot
+hide a write from the user who made it. Pins live in the default cache;
+with a shared backend (``CACHE_URL``) they hold across workers.
+"""
+
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+
+_routing = ContextVar("replica_routing", default=None)
+
+
+def pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def is_pinned(user_id):
+    return cache.get(pin_key(user_id)) is not None
+
+
+class RoutingState:
+    """What the router needs to know about the request being served."""
+
+    def __init__(self):
+        self.user_id = None
+        self.replica = None
+        self.pinned = None
+        self.wrote = False
+        self.used_replica = False
+
+    def read_alias(self):
+        if self.replica is None or self.wrote:
+            return None
+        if self.pinned is None:
+            self.pinned = self.user_id is not None and is_pinned(self.user_id)
+        if self.pinned:
+            return None
+        self.used_replica = True
+        return self.replica
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        return (state and state.read_alias()) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        # Explicit, so instances read from a replica are saved to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+def served_from_replica():
+    """Whether the current request has read anything from a replica."""
+    state = _routing.get()
+    return state is not None and state.used_replica
+
+
+def use_replica(user):
+    """Let the current request read from a replica unless ``user`` is pinned."""
+    state = _routing.get()
+    if state is not None and settings.DATABASE_REPLICAS:
+        state.user_id = user.pk if user.is_authenticated else None
+        state.replica = random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaReadMixin:
+    """Serves a view's safe requests from a replica."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            use_replica(request.user)
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    """Tracks each request's routing and pins users to the primary after writes."""
+
+    def pin_key_for(request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return pin_key(user.pk)
+        return None
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            state = RoutingState()
+            token = _routing.set(state)
+            try:
+                response = await get_response(request)
+            finally:
+                _routing.reset(token)
+            if state.wrote and settings.DATABASE_REPLICAS:
+                # request.user may be a lazy session user needing a query.
+                key = await sync_to_async(pin_key_for)(request)
+                if key:
+                    await cache.aset(key, True, settings.REPLICA_PIN_SECONDS)
+            return response
+
+        return markcoroutinefunction(middleware)
+
+    def middleware(request):
+        state = RoutingState()
+        token = _routing.set(state)
+        try:
+            response = get_response(request)
+        finally:
+            _routing.reset(token)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            key = pin_key_for(request)
+            if key:
+                cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    return middleware
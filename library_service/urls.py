@@ -25,11 +25,19 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from library_service.views import DatabasePoolStatsView, metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/books/", include("books.urls", namespace="books")),
     path("api/users/", include("users.urls", namespace="users")),
     path("api/borrowings/", include("borrowings.urls", namespace="borrowings")),
+    path(
+        "api/db/pool-stats/",
+        DatabasePoolStatsView.as_view(),
+        name="db-pool-stats",
+    ),
+    path("metrics", metrics_view, name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/swagger/",
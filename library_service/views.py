@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from library_service import metrics
+from library_service.db import pool_stats
+
+
+class DatabasePoolStatsView(APIView):
+    """Connection pool counters of the worker serving the request."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        stats = pool_stats()
+        return Response({"pooled": stats is not None, **(stats or {})})
+
+
+def metrics_view(request):
+    """Request metrics of all workers for Prometheus to scrape."""
+    token = settings.METRICS["TOKEN"]
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,188 @@
+"""
+JWT authentication that resolves users through a cache instead of a
+``SELECT`` on every request.
+
+Users are looked up in a bounded, TTL-evicting in-process cache first,
+then in an optional shared Django cache, and only then in the database.
+Saving or deleting a user drops it from both tiers (see ``users.signals``);
+other worker processes pick the change up when their local entry expires,
+so ``USER_AUTH_CACHE["TTL"]`` bounds how long a revocation can lag.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+SHARED_KEY_PREFIX = "users:auth:"
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_users = TTLCache(
+    max_size=settings.USER_AUTH_CACHE["MAX_SIZE"],
+    ttl=settings.USER_AUTH_CACHE["TTL"],
+)
+
+
+def _shared_cache():
+    alias = settings.USER_AUTH_CACHE["SHARED_CACHE_ALIAS"]
+    return caches[alias] if alias else None
+
+
+def get_cached_user(user_id):
+    """Return a private copy of the user, or None if it does not exist."""
+    key = str(user_id)
+    user = local_users.get(key)
+
+    if user is None:
+        shared = _shared_cache()
+        if shared is not None:
+            user = shared.get(SHARED_KEY_PREFIX + key)
+
+        if user is None:
+            User = get_user_model()
+            try:
+                user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist:
+                return None
+            if shared is not None:
+                shared.set(
+                    SHARED_KEY_PREFIX + key,
+                    user,
+                    timeout=settings.USER_AUTH_CACHE["SHARED_TTL"],
+                )
+
+        local_users.set(key, user)
+
+    # Views may modify request.user; never hand out the cached instance.
+    return copy.copy(user)
+
+
+async def aget_cached_user(user_id):
+    """Async ``get_cached_user``; a local hit never leaves the event loop."""
+    key = str(user_id)
+    user = local_users.get(key)
+
+    if user is None:
+        shared = _shared_cache()
+        if shared is not None:
+            user = await shared.aget(SHARED_KEY_PREFIX + key)
+
+        if user is None:
+            User = get_user_model()
+            try:
+                user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist:
+                return None
+            if shared is not None:
+                await shared.aset(
+                    SHARED_KEY_PREFIX + key,
+                    user,
+                    timeout=settings.USER_AUTH_CACHE["SHARED_TTL"],
+                )
+
+        local_users.set(key, user)
+
+    return copy.copy(user)
+
+
+def invalidate_user(user_id):
+    key = str(user_id)
+    local_users.delete(key)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(SHARED_KEY_PREFIX + key)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that reads users through ``get_cached_user``."""
+
+    def get_user(self, validated_token):
+        user = get_cached_user(self.get_user_id(validated_token))
+        return self.check_user(validated_token, user)
+
+    async def aauthenticate(self, request):
+        """Async ``authenticate``, used by ``AsyncViewMixin``."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        user = await aget_cached_user(self.get_user_id(validated_token))
+        return self.check_user(validated_token, user), validated_token
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+    @staticmethod
+    def check_user(validated_token, user):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
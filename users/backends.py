@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from users import hashing
+
+
+class PooledHashingBackend(ModelBackend):
+    """``ModelBackend`` that hashes passwords in ``users.hashing``'s pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        User = get_user_model()
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash anyway, so timing does not tell whether the user exists.
+            hashing.make_password(password)
+            return None
+        valid = hashing.check_password(user, password)
+        if valid and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        User = get_user_model()
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await User._default_manager.aget_by_natural_key(username)
+        except User.DoesNotExist:
+            await hashing.amake_password(password)
+            return None
+        valid = await hashing.acheck_password(user, password)
+        if valid and self.user_can_authenticate(user):
+            return user
+        return None
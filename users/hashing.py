@@ -0,0 +1,150 @@
+"""
+Password hashing off the request thread, with admission control.
+
+A PBKDF2 hash costs hundreds of milliseconds of CPU. Run inline, a burst
+of logins or registrations holds every worker while cheap reads queue
+behind it. Hashing goes through a pool of ``PASSWORD_HASHING["WORKERS"]``
+threads instead. hashlib releases the GIL while hashing, so they run in
+parallel with request handling, at a lower scheduling priority so that
+requests go first when CPUs are short. Sync callers wait for the result,
+async callers await it without holding a thread.
+
+At most ``PASSWORD_HASHING["MAX_PENDING"]`` calls may wait for a free
+thread. Beyond that, callers get ``HashingBusy`` (503 with Retry-After)
+at once, rather than a growing backlog. ``WORKERS = 0`` hashes inline
+with no limit.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many sign-ins in progress, try again shortly.")
+    default_code = "hashing_busy"
+
+    def __init__(self):
+        super().__init__()
+        # Sent as Retry-After by DRF's exception handler.
+        self.wait = settings.PASSWORD_HASHING["RETRY_AFTER"]
+
+
+def _lower_priority():
+    # Linux gives every thread its own nice value.
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+class HashingPool:
+    def __init__(self, workers, max_pending):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="password-hashing",
+            initializer=_lower_priority,
+        )
+        self.slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def submit(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HashingBusy
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process's pool, or None when hashing inline."""
+    global _pool
+    if _pool is None and settings.PASSWORD_HASHING["WORKERS"]:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    settings.PASSWORD_HASHING["WORKERS"],
+                    settings.PASSWORD_HASHING["MAX_PENDING"],
+                )
+    return _pool
+
+
+def _reset_pool():
+    global _pool, _pool_lock
+    # Not shut down: hashes in flight finish on the old pool.
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+@receiver(setting_changed)
+def _reset_pool_on_setting_change(setting, **kwargs):
+    if setting == "PASSWORD_HASHING":
+        _reset_pool()
+
+
+# A forked worker inherits the pool but none of its threads.
+os.register_at_fork(after_in_child=_reset_pool)
+
+
+def run(func, *args):
+    pool = get_pool()
+    if pool is None:
+        return func(*args)
+    return pool.submit(func, *args).result()
+
+
+async def arun(func, *args):
+    pool = get_pool()
+    if pool is None:
+        return await sync_to_async(func, thread_sensitive=False)(*args)
+    return await asyncio.wrap_future(pool.submit(func, *args))
+
+
+def _verify(raw_password, encoded):
+    """Check ``raw_password``; also return a new hash if it needs upgrading."""
+    upgrade = []
+    valid = hashers.check_password(raw_password, encoded, setter=upgrade.append)
+    return valid, hashers.make_password(upgrade[0]) if upgrade else None
+
+
+def make_password(raw_password):
+    return run(hashers.make_password, raw_password)
+
+
+async def amake_password(raw_password):
+    return await arun(hashers.make_password, raw_password)
+
+
+def check_password(user, raw_password):
+    """``user.check_password`` with the hashing done in the pool."""
+    valid, upgraded = run(_verify, raw_password, user.password)
+    if upgraded:
+        user.password = upgraded
+        user.save(update_fields=["password"])
+    return valid
+
+
+async def acheck_password(user, raw_password):
+    valid, upgraded = await arun(_verify, raw_password, user.password)
+    if upgraded:
+        user.password = upgraded
+        await user.asave(update_fields=["password"])
+    return valid
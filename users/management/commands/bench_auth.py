@@ -0,0 +1,82 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from library_service.benchmarks import benchmark_database, summarize
+from users.authentication import CachedJWTAuthentication, local_users
+
+
+class Command(BaseCommand):
+    """Compares queries per request of plain and cached JWT authentication"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options["keepdb"]):
+            User = get_user_model()
+            users = User.objects.bulk_create(
+                User(email=f"bench{i}@example.com") for i in range(options["users"])
+            )
+            book = Book.objects.create(
+                title="Bench Book", author="Bench", inventory=1, daily_fee="1.00"
+            )
+            headers = [
+                {"HTTP_AUTHORIZE": f"Bearer {AccessToken.for_user(user)}"}
+                for user in users
+            ]
+            urls = [
+                reverse("users:manage-user"),
+                reverse("books:book-detail", args=[book.id]),
+            ]
+
+            results = {}
+            for name, auth_class in (
+                ("plain", JWTAuthentication),
+                ("cached", CachedJWTAuthentication),
+            ):
+                local_users.clear()
+                with mock.patch.object(
+                    APIView, "authentication_classes", (auth_class,)
+                ):
+                    results[name] = self.run(urls, headers, options["requests"])
+
+            for name, stats in results.items():
+                self.stdout.write(
+                    f"{name:>7}: {stats['queries_per_request']:.2f} queries/request, "
+                    f"{stats['per_second']:.1f} requests/s, "
+                    f"p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms"
+                )
+            saved = (
+                results["plain"]["queries_per_request"]
+                - results["cached"]["queries_per_request"]
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"saved {saved:.2f} queries per request")
+            )
+
+    @staticmethod
+    def run(urls, headers, count):
+        client = APIClient()
+        latencies = []
+        with CaptureQueriesContext(connection) as queries:
+            for i in range(count):
+                started = time.perf_counter()
+                response = client.get(urls[i % len(urls)], **headers[i % len(headers)])
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.status_code
+        stats = summarize(latencies, sum(latencies))
+        stats["queries_per_request"] = len(queries.captured_queries) / count
+        return stats
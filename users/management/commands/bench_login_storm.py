@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from library_service.benchmarks import (
+    asgi_request,
+    benchmark_database,
+    percentile,
+    summarize,
+)
+
+PASSWORD = "benchpass"
+
+
+class Command(BaseCommand):
+    """
+    Measures book list latency under ASGI before and during a login storm,
+    with passwords hashed inline by sync views and in the bounded pool
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--readers", type=int, default=10)
+        parser.add_argument("--logins", type=int, default=50)
+        parser.add_argument("--books", type=int, default=200)
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options["keepdb"]):
+            User = get_user_model()
+            password = make_password(PASSWORD)
+            users = User.objects.bulk_create(
+                User(email=f"storm{i}@example.com", password=password)
+                for i in range(options["logins"])
+            )
+            Book.objects.bulk_create(
+                Book(title=f"Book {i}", author="Bench", inventory=5, daily_fee="1.00")
+                for i in range(options["books"])
+            )
+            self.read_headers = [
+                (b"authorize", f"Bearer {AccessToken.for_user(users[0])}".encode())
+            ]
+            self.login_bodies = [
+                json.dumps({"email": user.email, "password": PASSWORD}).encode()
+                for user in users
+            ]
+
+            application = get_asgi_application()
+            modes = {
+                "inline": {
+                    "ASYNC_VIEWS": False,
+                    "PASSWORD_HASHING": {**settings.PASSWORD_HASHING, "WORKERS": 0},
+                },
+                "pooled": {},
+            }
+            for mode, overrides in modes.items():
+                with override_settings(**overrides):
+                    quiet = asyncio.run(self.run(application, options, storm=False))
+                    storm = asyncio.run(self.run(application, options, storm=True))
+                self.stdout.write(
+                    f"{mode:>6}: reads p50={quiet['p50_ms']:.1f}ms "
+                    f"p99={quiet['p99_ms']:.1f}ms alone, "
+                    f"p50={storm['p50_ms']:.1f}ms p99={storm['p99_ms']:.1f}ms "
+                    f"in the storm ({storm['per_second']:.0f} reads/s); "
+                    f"{storm['logins_per_second']:.1f} logins/s, "
+                    f"login p99={storm['login_p99_ms']:.0f}ms, "
+                    f"{storm['refused']} refused"
+                )
+
+    async def run(self, application, options, storm):
+        deadline = time.perf_counter() + options["seconds"]
+        books_url = reverse("books:book-list")
+        token_url = reverse("users:token_obtain_pair")
+        json_headers = [(b"content-type", b"application/json")]
+        reads, logins = [], []
+        refused = 0
+
+        async def reader():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status = await asgi_request(
+                    application, "GET", books_url, "page_size=20", self.read_headers
+                )
+                reads.append(time.perf_counter() - started)
+                assert status == 200, status
+
+        async def login(body):
+            nonlocal refused
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status = await asgi_request(
+                    application, "POST", token_url, headers=json_headers, body=body
+                )
+                if status == 503:
+                    refused += 1
+                    await asyncio.sleep(settings.PASSWORD_HASHING["RETRY_AFTER"])
+                    continue
+                assert status == 200, status
+                logins.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(reader() for _ in range(options["readers"])),
+            *(login(body) for body in (self.login_bodies if storm else ())),
+        )
+        elapsed = time.perf_counter() - started
+        stats = summarize(reads, elapsed)
+        stats["logins_per_second"] = len(logins) / elapsed
+        stats["login_p99_ms"] = percentile(logins, 99) * 1000
+        stats["refused"] = refused
+        return stats
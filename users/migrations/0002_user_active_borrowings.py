@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="active_borrowings",
+            field=models.PositiveIntegerField(db_default=0, default=0, editable=False),
+        ),
+    ]
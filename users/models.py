@@ -15,8 +15,13 @@ class UserManager(DjangoUserManager):
             raise ValueError("The given email must be set")
 
         email = self.normalize_email(email)
+        encoded_password = extra_fields.pop("encoded_password", None)
         user = self.model(email=email, **extra_fields)
-        user.set_password(password)
+        if encoded_password is None:
+            user.set_password(password)
+        else:
+            # Already hashed by the caller, e.g. in users.hashing's pool.
+            user.password = encoded_password
         user.save(using=self.db)
         return user
 
@@ -45,6 +50,10 @@ class UserManager(DjangoUserManager):
 class User(AbstractUser):
     username = None
     email = models.EmailField(_("email address"), unique=True)
+    # Borrowings not yet returned, kept by borrowings.models.
+    active_borrowings = models.PositiveIntegerField(
+        default=0, db_default=0, editable=False
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -1,6 +1,12 @@
-from django.contrib.auth import get_user_model
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate, get_user_model
+from django.contrib.auth.models import update_last_login
 from django.utils.translation import gettext as _
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings
+
+from users import hashing
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -19,15 +25,46 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Create user with encrypted password."""
+        password = validated_data.pop("password")
+        if "encoded_password" not in validated_data:
+            validated_data["encoded_password"] = hashing.make_password(password)
         return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
         """Update user with encrypted password."""
         password = validated_data.pop("password", None)
-        user = super().update(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        update_fields = list(validated_data)
 
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+            update_fields.append("password")
+
+        # instance may be a copy from the authentication cache; saving every
+        # field would write back its stale loan counter.
+        if update_fields:
+            instance.save(update_fields=update_fields)
+
+        return instance
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    async def avalidate(self, attrs):
+        """Async ``validate``, checking the credentials with ``aauthenticate``."""
+        self.user = await aauthenticate(
+            self.context.get("request"),
+            **{
+                self.username_field: attrs[self.username_field],
+                "password": attrs["password"],
+            },
+        )
+        if not api_settings.USER_AUTHENTICATION_RULE(self.user):
+            raise exceptions.AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
 
-        return user
+        refresh = self.get_token(self.user)
+        if api_settings.UPDATE_LAST_LOGIN:
+            await sync_to_async(update_last_login)(None, self.user)
+        return {"refresh": str(refresh), "access": str(refresh.access_token)}
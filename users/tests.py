@@ -1,7 +1,21 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
+from django.utils.timezone import now
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from borrowings.models import Borrowing
+from users import hashing
+from users.authentication import TTLCache
 
 
 class UsersApiTests(APITestCase):
@@ -81,3 +95,136 @@ class UsersApiTests(APITestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         user.refresh_from_db()
         self.assertTrue(user.check_password("newpass123"))
+
+    def _auth_header(self, user):
+        return {"HTTP_AUTHORIZE": f"Bearer {AccessToken.for_user(user)}"}
+
+    def test_jwt_user_lookup_is_cached(self):
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        headers = self._auth_header(user)
+
+        self.client.get(self.me_url, **headers)
+        with self.assertNumQueries(0):
+            res = self.client.get(self.me_url, **headers)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], user.email)
+
+    def test_saving_user_invalidates_cached_user(self):
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        headers = self._auth_header(user)
+        self.assertEqual(
+            self.client.get(self.me_url, **headers).status_code, status.HTTP_200_OK
+        )
+
+        user.is_active = False
+        user.save()
+        res = self.client.get(self.me_url, **headers)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updating_me_keeps_loan_counter(self):
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        headers = self._auth_header(user)
+        self.client.get(self.me_url, **headers)
+        book = Book.objects.create(
+            title="Dune", author="Frank Herbert", inventory=5, daily_fee="2.00"
+        )
+        due = now().date() + timedelta(days=7)
+        for _ in range(3):
+            Borrowing.objects.borrow(user, book.id, due)
+
+        res = self.client.patch(self.me_url, {"email": "new@example.com"}, **headers)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertEqual(user.email, "new@example.com")
+        self.assertEqual(user.active_borrowings, 3)
+
+    def test_login_upgrades_outdated_password_hash(self):
+        user = get_user_model().objects.create_user(email="user@example.com")
+        user.password = make_password("testpass123", hasher="pbkdf2_sha1")
+        user.save()
+
+        res = self.client.post(
+            self.token_url, {"email": user.email, "password": "testpass123"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$"))
+
+    @override_settings(
+        PASSWORD_HASHING={"WORKERS": 1, "MAX_PENDING": 0, "RETRY_AFTER": 3}
+    )
+    def test_login_is_refused_while_hashing_pool_is_full(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        hashing.get_pool().submit(release.wait)
+
+        res = self.client.post(
+            self.token_url, {"email": "user@example.com", "password": "testpass123"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "3")
+
+
+class TTLCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used_beyond_max_size(self):
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_entries_expire_after_ttl(self):
+        cache = TTLCache(max_size=2, ttl=30)
+        with mock.patch("users.authentication.time.monotonic", return_value=100):
+            cache.set("a", 1)
+        with mock.patch("users.authentication.time.monotonic", return_value=129):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("users.authentication.time.monotonic", return_value=131):
+            self.assertIsNone(cache.get("a"))
+
+
+class AsyncUsersApiTests(TestCase):
+    async def test_retrieve_me_async_with_jwt(self):
+        user = await sync_to_async(get_user_model().objects.create_user)(
+            email="user@example.com", password="testpass123"
+        )
+
+        res = await self.async_client.get(
+            reverse("users:manage-user"),
+            headers={"Authorize": f"Bearer {AccessToken.for_user(user)}"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["email"], user.email)
+
+    async def test_register_and_obtain_token_async(self):
+        payload = {"email": "user@example.com", "password": "testpass123"}
+
+        res = await self.async_client.post(reverse("users:register"), payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        user = await get_user_model().objects.aget(email=payload["email"])
+        self.assertTrue(await user.acheck_password(payload["password"]))
+
+        res = await self.async_client.post(reverse("users:token_obtain_pair"), payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("access", res.json())
+
+        res = await self.async_client.post(
+            reverse("users:token_obtain_pair"), {**payload, "password": "wrong"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,17 +1,48 @@
-from rest_framework import generics
+from asgiref.sync import sync_to_async
+from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt import views as jwt_views
 
-from users.serializers import UserSerializer
+from library_service.async_views import AsyncViewMixin
+from users import hashing
+from users.serializers import TokenObtainPairSerializer, UserSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(AsyncViewMixin, generics.CreateAPIView):
     serializer_class = UserSerializer
     permission_classes = ()
 
+    async def apost(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        # Checking that the email is free queries the database.
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        encoded = await hashing.amake_password(serializer.validated_data["password"])
+        await sync_to_async(serializer.save)(encoded_password=encoded)
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+        )
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+
+class ManageUserView(AsyncViewMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
         return self.request.user
+
+    async def aget(self, request, *args, **kwargs):
+        # request.user comes from the authentication cache; no query needed.
+        serializer = self.get_serializer(request.user)
+        return Response(serializer.data)
+
+
+class TokenObtainPairView(AsyncViewMixin, jwt_views.TokenObtainPairView):
+    serializer_class = TokenObtainPairSerializer
+
+    async def apost(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        # Field checks only: validate() would authenticate synchronously.
+        attrs = serializer.to_internal_value(request.data)
+        return Response(await serializer.avalidate(attrs), status=status.HTTP_200_OK)